@@ -4,6 +4,7 @@ import { getProjectMembers, getAllUsers, addMemberToProject, removeMemberFromPro
 const MembersSection = ({ projectId }) => {
   const [members, setMembers] = useState([]);
   const [allUsers, setAllUsers] = useState([]);
+  const [userQuery, setUserQuery] = useState('');
   const [selectedUser, setSelectedUser] = useState('');
   const [selectedRole, setSelectedRole] = useState('employee');
   const [loading, setLoading] = useState(true);
@@ -19,12 +20,8 @@ const MembersSection = ({ projectId }) => {
       setLoading(true);
       setError(null);
       try {
-        const [membersResponse, allUsersResponse] = await Promise.all([
-          getProjectMembers(projectId),
-          getAllUsers()
-        ]);
+        const membersResponse = await getProjectMembers(projectId);
         setMembers(membersResponse.results || membersResponse || []);
-        setAllUsers(allUsersResponse.results || allUsersResponse || []);
       } catch (err) {
         setError("No se pudieron cargar los miembros.");
       } finally {
@@ -35,6 +32,20 @@ const MembersSection = ({ projectId }) => {
     fetchMembersData();
   }, [projectId]);
 
+  // Buscador de usuarios: el servidor excluye a los miembros y devuelve pocos resultados
+  useEffect(() => {
+    if (!projectId) return;
+    const timer = setTimeout(async () => {
+      try {
+        const usersResponse = await getAllUsers(userQuery, projectId);
+        setAllUsers(usersResponse.results || usersResponse || []);
+      } catch (err) {
+        setAllUsers([]);
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [projectId, userQuery, members]);
+
   const handleAddMember = async () => {
     if (!selectedUser) {
       alert('Por favor, selecciona un usuario.');
@@ -90,6 +101,13 @@ const MembersSection = ({ projectId }) => {
       <div className="add-member-form">
         <h4>Añadir Nuevo Miembro</h4>
         <div style={{ display: 'flex', gap: '10px', alignItems: 'center' }}>
+          <input
+            type="search"
+            placeholder="Buscar por nombre, usuario o email"
+            value={userQuery}
+            onChange={(e) => setUserQuery(e.target.value)}
+            style={{ flex: 1, padding: '8px' }}
+          />
           <select value={selectedUser} onChange={(e) => setSelectedUser(e.target.value)} style={{ flex: 1, padding: '8px' }}>
             <option value="">Selecciona un usuario</option>
             {allUsers
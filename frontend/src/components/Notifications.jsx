@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { notificationService } from '../utils/apiServices';
+import { useEventStream } from '../hooks/useEventStream';
 import '../stylesheets/notifications.css';
 
 const Notifications = () => {
@@ -10,16 +11,20 @@ const Notifications = () => {
 
   useEffect(() => {
     loadNotifications();
-    const interval = setInterval(loadNotifications, 30000); // Actualizar cada 30 segundos
-    return () => clearInterval(interval);
   }, []);
 
+  // Se recarga solo cuando el servidor avisa de un cambio para el usuario
+  useEventStream('/api/okrs/events/me/', () => loadNotifications());
+
   const loadNotifications = async () => {
     try {
       setLoading(true);
-      const response = await notificationService.getAll();
-      setNotifications(response.data);
-      setUnreadCount(response.data.filter(n => !n.read).length);
+      const [data, unread] = await Promise.all([
+        notificationService.getAll(),
+        notificationService.getUnreadCount(),
+      ]);
+      setNotifications(data.results || []);
+      setUnreadCount(unread);
       setError(null);
     } catch (err) {
       setError('Error al cargar las notificaciones');
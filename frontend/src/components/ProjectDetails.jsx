@@ -2,6 +2,7 @@ import { useEffect, useState } from "react"
 import { getProjectDetails, getEpics, createEpic, updateEpic, deleteEpic, getObjectives, createObjective, updateObjective, deleteObjective, getUserDetails, getOKRs, createOKR, updateOKR, deleteOKR, getActivities, createActivity, updateActivity, deleteActivity, getTasks, createTask, updateTask, deleteTask } from "../utils/apiServices"
 import "../stylesheets/projectdetails.css"
 import MembersSection from './MembersSection';
+import { useEventStream } from '../hooks/useEventStream';
 
 const ProjectDetails = ({ projectId, type = "project" }) => {
   const [details, setDetails] = useState(null);
@@ -92,6 +93,27 @@ const ProjectDetails = ({ projectId, type = "project" }) => {
     fetchAllData();
   }, [projectId, type]);
 
+  // Cambios en vivo: se vuelve a pedir solo la lista del padre que cambió
+  useEventStream(projectId ? `/api/okrs/events/projects/${projectId}/` : null, async (event) => {
+    if (event.project_progress !== undefined) {
+      setDetails(prev => prev && { ...prev, progress: event.project_progress });
+    }
+    try {
+      if (event.type === 'task' && event.parent) {
+        const response = await getTasks(event.parent);
+        setTasks(prev => ({ ...prev, [event.parent]: response.results || [] }));
+      } else if (event.type === 'activity' && event.parent) {
+        const response = await getActivities(event.parent);
+        setActivities(prev => ({ ...prev, [event.parent]: response.results || [] }));
+      } else if (event.type === 'okr' && event.parent) {
+        const response = await getOKRs(event.parent);
+        setOKRs(prev => ({ ...prev, [event.parent]: response.results || [] }));
+      }
+    } catch (err) {
+      // Si falla se conserva lo que se estaba mostrando
+    }
+  });
+
   const toggleSection = (sectionId) => {
     setExpandedSections((prev) => ({
       ...prev,
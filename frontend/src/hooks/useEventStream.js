@@ -0,0 +1,18 @@
+import { useEffect, useRef } from 'react';
+import { subscribeToEvents } from '../utils/apiServices';
+
+// Se suscribe a un stream SSE del backend mientras el componente está montado.
+// onEvent recibe cada evento salvo el "hello" inicial; path null no conecta.
+export const useEventStream = (path, onEvent) => {
+  const handlerRef = useRef(onEvent);
+  handlerRef.current = onEvent;
+
+  useEffect(() => {
+    if (!path) return undefined;
+    return subscribeToEvents(path, (event) => {
+      if (event.type !== 'hello') {
+        handlerRef.current(event);
+      }
+    });
+  }, [path]);
+};
@@ -149,9 +149,11 @@ export const getUserDetails = async () => {
   }
 };
 
-export const getAllUsers = async () => {
+export const getAllUsers = async (query = '', projectId = null) => {
   try {
-    const response = await apiClient.get('/api/okrs/projects/available_users/');
+    const params = { q: query };
+    if (projectId) params.project = projectId;
+    const response = await apiClient.get('/api/okrs/projects/available_users/', { params });
     return response.data;
   } catch (error) {
     throw error;
@@ -219,7 +221,7 @@ export const changePassword = async (
 
 export const getUserMissions = async (page = 1) => {
   try {
-    const response = await apiClient.get(`/api/okrs/projects/?tipo=mision&page=${page}`);
+    const response = await apiClient.get(`/api/okrs/projects/?tipo=mision&view=summary&page=${page}`);
     return response.data;
   } catch (error) {
     throw error;
@@ -228,7 +230,7 @@ export const getUserMissions = async (page = 1) => {
 
 export const getUserProjects = async (page = 1) => {
   try {
-    const response = await apiClient.get(`/api/okrs/projects/?tipo=proyecto&page=${page}`);
+    const response = await apiClient.get(`/api/okrs/projects/?tipo=proyecto&view=summary&page=${page}`);
     return response.data;
   } catch (error) {
     throw error;
@@ -479,6 +481,39 @@ export const deleteTask = async (taskId) => {
   }
 };
 
+// Notificaciones
+export const notificationService = {
+  getAll: async () => {
+    const response = await apiClient.get('/api/okrs/notifications/');
+    return response.data;
+  },
+  getUnreadCount: async () => {
+    const response = await apiClient.get('/api/okrs/notifications/unread_count/');
+    return response.data.unread;
+  },
+  markAsRead: async (id) => {
+    const response = await apiClient.post(`/api/okrs/notifications/${id}/mark_read/`);
+    return response.data;
+  },
+  markAllAsRead: async () => {
+    const response = await apiClient.post('/api/okrs/notifications/mark_all_read/');
+    return response.data;
+  },
+  delete: async (id) => {
+    await apiClient.delete(`/api/okrs/notifications/${id}/`);
+  },
+};
+
+// Eventos en vivo (SSE): devuelve una función para cerrar la conexión.
+// EventSource no permite cabeceras, por eso el token va en la URL.
+export const subscribeToEvents = (path, onEvent) => {
+  const token = localStorage.getItem('access');
+  const query = token ? `?token=${encodeURIComponent(token)}` : '';
+  const source = new EventSource(`${API_BASE_URL}${path}${query}`, { withCredentials: true });
+  source.onmessage = (message) => onEvent(JSON.parse(message.data));
+  return () => source.close();
+};
+
 // No exportamos 'api' como default para evitar confusiones.
 // Si se necesita 'api' en otro lugar, se puede exportar.
 // export default api;
@@ -66,6 +66,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'okrs.audit.AuditMiddleware',
 ]
 
 ROOT_URLCONF = 'okrmanagment.urls'
@@ -137,6 +138,26 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
 
+# Caché (LocMemCache por defecto; p. ej. FileBasedCache con CACHE_BACKEND y CACHE_LOCATION)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='okrs'),
+    }
+}
+OKRS_PROJECT_TREE_CACHE = 'default'
+OKRS_PROJECT_TREE_CACHE_TIMEOUT = config('OKRS_PROJECT_TREE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Eventos en vivo (SSE): broker de pub/sub y segundos entre heartbeats
+OKRS_EVENT_BROKER = config('OKRS_EVENT_BROKER', default='okrs.events.LocalBroker')
+OKRS_EVENTS_HEARTBEAT_SECONDS = config('OKRS_EVENTS_HEARTBEAT_SECONDS', default=15, cast=int)
+
+# Días que se conservan las notificaciones (manage.py prune_notifications)
+OKRS_NOTIFICATION_RETENTION_DAYS = config('OKRS_NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+
+# Carpeta de los meses de logs archivados (manage.py archive_logs)
+OKRS_LOG_ARCHIVE_DIR = config('OKRS_LOG_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'logs'))
+
 # Django Rest Framework
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -1,85 +1,192 @@
 from django.contrib import admin
-from .models import Project, ProjectMembers, Epic, Objective, OKR, Activity, Task, Log, Comment
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import Project, ProjectMembers, Epic, Objective, OKR, Activity, Task, TaskInbox, Log, Comment, Job, Notification, bump_revisions
+from .jobs import get_queue_stats
+from . import audit, events, rollups
+
+# Sección: Admin
+# Los listados no hacen consultas por fila: los FKs que se muestran vienen
+# con list_select_related (Users.__str__ usa user.username), los conteos salen
+# de los contadores de okrs.rollups o de una anotación, y los filtros por tipo
+# de proyecto usan root_project en lugar de recorrer la jerarquía. En las
+# tablas grandes no se calcula el total sin filtrar y los FKs a usuarios y
+# tareas se eligen con autocompletado o por id, sin cargar la tabla en un select.
+
+# Sección: Acciones
+def get_project_ids(queryset):
+    model = queryset.model
+    if model is Project:
+        return set(queryset.values_list('pk', flat=True))
+    field = 'project_id' if model is Epic else 'root_project_id'
+    return set(queryset.values_list(field, flat=True).distinct()) - {None}
+
+@admin.action(description='Recalcular el progreso de sus proyectos')
+def recalculate_progress(modeladmin, request, queryset):
+    """Recalcula los contadores de los proyectos de la selección con rollups.rebuild"""
+    project_ids = get_project_ids(queryset)
+    drift = rollups.rebuild(project_ids=project_ids)
+    modeladmin.message_user(request, f'{len(project_ids)} proyectos recalculados, {len(drift)} valores corregidos.')
+
+@admin.action(description='Archivar las tareas seleccionadas')
+def archive_tasks(modeladmin, request, queryset):
+    """Archiva con un UPDATE por tabla; el estado no cambia, así que el progreso tampoco"""
+    with transaction.atomic():
+        tasks = list(queryset.filter(archived=False).only('id', 'title', 'status', 'completion_percentage', 'activity', 'root_project', 'assignee'))
+        pks = [task.pk for task in tasks]
+        now = timezone.now()
+        Task.objects.filter(pk__in=pks).update(archived=True, updated=now)
+        TaskInbox.objects.filter(task__in=pks).update(archived=True, updated=now)
+        # update() no dispara señales: revisión, auditoría y eventos explícitos
+        bump_revisions(task.root_project_id for task in tasks)
+        for task in tasks:
+            task.archived = True
+            audit.record(task, 'updated')
+            events.emit_change(task, 'updated')
+    modeladmin.message_user(request, f'{len(tasks)} tareas archivadas.')
 
 @admin.register(ProjectMembers)
 class ProjectMembersAdmin(admin.ModelAdmin):
     list_display = ['user', 'project', 'role', 'joined_at']
     list_filter = ['role', 'joined_at', 'project__tipo']
+    list_select_related = ['user__user', 'project']
     search_fields = ['user__user__username', 'user__first_name', 'user__last_name', 'project__name']
     ordering = ['project', 'role', 'user__user__username']
+    autocomplete_fields = ['user', 'project']
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
     list_display = ['name', 'tipo', 'created_by', 'start_date', 'end_date', 'get_members_count']
     list_filter = ['tipo', 'start_date', 'end_date', 'created']
+    list_select_related = ['created_by__user']
     search_fields = ['name', 'description', 'created_by__user__username']
     ordering = ['-created']
-    
+    autocomplete_fields = ['created_by']
+    actions = [recalculate_progress]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(members_count=Count('members'))
+
+    @admin.display(description='Miembros', ordering='members_count')
     def get_members_count(self, obj):
-        return obj.members.count()
-    get_members_count.short_description = 'Miembros'
+        return obj.members_count
 
 @admin.register(Epic)
 class EpicAdmin(admin.ModelAdmin):
     list_display = ['title', 'project', 'owner', 'get_objectives_count', 'created']
     list_filter = ['project__tipo', 'created']
+    list_select_related = ['project', 'owner__user']
     search_fields = ['title', 'description', 'project__name', 'owner__user__username']
     ordering = ['-created']
-    
+    autocomplete_fields = ['project', 'owner']
+    actions = [recalculate_progress]
+
+    @admin.display(description='Objetivos', ordering='children_total')
     def get_objectives_count(self, obj):
-        return obj.objectives.count()
-    get_objectives_count.short_description = 'Objetivos'
+        return obj.children_total
 
 @admin.register(Objective)
 class ObjectiveAdmin(admin.ModelAdmin):
     list_display = ['title', 'epic', 'project', 'owner', 'get_okrs_count', 'created']
-    list_filter = ['created', 'epic__project__tipo']
+    list_filter = ['created', 'root_project__tipo']
+    list_select_related = ['epic', 'project', 'owner__user']
     search_fields = ['title', 'description', 'epic__title', 'project__name', 'owner__user__username']
     ordering = ['-created']
-    
+    autocomplete_fields = ['epic', 'project', 'owner']
+    show_full_result_count = False
+    actions = [recalculate_progress]
+
+    @admin.display(description='OKRs', ordering='children_total')
     def get_okrs_count(self, obj):
-        return obj.okrs.count()
-    get_okrs_count.short_description = 'OKRs'
+        return obj.children_total
 
 @admin.register(OKR)
 class OKRAdmin(admin.ModelAdmin):
     list_display = ['key_result', 'objective', 'progress', 'current_value', 'target_value', 'owner', 'created']
-    list_filter = ['progress', 'created', 'objective__epic__project__tipo']
+    list_filter = ['progress', 'created', 'root_project__tipo']
+    list_select_related = ['objective', 'owner__user']
     search_fields = ['key_result', 'objective__title', 'owner__user__username']
     ordering = ['-created']
     readonly_fields = ['progress', 'current_value']
+    autocomplete_fields = ['objective', 'owner']
+    raw_id_fields = ['tasks']
+    show_full_result_count = False
+    actions = [recalculate_progress]
 
 @admin.register(Activity)
 class ActivityAdmin(admin.ModelAdmin):
     list_display = ['name', 'okr', 'owner', 'start_date', 'end_date', 'get_tasks_count', 'created']
-    list_filter = ['start_date', 'end_date', 'created', 'okr__objective__epic__project__tipo']
+    list_filter = ['start_date', 'end_date', 'created', 'root_project__tipo']
+    list_select_related = ['okr', 'owner__user']
     search_fields = ['name', 'description', 'okr__key_result', 'owner__user__username']
     ordering = ['-created']
-    
+    autocomplete_fields = ['okr', 'owner']
+    show_full_result_count = False
+    actions = [recalculate_progress]
+
+    @admin.display(description='Tareas', ordering='tasks_total')
     def get_tasks_count(self, obj):
-        return obj.tasks.count()
-    get_tasks_count.short_description = 'Tareas'
+        return obj.tasks_total
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ['title', 'activity', 'assignee', 'status', 'completion_percentage', 'created']
-    list_filter = ['status', 'archived', 'created', 'activity__okr__objective__epic__project__tipo']
+    list_filter = ['status', 'archived', 'created', 'root_project__tipo']
+    list_select_related = ['activity', 'assignee__user']
     search_fields = ['title', 'desc', 'assignee__user__username', 'activity__name']
     ordering = ['-created']
     readonly_fields = ['completion_percentage']
+    autocomplete_fields = ['activity', 'assignee']
+    raw_id_fields = ['parent_task']
+    show_full_result_count = False
+    actions = [archive_tasks, recalculate_progress]
 
 @admin.register(Log)
 class LogAdmin(admin.ModelAdmin):
     list_display = ['log_text', 'log_type', 'user', 'project', 'created']
     list_filter = ['log_type', 'created', 'project__tipo']
+    list_select_related = ['user__user', 'project']
     search_fields = ['log_text', 'user__user__username', 'project__name']
     ordering = ['-created']
     readonly_fields = ['created']
+    autocomplete_fields = ['user']
+    raw_id_fields = ['project', 'epic', 'objective', 'okr', 'activity', 'task']
+    show_full_result_count = False
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ['text', 'task', 'user', 'created']
-    list_filter = ['created', 'task__activity__okr__objective__epic__project__tipo']
+    list_filter = ['created', 'root_project__tipo']
+    list_select_related = ['task', 'user__user']
     search_fields = ['text', 'user__user__username', 'task__title']
     ordering = ['-created']
-    readonly_fields = ['created', 'updated']
\ No newline at end of file
+    readonly_fields = ['created', 'updated']
+    autocomplete_fields = ['task', 'user']
+    show_full_result_count = False
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['message', 'recipient', 'project', 'read', 'created']
+    list_filter = ['read', 'log_type', 'created']
+    list_select_related = ['recipient__user', 'project']
+    search_fields = ['message', 'recipient__user__username']
+    ordering = ['-created']
+    readonly_fields = ['created']
+    autocomplete_fields = ['recipient']
+    raw_id_fields = ['project']
+    show_full_result_count = False
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key', 'status', 'attempts', 'run_at', 'created', 'started', 'finished']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'key']
+    ordering = ['-created']
+    readonly_fields = ['created', 'started', 'finished', 'attempts', 'last_error', 'result', 'progress']
+    autocomplete_fields = ['created_by']
+    change_list_template = 'admin/okrs/job/change_list.html'
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'queue_stats': get_queue_stats()}
+        return super().changelist_view(request, extra_context=extra_context)
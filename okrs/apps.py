@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class OkrsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'okrs'
+
+    def ready(self):
+        from . import signals
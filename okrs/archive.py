@@ -0,0 +1,89 @@
+import gzip
+import json
+import os
+from datetime import date
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+from .models import Log
+
+# Sección: Archivo de logs
+# Los logs se agrupan por mes (Log.month). archive_logs() pasa los meses
+# viejos a un archivo JSONL comprimido por mes en OKRS_LOG_ARCHIVE_DIR. Cada
+# lote de filas se agrega al archivo como un miembro gzip completo y recién
+# entonces se borra de la tabla: la memoria no depende del tamaño del mes y
+# un corte a mitad de camino no pierde filas. Si un lote quedó escrito pero
+# sin borrar, al repetir se escribe otra vez y la lectura descarta el
+# duplicado (las filas se escriben en orden de id).
+
+ARCHIVE_FIELDS = (
+    'id', 'project_id', 'epic_id', 'objective_id', 'okr_id', 'activity_id', 'task_id',
+    'root_project_id', 'user_id', 'log_text', 'log_type', 'log_color', 'created',
+)
+
+def get_archive_dir():
+    return Path(getattr(settings, 'OKRS_LOG_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'logs'))
+
+def get_archive_path(month):
+    return get_archive_dir() / f'logs-{month:%Y-%m}.jsonl.gz'
+
+def is_archived(month):
+    return get_archive_path(month).exists()
+
+def get_archived_months():
+    """Meses (día 1) que tienen archivo, en orden"""
+    return sorted(date.fromisoformat(f'{path.name[5:12]}-01') for path in get_archive_dir().glob('logs-*.jsonl.gz'))
+
+def append_batch(path, rows):
+    """Agrega rows al archivo como un miembro gzip y lo baja a disco"""
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+            for row in rows:
+                archive.write((json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+def archive_month(month, batch_size=1000):
+    """Mueve los logs de month a su archivo en lotes de batch_size. Devuelve cuántos movió"""
+    path = get_archive_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    total = 0
+    last_pk = 0
+    while True:
+        rows = list(Log.objects.filter(month=month, pk__gt=last_pk).order_by('pk').values(*ARCHIVE_FIELDS)[:batch_size])
+        if not rows:
+            return total
+        append_batch(path, rows)
+        # Solo se borra lo que ya quedó escrito; Log no tiene dependientes
+        # y el DELETE sale en una sola sentencia
+        Log.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        total += len(rows)
+        last_pk = rows[-1]['id']
+
+def archive_logs(before, batch_size=1000, progress=None):
+    """
+    Archiva los meses completos anteriores al mes de before. Devuelve las
+    filas movidas por mes ('AAAA-MM'). progress(mes, filas), si se indica,
+    se llama después de cada mes.
+    """
+    months = Log.objects.filter(month__lt=before.replace(day=1)).order_by('month').values_list('month', flat=True).distinct()
+    summary = {}
+    for month in list(months):
+        label = f'{month:%Y-%m}'
+        summary[label] = archive_month(month, batch_size)
+        if progress is not None:
+            progress(label, summary[label])
+    return summary
+
+def read_archive(month):
+    """Filas archivadas de month en orden de id, sin duplicados. Lee el archivo de a una línea"""
+    last_pk = 0
+    with gzip.open(get_archive_path(month), 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            row = json.loads(line)
+            if row['id'] <= last_pk:
+                continue
+            last_pk = row['id']
+            row['created'] = parse_datetime(row['created'])
+            yield row
@@ -0,0 +1,250 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .models import Project
+from . import cache as project_cache
+from .conditional import make_revision_etag
+from .events import get_broker, project_channel, user_channel
+from .permissions import AuthorizationContext
+from .queries import plan_projects, plan_tasks
+from .views import ProjectViewSet, TaskViewSet
+
+# Sección: Lecturas asíncronas
+# Variantes async de las lecturas más pedidas por el dashboard (lista y
+# detalle de proyectos, my_tasks y project_tasks). Bajo ASGI (uvicorn) cada
+# request es una corrutina y no ocupa un hilo mientras espera a la base de
+# datos. Las respuestas son las mismas que las de los viewsets: se reutilizan
+# su visibilidad, sus serializers, la caché del árbol y los ETags; solo
+# cambia que las consultas se hacen con el ORM asíncrono y los planes de
+# queries.py, de modo que serializar no dispara consultas.
+
+async def aauthenticate(request, allow_query_token=False):
+    """
+    Usuario del request por JWT o por sesión, como DEFAULT_AUTHENTICATION_CLASSES.
+    Con allow_query_token también se acepta el JWT en ?token= (EventSource no
+    permite enviar cabeceras).
+    """
+    authenticator = JWTAuthentication()
+    raw_token = request.GET.get('token') if allow_query_token else None
+    if raw_token:
+        token = authenticator.get_validated_token(raw_token)
+        return await sync_to_async(authenticator.get_user)(token)
+    result = await sync_to_async(authenticator.authenticate)(request)
+    if result is not None:
+        return result[0]
+    user = await request.auser()
+    if not user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    return user
+
+def json_response(data, **kwargs):
+    return JsonResponse(data, encoder=JSONEncoder, safe=False, **kwargs)
+
+class AsyncReadView(View):
+    """
+    Base de las vistas asíncronas de solo lectura. viewset_class y action
+    indican el viewset equivalente, del que se toman la visibilidad y el
+    serializer; global_roles, si se indica, es el rol global requerido.
+    """
+    http_method_names = ['get', 'head', 'options']
+    viewset_class = None
+    action = None
+    global_roles = None
+    allow_query_token = False
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            await self.initialize(request, *args, **kwargs)
+            return await self.respond(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    async def initialize(self, request, *args, **kwargs):
+        user = await aauthenticate(request, self.allow_query_token)
+        context = await AuthorizationContext.aload(user)
+        if context.profile is None:
+            raise exceptions.AuthenticationFailed('Invalid authentication credentials.')
+        if self.global_roles and not context.has_global_role(*self.global_roles):
+            raise exceptions.PermissionDenied()
+
+        # El viewset se arma sobre un Request de DRF con el usuario y el
+        # contexto ya resueltos, así sus métodos no vuelven a consultar.
+        request.authorization_context = context
+        self.context = context
+        if self.viewset_class is not None:
+            drf_request = Request(request)
+            drf_request.user = user
+            self.viewset = self.viewset_class(
+                request=drf_request, args=args, kwargs=kwargs, action=self.action, format_kwarg=None
+            )
+            self.field_options = self.viewset.get_field_options()
+
+    async def respond(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def handle_exception(self, exc):
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = json_response(data, status=exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response.status_code = status.HTTP_401_UNAUTHORIZED
+            response['WWW-Authenticate'] = JWTAuthentication().authenticate_header(request=None)
+        return response
+
+    def get_conditional_response(self, request, project_revisions):
+        """(respuesta 304 o None, ETag), con el mismo cálculo que las vistas DRF"""
+        user_id = self.viewset.request.user.pk
+        etag = make_revision_etag(user_id, request.get_full_path(), 'json', project_revisions)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response['ETag'] = etag
+        return response, etag
+
+    async def paginate(self, request, queryset):
+        """Página ?page= de queryset con el formato de PageNumberPagination"""
+        paginator = self.viewset.paginator
+        page_size = paginator.get_page_size(self.viewset.request)
+        try:
+            number = int(request.GET.get(paginator.page_query_param, 1))
+        except ValueError:
+            number = 0
+        count = await queryset.acount()
+        offset = (number - 1) * page_size
+        if number < 1 or (number > 1 and offset >= count):
+            raise exceptions.NotFound(paginator.invalid_page_message)
+
+        url = request.build_absolute_uri()
+        next_url = previous_url = None
+        if offset + page_size < count:
+            next_url = replace_query_param(url, paginator.page_query_param, number + 1)
+        if number == 2:
+            previous_url = remove_query_param(url, paginator.page_query_param)
+        elif number > 2:
+            previous_url = replace_query_param(url, paginator.page_query_param, number - 1)
+        envelope = {'count': count, 'next': next_url, 'previous': previous_url}
+        return queryset[offset:offset + page_size], envelope
+
+# Sección: Proyectos
+class AsyncProjectListView(AsyncReadView):
+    viewset_class = ProjectViewSet
+    action = 'list'
+    global_roles = ('admin', 'manager')
+
+    async def respond(self, request):
+        queryset = self.viewset.get_visible_queryset()
+        project_revisions = [row async for row in self.viewset.get_revisions_queryset(queryset)]
+        not_modified, etag = self.get_conditional_response(request, project_revisions)
+        if not_modified is not None:
+            return not_modified
+
+        page, envelope = await self.paginate(request, queryset)
+        projects = [project async for project in plan_projects(page, **self.field_options)]
+        data = self.viewset.get_serializer(projects, many=True).data
+        return json_response({**envelope, 'results': data}, headers={'ETag': etag})
+
+class AsyncProjectDetailView(AsyncReadView):
+    viewset_class = ProjectViewSet
+    action = 'retrieve'
+    global_roles = ('admin', 'manager')
+
+    async def respond(self, request, pk):
+        project = await self.viewset.get_visible_queryset().filter(pk=pk).afirst()
+        if project is None:
+            raise exceptions.NotFound('No Project matches the given query.')
+        not_modified, etag = self.get_conditional_response(request, [(project.pk, project.revision)])
+        if not_modified is not None:
+            return not_modified
+
+        viewer = project_cache.get_viewer_class(self.context, project.pk)
+        data, key = await project_cache.aget_project_tree(project, viewer, **self.field_options)
+        if data is not None:
+            return json_response(data, headers={'X-Cache': 'HIT', 'ETag': etag})
+        tree = await plan_projects(Project.objects.filter(pk=project.pk), **self.field_options).aget()
+        data = self.viewset.get_serializer(tree).data
+        await project_cache.aset_project_tree(key, data)
+        return json_response(data, headers={'X-Cache': 'MISS', 'ETag': etag})
+
+# Sección: Tareas
+class AsyncMyTasksView(AsyncReadView):
+    viewset_class = TaskViewSet
+    action = 'my_tasks'
+
+    async def respond(self, request):
+        tasks = self.viewset.get_my_tasks(self.context.profile)
+        tasks = [task async for task in plan_tasks(tasks)]
+        return json_response(self.viewset.get_serializer(tasks, many=True).data)
+
+class AsyncProjectTasksView(AsyncReadView):
+    viewset_class = TaskViewSet
+    action = 'project_tasks'
+
+    async def respond(self, request):
+        project_id = request.GET.get('project_id')
+        if not project_id:
+            return json_response({'error': 'Se requiere project_id'}, status=status.HTTP_400_BAD_REQUEST)
+        tasks = self.viewset.get_project_tasks(self.context.profile, project_id)
+        tasks = [task async for task in plan_tasks(tasks)]
+        return json_response(self.viewset.get_serializer(tasks, many=True).data)
+
+# Sección: Eventos en vivo (SSE)
+def format_event(event):
+    return f'data: {json.dumps(event, separators=(",", ":"))}\n\n'
+
+class EventStreamResponse(StreamingHttpResponse):
+    """
+    Respuesta text/event-stream con el evento inicial hello y luego los
+    eventos de subscription. Cada heartbeat sin eventos se envía un
+    comentario para mantener viva la conexión. La suscripción se libera
+    cuando el servidor cierra la respuesta (p. ej. al desconectarse el cliente).
+    """
+    def __init__(self, subscription, hello):
+        self.subscription = subscription
+        super().__init__(self.stream(hello), content_type='text/event-stream')
+        self['Cache-Control'] = 'no-cache'
+        self['X-Accel-Buffering'] = 'no'
+
+    async def stream(self, hello):
+        heartbeat = getattr(settings, 'OKRS_EVENTS_HEARTBEAT_SECONDS', 15)
+        try:
+            yield 'retry: 5000\n' + format_event(hello)
+            while True:
+                event = await self.subscription.get(timeout=heartbeat)
+                yield ': ping\n\n' if event is None else format_event(event)
+        finally:
+            get_broker().unsubscribe(self.subscription)
+
+    def close(self):
+        get_broker().unsubscribe(self.subscription)
+        super().close()
+
+class ProjectEventsView(AsyncReadView):
+    """Cambios de un proyecto para sus miembros, admins y managers"""
+    allow_query_token = True
+
+    async def respond(self, request, pk):
+        if not (self.context.has_global_role('admin', 'manager') or self.context.is_member(pk)):
+            raise exceptions.PermissionDenied()
+        # Se suscribe antes de leer la revisión para no perder cambios intermedios
+        subscription = get_broker().subscribe([project_channel(pk)])
+        project = await Project.objects.filter(pk=pk).values('revision', 'progress').afirst()
+        if project is None:
+            get_broker().unsubscribe(subscription)
+            raise exceptions.NotFound('No Project matches the given query.')
+        hello = {'type': 'hello', 'project': pk, 'revision': project['revision'], 'project_progress': project['progress']}
+        return EventStreamResponse(subscription, hello)
+
+class UserEventsView(AsyncReadView):
+    """Cambios que afectan al usuario autenticado (tareas asignadas, membresías)"""
+    allow_query_token = True
+
+    async def respond(self, request):
+        profile_id = self.context.profile.id
+        subscription = get_broker().subscribe([user_channel(profile_id)])
+        return EventStreamResponse(subscription, {'type': 'hello', 'user': profile_id})
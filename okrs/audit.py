@@ -0,0 +1,187 @@
+import contextvars
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from functools import partial
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connection, transaction
+from .models import Project, Epic, Objective, OKR, Activity, Task, Log
+from . import notifications, rollups
+
+# Sección: Auditoría
+# Las altas, cambios y bajas de la jerarquía se registran como Log desde
+# okrs.signals (y desde las rutas masivas, que no disparan señales). Los
+# registros se acumulan durante el request (AuditMiddleware) o el trabajo y
+# se escriben al final con un solo bulk_create, más una consulta por tipo de
+# nodo para completar los FKs de los ancestros, sin importar cuántos nodos
+# se hayan tocado. Fuera de esos ámbitos (comandos, shell) se acumulan por
+# transacción, como los eventos en vivo.
+
+# Campo de Log de cada nivel y lookup desde cada modelo hacia él
+LOG_PATHS = {
+    Project: {'project_id': 'pk'},
+    Epic: {'project_id': 'project_id', 'epic_id': 'pk'},
+    Objective: {'project_id': 'root_project_id', 'epic_id': 'epic_id', 'objective_id': 'pk'},
+    OKR: {
+        'project_id': 'root_project_id', 'epic_id': 'objective__epic_id',
+        'objective_id': 'objective_id', 'okr_id': 'pk',
+    },
+    Activity: {
+        'project_id': 'root_project_id', 'epic_id': 'okr__objective__epic_id',
+        'objective_id': 'okr__objective_id', 'okr_id': 'okr_id', 'activity_id': 'pk',
+    },
+    Task: {
+        'project_id': 'root_project_id', 'epic_id': 'activity__okr__objective__epic_id',
+        'objective_id': 'activity__okr__objective_id', 'okr_id': 'activity__okr_id',
+        'activity_id': 'activity_id', 'task_id': 'pk',
+    },
+}
+
+# Campo con el nombre visible y sustantivo de cada modelo en log_text
+LABELS = {
+    Project: ('name', 'el proyecto'), Epic: ('title', 'la épica'), Objective: ('title', 'el objetivo'),
+    OKR: ('key_result', 'el OKR'), Activity: ('name', 'la actividad'), Task: ('title', 'la tarea'),
+}
+
+ACTIONS = {
+    'created': ('Created', 'Se creó', '#4caf50'),
+    'updated': ('Updated', 'Se actualizó', '#955251'),
+    'deleted': ('Deleted', 'Se eliminó', '#f44336'),
+}
+
+# Padre de los nodos cuyo padre no promedia progreso (ver rollups.get_parent)
+PARENT_FIELDS = {OKR: (Objective, 'objective_id'), Activity: (OKR, 'okr_id'), Task: (Activity, 'activity_id')}
+
+AuditEntry = namedtuple('AuditEntry', 'model pk action label anchor_model anchor_pk')
+
+def get_anchor(instance, action):
+    """
+    Nodo del que se toman los FKs del Log: el propio o, si se borró, su
+    padre. Un proyecto borrado no tiene dónde registrarse: (None, None).
+    """
+    model = type(instance)
+    if action != 'deleted':
+        return model, instance.pk
+    if model in PARENT_FIELDS:
+        parent_model, name = PARENT_FIELDS[model]
+        return parent_model, getattr(instance, name)
+    return rollups.get_parent(instance)
+
+class AuditBuffer:
+    """Registros de un request, trabajo o transacción, escritos todos juntos"""
+    def __init__(self, request=None, actor_id=None):
+        self.request = request
+        self.actor_id = actor_id
+        self.entries = []
+        self.flushed = False
+
+    def is_pending(self):
+        return not self.flushed and any(callback == self.flush for _, callback, _ in connection.run_on_commit)
+
+    def get_actor_id(self):
+        # Las vistas de DRF dejan el perfil ya cargado en el contexto de autorización
+        context = getattr(self.request, 'authorization_context', None)
+        if context is not None and context.profile is not None:
+            return context.profile.pk
+        return self.actor_id
+
+    def flush(self):
+        """Escribe los registros pendientes y devuelve los Log creados"""
+        self.flushed = True
+        entries = list(dict.fromkeys(entry for entry in self.entries if entry.anchor_pk is not None))
+        self.entries = []
+        if not entries:
+            return []
+
+        anchors = defaultdict(set)
+        for entry in entries:
+            anchors[entry.anchor_model].add(entry.anchor_pk)
+        # La consulta también descarta los nodos que ya no existen (p. ej.
+        # los descendientes de un nodo borrado en cascada)
+        paths = {}
+        for model, pks in anchors.items():
+            lookups = LOG_PATHS[model]
+            for row in model.objects.filter(pk__in=pks).values(*lookups.values()):
+                paths[model, row['pk']] = {name: row[lookup] for name, lookup in lookups.items()}
+
+        actor_id = self.get_actor_id()
+        logs = []
+        for entry in entries:
+            path = paths.get((entry.anchor_model, entry.anchor_pk))
+            if path is None:
+                continue
+            suffix, verb, color = ACTIONS[entry.action]
+            noun = LABELS[entry.model][1]
+            logs.append(Log(
+                user_id=actor_id, root_project_id=path['project_id'], log_type=f'{entry.model.__name__} {suffix}',
+                log_text=f'{verb} {noun} "{entry.label}"'[:255], log_color=color, **path,
+            ))
+        if logs:
+            # bulk_create no dispara la señal que reparte las notificaciones
+            Log.objects.bulk_create(logs, batch_size=500)
+            notifications.notify(logs)
+        return logs
+
+_scope = contextvars.ContextVar('okrs_audit_scope', default=None)
+
+@contextmanager
+def scope(request=None, actor_id=None):
+    """
+    Acumula la auditoría del bloque y la escribe al salir (o al confirmar la
+    transacción en curso). El autor es el perfil autenticado del request o,
+    si no hay, actor_id.
+    """
+    buffer = AuditBuffer(request, actor_id)
+    token = _scope.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _scope.reset(token)
+        transaction.on_commit(buffer.flush)
+
+def record(instance, action):
+    """Registra el alta (created), cambio (updated) o baja (deleted) de un nodo"""
+    model = type(instance)
+    entry = AuditEntry(model, instance.pk, action, getattr(instance, LABELS[model][0]), *get_anchor(instance, action))
+    buffer = _scope.get()
+    if buffer is not None:
+        # Se agrega al confirmar: lo que deshace un rollback no se registra
+        transaction.on_commit(partial(buffer.entries.append, entry))
+        return
+    buffer = getattr(connection, 'okrs_audit_buffer', None)
+    if buffer is not None and buffer.is_pending():
+        buffer.entries.append(entry)
+        return
+    # Fuera de una transacción on_commit ejecuta flush en el acto
+    buffer = AuditBuffer()
+    buffer.entries.append(entry)
+    connection.okrs_audit_buffer = buffer
+    transaction.on_commit(buffer.flush)
+
+class AuditMiddleware:
+    """
+    Escribe la auditoría de cada request con un solo bulk_create al terminarlo.
+    Bajo ASGI corre como corrutina para no ocupar un hilo por request (vistas
+    async/ y streams de eventos).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with scope(request=request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        buffer = AuditBuffer(request)
+        token = _scope.set(buffer)
+        try:
+            return await self.get_response(request)
+        finally:
+            _scope.reset(token)
+            await sync_to_async(transaction.on_commit)(buffer.flush)
@@ -0,0 +1,325 @@
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import date, timedelta
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users import directory
+from users.models import Users
+from .models import (
+    Project, ProjectMembers, Epic, Objective, OKR, Activity, Task, Log, Comment, Notification, TASK_STATUS, PROGRESS_DICT,
+)
+from . import inbox, rollups, search
+
+# Sección: Datos sintéticos
+# generate_dataset() arma jerarquías parecidas a las de producción con
+# bulk_create, un proyecto por vez (la memoria depende del tamaño de un
+# proyecto, no del total). Como bulk_create no dispara señales, root_project
+# se completa al crear las filas, la bandeja y el índice de búsqueda se
+# cargan por proyecto y al final se recalculan los contadores de progreso.
+
+# Épicas, objetivos, OKRs, actividades y tareas por nodo padre
+DEFAULT_DEPTH = (3, 3, 2, 2, 10)
+
+def parse_depth(value):
+    """'3,3,2,2,10' -> (3, 3, 2, 2, 10)"""
+    depth = tuple(int(part) for part in value.split(','))
+    if len(depth) != len(DEFAULT_DEPTH) or min(depth) < 1:
+        raise ValueError('depth necesita 5 enteros positivos: épicas,objetivos,okrs,actividades,tareas')
+    return depth
+
+def create_users(count, prefix, rng):
+    """Crea count usuarios sin contraseña utilizable; el primero es admin"""
+    offset = User.objects.filter(username__startswith=f'{prefix}-').count()
+    password = make_password(None)
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}-{offset + i}', first_name=f'Usuario {offset + i}', last_name=prefix, password=password)
+        for i in range(count)
+    ])
+    roles = ['admin' if i == 0 else 'manager' if rng.random() < 0.1 else 'employee' for i in range(count)]
+    profiles = Users.objects.bulk_create([
+        Users(user=user, first_name=user.first_name, last_name=user.last_name, role=role)
+        for user, role in zip(users, roles)
+    ])
+    directory.index(profiles)
+    return profiles
+
+def generate_project(index, profiles, depth, rng, logs_per_task, comments_per_task, members_per_project):
+    """Crea un proyecto completo. Las misiones tienen épicas; los proyectos, objetivos directos"""
+    epics_per_project, objectives_per_parent, okrs_per_objective, activities_per_okr, tasks_per_activity = depth
+    owner = rng.choice(profiles)
+    tipo = 'mision' if index % 2 == 0 else 'proyecto'
+    start = date.today() - timedelta(days=rng.randint(0, 365))
+    project = Project.objects.create(
+        name=f'{"Misión" if tipo == "mision" else "Proyecto"} {index}', created_by=owner, start_date=start, tipo=tipo,
+    )
+    members = [owner] + rng.sample([p for p in profiles if p != owner], min(members_per_project, len(profiles) - 1))
+    roles = ['owner'] + [rng.choice(['manager', 'member', 'member', 'member', 'viewer']) for _ in members[1:]]
+    ProjectMembers.objects.bulk_create([
+        ProjectMembers(project=project, user=member, role=role) for member, role in zip(members, roles)
+    ])
+
+    if tipo == 'mision':
+        epics = Epic.objects.bulk_create([
+            Epic(project=project, title=f'Épica {e}', owner=rng.choice(members)) for e in range(epics_per_project)
+        ])
+        objectives = Objective.objects.bulk_create([
+            Objective(epic=epic, root_project=project, title=f'Objetivo {o}', owner=rng.choice(members))
+            for epic in epics for o in range(objectives_per_parent)
+        ])
+    else:
+        epics = []
+        objectives = Objective.objects.bulk_create([
+            Objective(project=project, root_project=project, title=f'Objetivo {o}', owner=rng.choice(members))
+            for o in range(objectives_per_parent)
+        ])
+    okrs = OKR.objects.bulk_create([
+        OKR(objective=objective, root_project=project, key_result=f'KR {k}', owner=rng.choice(members))
+        for objective in objectives for k in range(okrs_per_objective)
+    ])
+    activities = Activity.objects.bulk_create([
+        Activity(
+            okr=okr, root_project=project, name=f'Actividad {a}', owner=rng.choice(members), start_date=start,
+            end_date=start + timedelta(days=rng.randint(7, 180)),
+        )
+        for okr in okrs for a in range(activities_per_okr)
+    ])
+    tasks = []
+    for activity in activities:
+        for t in range(tasks_per_activity):
+            status = rng.choice(TASK_STATUS)[0]
+            tasks.append(Task(
+                activity=activity, root_project=project, title=f'Tarea {t}', assignee=rng.choice(members),
+                status=status, completion_percentage=PROGRESS_DICT[status], archived=rng.random() < 0.05,
+            ))
+    tasks = Task.objects.bulk_create(tasks, batch_size=500)
+    inbox.sync_tasks(tasks)
+    okr_by_activity = {activity.pk: activity.okr_id for activity in activities}
+
+    objective_epics = {objective.pk: objective.epic_id for objective in objectives}
+    okr_objectives = {okr.pk: okr.objective_id for okr in okrs}
+    logs = []
+    for task in tasks:
+        okr_id = okr_by_activity[task.activity_id]
+        objective_id = okr_objectives[okr_id]
+        for _ in range(logs_per_task):
+            logs.append(Log(
+                project=project, epic_id=objective_epics[objective_id], objective_id=objective_id, okr_id=okr_id,
+                activity_id=task.activity_id, task=task, root_project=project, user=rng.choice(members),
+                log_text=f'Se actualizó la tarea "{task.title}"', log_type='Task Updated',
+            ))
+    Log.objects.bulk_create(logs, batch_size=500)
+    comments = Comment.objects.bulk_create([
+        Comment(task=task, root_project=project, user=rng.choice(members), text=f'Comentario {c} sobre {task.title}')
+        for task in tasks for c in range(comments_per_task)
+    ], batch_size=500)
+    for nodes in (epics, objectives, okrs, activities, tasks, comments):
+        search.index(nodes)
+    return {
+        'Project': 1, 'ProjectMembers': len(members), 'Epic': len(epics), 'Objective': len(objectives),
+        'OKR': len(okrs), 'Activity': len(activities), 'Task': len(tasks), 'Log': len(logs),
+        'Comment': len(comments),
+    }
+
+def generate_dataset(projects=10, depth=DEFAULT_DEPTH, users=20, logs_per_task=1, comments_per_task=1,
+                     members_per_project=5, seed=0, prefix='bench', progress=None):
+    """
+    Crea projects proyectos (mitad misiones, mitad proyectos) con users
+    usuarios nuevos y devuelve las filas creadas por modelo. seed hace
+    reproducible el resultado. progress(creados, total), si se indica, se
+    llama después de cada proyecto.
+    """
+    rng = random.Random(seed)
+    summary = {}
+    with transaction.atomic():
+        profiles = create_users(users, prefix, rng)
+        summary['Users'] = len(profiles)
+        for index in range(projects):
+            counts = generate_project(index, profiles, depth, rng, logs_per_task, comments_per_task, members_per_project)
+            for name, count in counts.items():
+                summary[name] = summary.get(name, 0) + count
+            if progress is not None:
+                progress(index + 1, projects)
+        rollups.rebuild()
+    return summary
+
+# Sección: Benchmark
+# run_benchmark() pide cada endpoint con el cliente de pruebas de DRF sobre
+# la base actual y mide consultas, latencias (p50/p95/p99) y el pico de
+# memoria de Python (tracemalloc, en una corrida aparte para no distorsionar
+# los tiempos). El reporte es JSON con claves estables para compararlo
+# entre commits con compare_reports().
+
+# (nombre, rol con el que se pide, ruta bajo /api/okrs/)
+BENCHMARK_ENDPOINTS = [
+    ('projects', 'admin', 'projects/'),
+    ('project_detail', 'admin', 'projects/{project}/'),
+    ('project_summary', 'admin', 'projects/{project}/?view=summary'),
+    ('epics', 'admin', 'epics/'),
+    ('objectives', 'admin', 'objectives/'),
+    ('activities', 'admin', 'activities/'),
+    ('tasks', 'employee', 'tasks/'),
+    ('my_tasks', 'employee', 'tasks/my_tasks/'),
+    ('inbox', 'employee', 'tasks/inbox/'),
+    ('project_tasks', 'employee', 'tasks/project_tasks/?project_id={project}'),
+    ('logs', 'employee', 'logs/'),
+    ('comments', 'employee', 'comments/'),
+    ('notifications', 'employee', 'notifications/'),
+]
+
+def get_benchmark_subjects():
+    """Admin, el empleado con más tareas y el proyecto donde tiene más"""
+    admin = Users.objects.filter(role='admin').select_related('user').order_by('pk').first()
+    employee = (
+        Users.objects.filter(role='employee').annotate(task_count=Count('tasks'))
+        .order_by('-task_count', 'pk').select_related('user').first()
+    )
+    project_id = None
+    if employee is not None:
+        project_id = (
+            Task.objects.filter(assignee=employee).values('root_project_id').annotate(task_count=Count('pk'))
+            .order_by('-task_count', 'root_project_id').values_list('root_project_id', flat=True).first()
+        )
+    if admin is None or project_id is None:
+        raise LookupError('Faltan datos: se necesita un admin y un empleado con tareas (ver seed_benchmark)')
+    return {'admin': admin, 'employee': employee}, project_id
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+class QueryCounter:
+    """Cuenta las consultas con un execute_wrapper: el request vacía connection.queries al empezar"""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+def measure(client, url, iterations):
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        response = client.get(url)
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        client.get(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    try:
+        client.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'queries': counter.count,
+        'bytes': len(response.content),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+def get_git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+def run_benchmark(iterations=20, names=None, progress=None, plans=False):
+    """
+    Mide los endpoints de BENCHMARK_ENDPOINTS (o solo los de names) y devuelve
+    el reporte. Con plans agrega los de explain_visibility() para el empleado.
+    """
+    profiles, project_id = get_benchmark_subjects()
+    client = APIClient()
+    endpoints = {}
+    # El cliente de pruebas usa el host testserver
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for name, role, path in BENCHMARK_ENDPOINTS:
+            if names and name not in names:
+                continue
+            client.force_authenticate(profiles[role].user)
+            # Una pedida previa calienta las cachés (árbol del proyecto, planes)
+            url = '/api/okrs/' + path.format(project=project_id)
+            client.get(url)
+            endpoints[name] = {'path': path, 'role': role, **measure(client, url, iterations)}
+            if progress is not None:
+                progress(name, endpoints[name])
+    report = {
+        'meta': {
+            'commit': get_git_commit(),
+            'created': timezone.now().isoformat(),
+            'iterations': iterations,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'rows': {
+                model.__name__: model.objects.count()
+                for model in (Project, Epic, Objective, OKR, Activity, Task, Log, Comment, Notification)
+            },
+        },
+        'endpoints': endpoints,
+    }
+    if plans:
+        report['plans'] = explain_visibility(profiles['employee'])
+    return report
+
+# Sección: Planes de consulta
+# explain_visibility() compara el plan del listado de un empleado con el
+# filtro de visibilidad anterior a root_project (los caminos por la
+# jerarquía hasta los miembros del proyecto, unidos con OR) y con el actual.
+
+# Modelo -> prefijos hasta Project del filtro anterior
+VISIBILITY_PATHS = {
+    Task: ('activity__okr__objective__epic__project', 'activity__okr__objective__project'),
+    Comment: ('task__activity__okr__objective__epic__project', 'task__activity__okr__objective__project'),
+    Log: (
+        'project', 'epic__project', 'objective__epic__project', 'objective__project',
+        'okr__objective__epic__project', 'okr__objective__project', 'activity__okr__objective__epic__project',
+        'activity__okr__objective__project', 'task__activity__okr__objective__epic__project',
+        'task__activity__okr__objective__project',
+    ),
+}
+
+def explain_visibility(profile):
+    """{modelo: {'before': plan, 'after': plan}} de la primera página que ve profile"""
+    project_ids = list(ProjectMembers.objects.filter(user=profile).values_list('project_id', flat=True))
+    plans = {}
+    for model, prefixes in VISIBILITY_PATHS.items():
+        before = Q.create([(f'{prefix}__members', profile) for prefix in prefixes], connector=Q.OR)
+        plans[model.__name__] = {
+            name: model.objects.filter(condition).order_by('created', 'id')[:10].explain()
+            for name, condition in (('before', before), ('after', Q(root_project__in=project_ids)))
+        }
+    return plans
+
+COMPARED_METRICS = ('queries', 'p95_ms', 'peak_kb')
+
+def compare_reports(old, new):
+    """Filas (endpoint, métrica, antes, después, cambio %) de los endpoints presentes en ambos reportes"""
+    rows = []
+    for name, metrics in new['endpoints'].items():
+        previous = old.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = previous[metric], metrics[metric]
+            change = (after - before) / before * 100 if before else 0
+            rows.append((name, metric, before, after, round(change, 1)))
+    return rows
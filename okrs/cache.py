@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import caches
+
+# Sección: Caché del árbol de proyectos
+# El detalle de un proyecto serializado se guarda por proyecto, revisión,
+# clase de visor (rol global o rol en el proyecto) y campos/profundidad
+# pedidos. Como Project.revision se incrementa con cada cambio del árbol, una
+# revisión nueva es una clave nueva y no hace falta borrar nada: las entradas
+# viejas expiran solas. Solo se usa la API común de Django (get/set/add/incr),
+# por lo que funciona igual con la caché en memoria local y con la basada en
+# archivos.
+
+KEY_PREFIX = 'okrs:project-tree'
+
+def get_cache():
+    return caches[getattr(settings, 'OKRS_PROJECT_TREE_CACHE', 'default')]
+
+def get_timeout():
+    return getattr(settings, 'OKRS_PROJECT_TREE_CACHE_TIMEOUT', 300)
+
+def get_viewer_class(context, project_id):
+    """Clase de visor con la que se comparte la respuesta cacheada"""
+    if context.has_global_role('admin', 'manager'):
+        return context.profile.role
+    return f'project-{context.get_role(project_id)}'
+
+def get_tree_key(project, viewer, fields=None, depth=None):
+    variant = f'{",".join(sorted(fields)) if fields is not None else "*"}:{depth}'
+    return f'{KEY_PREFIX}:{project.pk}:{project.revision}:{viewer}:{variant}'
+
+def get_project_tree(project, viewer, fields=None, depth=None):
+    """Devuelve (datos, clave); datos es None si no está en caché"""
+    key = get_tree_key(project, viewer, fields, depth)
+    data = get_cache().get(key)
+    count('hits' if data is not None else 'misses')
+    return data, key
+
+def set_project_tree(key, data):
+    get_cache().set(key, data, timeout=get_timeout())
+
+# Variantes para las vistas asíncronas (API asíncrona de la caché de Django)
+async def aget_project_tree(project, viewer, fields=None, depth=None):
+    key = get_tree_key(project, viewer, fields, depth)
+    data = await get_cache().aget(key)
+    await acount('hits' if data is not None else 'misses')
+    return data, key
+
+async def aset_project_tree(key, data):
+    await get_cache().aset(key, data, timeout=get_timeout())
+
+# Sección: Contadores
+def count(name):
+    cache = get_cache()
+    key = f'{KEY_PREFIX}:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+async def acount(name):
+    cache = get_cache()
+    key = f'{KEY_PREFIX}:stats:{name}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+def get_stats():
+    cache = get_cache()
+    hits = cache.get(f'{KEY_PREFIX}:stats:hits', 0)
+    misses = cache.get(f'{KEY_PREFIX}:stats:misses', 0)
+    return {'hits': hits, 'misses': misses}
+
+def reset_stats():
+    get_cache().delete_many([f'{KEY_PREFIX}:stats:hits', f'{KEY_PREFIX}:stats:misses'])
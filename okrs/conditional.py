@@ -0,0 +1,76 @@
+import hashlib
+from django.utils.cache import get_conditional_response
+from .models import Project
+
+# Sección: GET condicional
+def make_revision_etag(user_id, path, format, project_revisions):
+    """ETag de una respuesta a partir del usuario, la URL y las revisiones"""
+    parts = [str(user_id), path, format]
+    parts += [f'{pk}.{revision}' for pk, revision in project_revisions]
+    return '"%s"' % hashlib.sha1(':'.join(parts).encode()).hexdigest()
+
+class ProjectRevisionETagMixin:
+    """
+    ETag para list/retrieve derivado de Project.revision. Antes de serializar
+    nada se consultan las revisiones de los proyectos que abarca el queryset
+    visible (una sola consulta); si el cliente ya tiene esa versión
+    (If-None-Match) se responde 304. En retrieve se cargan antes la fila y
+    sus permisos de objeto.
+
+    La vista debe definir get_visible_queryset() y, en
+    revision_project_field, el campo que apunta al proyecto raíz.
+    """
+    revision_project_field = 'root_project'
+
+    def get_revisions_queryset(self, queryset):
+        """(pk, revision) de los proyectos que abarca queryset"""
+        project_ids = queryset.order_by().values(self.revision_project_field)
+        return Project.objects.filter(pk__in=project_ids).order_by('pk').values_list('pk', 'revision')
+
+    def get_project_revisions(self, queryset):
+        return list(self.get_revisions_queryset(queryset))
+
+    def get_revision_etag(self, project_revisions):
+        request = self.request
+        return make_revision_etag(
+            request.user.pk, request.get_full_path(), request.accepted_renderer.format, project_revisions
+        )
+
+    def get_conditional_response(self, etag):
+        """Respuesta 304 si el ETag coincide con If-None-Match, o None"""
+        response = get_conditional_response(self.request, etag=etag)
+        if response is not None:
+            response['ETag'] = etag
+        return response
+
+    def respond_with_etag(self, project_revisions, handler, request, *args, **kwargs):
+        etag = self.get_revision_etag(project_revisions)
+        not_modified = self.get_conditional_response(etag)
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_visible_queryset())
+        project_revisions = self.get_project_revisions(queryset)
+        return self.respond_with_etag(project_revisions, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            queryset = self.get_visible_queryset().filter(pk=kwargs[self.lookup_field])
+            instance = queryset.first()
+        except (TypeError, ValueError):
+            instance = None
+        if instance is None:
+            return super().retrieve(request, *args, **kwargs)
+        # Los permisos del objeto van antes del 304: si no, un ETag calculado
+        # confirmaría la existencia de un objeto que la vista rechaza
+        self.check_object_permissions(request, instance)
+        project_revisions = self.get_project_revisions(queryset)
+        if not project_revisions:
+            # Objeto sin proyecto raíz: sin ETag
+            return super().retrieve(request, *args, **kwargs)
+        return self.respond_with_etag(project_revisions, super().retrieve, request, *args, **kwargs)
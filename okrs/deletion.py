@@ -0,0 +1,139 @@
+from django.db import transaction
+from django.db.models import Q
+from .models import (
+    Project, ProjectMembers, Epic, Objective, OKR, Activity, Task, TaskInbox, Log, Comment,
+    SearchDocument, SearchTerm, bump_revisions,
+)
+from . import audit, events, notifications, rollups, search
+
+# Sección: Borrado de subárboles
+# Borra un nodo de la jerarquía con todos sus descendientes usando una
+# sentencia DELETE por tabla (con subconsultas sobre los padres), de abajo
+# hacia arriba y dentro de una transacción. No pasa por el Collector de
+# Django, así que no se cargan las filas ni se disparan señales por fila:
+# al final se recalcula una vez el progreso del padre y se incrementa la
+# revisión de los proyectos afectados.
+
+# Lookup de cada descendiente hacia el tipo de nodo que se borra
+SUBTREE_LOOKUPS = {
+    Project: {
+        Epic: 'project__in', Objective: 'root_project__in', OKR: 'root_project__in',
+        Activity: 'root_project__in', Task: 'root_project__in',
+    },
+    Epic: {
+        Objective: 'epic__in', OKR: 'objective__epic__in',
+        Activity: 'okr__objective__epic__in', Task: 'activity__okr__objective__epic__in',
+    },
+    Objective: {OKR: 'objective__in', Activity: 'okr__objective__in', Task: 'activity__okr__objective__in'},
+    OKR: {Activity: 'okr__in', Task: 'activity__okr__in'},
+    Activity: {Task: 'activity__in'},
+    Task: {},
+}
+
+# Campo de Log (y de SearchDocument) que apunta a cada nivel
+LOG_FIELDS = {Project: 'project', Epic: 'epic', Objective: 'objective', OKR: 'okr', Activity: 'activity', Task: 'task'}
+
+def get_subtree(model, pks):
+    """Querysets de los nodos indicados y de todos sus descendientes"""
+    roots = model.objects.filter(pk__in=pks)
+    subtree = {model: roots}
+    for child_model, lookup in SUBTREE_LOOKUPS[model].items():
+        subtree[child_model] = child_model.objects.filter(**{lookup: roots.values('pk')})
+    return subtree
+
+def get_affected_parents(model, pks):
+    """Padres cuyo progreso hay que recalcular y proyectos raíz afectados"""
+    roots = model.objects.filter(pk__in=pks)
+    if model is Project:
+        return [], list(pks)
+    if model is Epic:
+        project_ids = set(roots.values_list('project_id', flat=True))
+        return [(Project, pk) for pk in project_ids], project_ids
+    if model is Objective:
+        parents = set()
+        for epic_id, project_id in roots.values_list('epic_id', 'project_id'):
+            parents.add((Epic, epic_id) if epic_id else (Project, project_id))
+        return list(parents), set(roots.values_list('root_project_id', flat=True))
+    parent_field = {OKR: 'objective_id', Activity: 'okr_id', Task: 'activity_id'}[model]
+    parent_model = {OKR: Objective, Activity: OKR, Task: Activity}[model]
+    parents = [(parent_model, pk) for pk in set(roots.values_list(parent_field, flat=True))]
+    return parents, set(roots.values_list('root_project_id', flat=True))
+
+def delete_subtree(model, pks, progress=None):
+    """
+    Borra los nodos pks de model con todo su subárbol. Devuelve la cantidad
+    de filas borradas por modelo. progress(paso, total, modelo, filas), si se
+    indica, se llama después de cada sentencia.
+    """
+    pks = list(pks)
+    summary = {}
+    with transaction.atomic():
+        parents, project_ids = get_affected_parents(model, pks)
+        # Los nodos raíz se leen antes de borrarlos para auditar y publicar su baja
+        roots = list(model.objects.filter(pk__in=pks))
+        subtree = get_subtree(model, pks)
+        tasks = subtree.get(Task)
+
+        # Subtareas de otras actividades que cuelgan de tareas borradas: son
+        # casos aislados y se borran con el Collector para respetar el CASCADE.
+        if tasks is not None:
+            subtree_activities = subtree.get(Activity, Activity.objects.none())
+            external = Task.objects.filter(parent_task__in=tasks.values('pk')).exclude(
+                activity__in=subtree_activities.values('pk')
+            ).exclude(pk__in=tasks.values('pk'))
+            if external.exists():
+                for label, count in external.delete()[1].items():
+                    name = label.split('.')[-1]
+                    summary[name] = summary.get(name, 0) + count
+
+        log_filter = Q()
+        for node_model, queryset in subtree.items():
+            log_filter |= Q(**{f'{LOG_FIELDS[node_model]}__in': queryset.values('pk')})
+        document_filter = log_filter
+        if tasks is not None:
+            document_filter |= Q(comment__in=Comment.objects.filter(task__in=tasks.values('pk')).values('pk'))
+        documents = SearchDocument.objects.filter(document_filter)
+
+        if model is Project:
+            summary['Notification'] = notifications.discard_project(pks)
+
+        statements = []
+        if search.get_backend() == 'terms':
+            statements.append((SearchTerm, SearchTerm.objects.filter(document__in=documents.values('pk'))))
+        statements.append((SearchDocument, documents))
+        if tasks is not None:
+            statements.append((Comment, Comment.objects.filter(task__in=tasks.values('pk'))))
+            statements.append((TaskInbox, TaskInbox.objects.filter(task__in=tasks.values('pk'))))
+        statements.append((Log, Log.objects.filter(log_filter)))
+        okr_tasks = Q()
+        if tasks is not None:
+            okr_tasks |= Q(task__in=tasks.values('pk'))
+        if OKR in subtree:
+            okr_tasks |= Q(okr__in=subtree[OKR].values('pk'))
+        statements.append((OKR.tasks.through, OKR.tasks.through.objects.filter(okr_tasks)))
+        for node_model in (Task, Activity, OKR, Objective, Epic):
+            if node_model in subtree:
+                statements.append((node_model, subtree[node_model]))
+        if model is Project:
+            statements.append((ProjectMembers, ProjectMembers.objects.filter(project__in=pks)))
+            statements.append((Project, subtree[Project]))
+
+        for step, (statement_model, queryset) in enumerate(statements, start=1):
+            count = queryset._raw_delete(queryset.db)
+            name = statement_model.__name__
+            summary[name] = summary.get(name, 0) + count
+            if progress is not None:
+                progress(step, len(statements), name, count)
+
+        for parent_model, parent_id in parents:
+            if parent_model is Activity:
+                rollups.recount_activity(parent_id)
+            elif parent_model is OKR:
+                rollups.recount_okr(parent_id)
+            else:
+                rollups.recount_node(parent_model, parent_id)
+        bump_revisions(project_ids)
+        for root in roots:
+            audit.record(root, 'deleted')
+            events.emit_change(root, 'deleted')
+    return summary
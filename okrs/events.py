@@ -0,0 +1,180 @@
+import asyncio
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from .models import Project, ProjectMembers, Epic, Objective, OKR, Activity, Task
+
+# Sección: Eventos en vivo
+# Los cambios de la jerarquía se publican como eventos compactos (tipo, id,
+# acción, padre, progreso y la revisión del proyecto) en el canal del
+# proyecto y en el de los usuarios afectados. Las vistas SSE de
+# async_views.py se suscriben a esos canales. Los eventos se acumulan
+# durante la transacción y se publican al confirmarla, con una sola consulta
+# para leer la revisión y el progreso de los proyectos tocados.
+#
+# El broker por defecto es un pub/sub en memoria: solo llegan los eventos
+# publicados en el mismo proceso que atiende la conexión SSE. Para varios
+# procesos se puede indicar otro en OKRS_EVENT_BROKER (ruta a una clase con
+# is_active, publish, subscribe y unsubscribe).
+
+BROADCAST = 'all'
+
+def project_channel(project_id):
+    return f'project:{project_id}'
+
+def user_channel(profile_id):
+    return f'user:{profile_id}'
+
+class Subscription:
+    """Cola de eventos de un cliente conectado. put() se puede llamar desde cualquier hilo"""
+    def __init__(self, channels, max_size):
+        self.channels = set(channels) | {BROADCAST}
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_size)
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.put_nowait, event)
+        except RuntimeError:
+            # El loop del cliente ya se cerró
+            pass
+
+    def put_nowait(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # El cliente no da abasto: se descartan sus eventos pendientes y
+            # se le pide que recargue todo
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'reset'})
+
+    async def get(self, timeout):
+        """Próximo evento, o None si pasaron timeout segundos sin eventos"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class LocalBroker:
+    """Pub/sub en memoria del proceso"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def is_active(self):
+        """Indica si hay alguien escuchando; sin suscriptores no se arman eventos"""
+        return bool(self.subscriptions)
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, getattr(settings, 'OKRS_EVENTS_QUEUE_SIZE', 100))
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscriptions[channel]
+
+    def publish(self, channel, event):
+        with self.lock:
+            subscribers = list(self.subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+_broker = None
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'OKRS_EVENT_BROKER', 'okrs.events.LocalBroker'))()
+    return _broker
+
+# Sección: Emisión
+class EventBuffer:
+    """Eventos de una transacción, publicados todos juntos al confirmarla"""
+    def __init__(self):
+        self.events = []
+        self.flushed = False
+
+    def is_pending(self):
+        return not self.flushed and any(callback == self.flush for _, callback, _ in connection.run_on_commit)
+
+    def flush(self):
+        self.flushed = True
+        project_ids = {pk for _, project_ids, _ in self.events for pk in project_ids}
+        states = {
+            pk: {'revision': revision, 'project_progress': progress}
+            for pk, revision, progress in Project.objects.filter(pk__in=project_ids).values_list('pk', 'revision', 'progress')
+        }
+        broker = get_broker()
+        for event, project_ids, user_ids in self.events:
+            if not project_ids and not user_ids:
+                broker.publish(BROADCAST, event)
+            for project_id in project_ids:
+                broker.publish(project_channel(project_id), {**event, 'project': project_id, **states.get(project_id, {})})
+            for user_id in user_ids:
+                broker.publish(user_channel(user_id), event)
+
+def emit(event, project_ids=(), user_ids=()):
+    """
+    Encola un evento para los canales de project_ids y user_ids (o para
+    todos si no se indica ninguno). Se publica al confirmar la transacción.
+    """
+    entry = (event, {pk for pk in project_ids if pk}, {pk for pk in user_ids if pk})
+    buffer = getattr(connection, 'okrs_event_buffer', None)
+    if buffer is not None and buffer.is_pending():
+        buffer.events.append(entry)
+        return
+    # Fuera de una transacción on_commit ejecuta flush en el acto
+    buffer = EventBuffer()
+    buffer.events.append(entry)
+    connection.okrs_event_buffer = buffer
+    transaction.on_commit(buffer.flush)
+
+# Campo del padre que se informa en los eventos de cada modelo
+PARENT_FIELDS = {
+    Task: 'activity_id', Activity: 'okr_id', OKR: 'objective_id',
+    Objective: 'epic_id', Epic: 'project_id', ProjectMembers: 'project_id',
+}
+
+def emit_change(instance, action):
+    """Publica el alta, cambio o baja de un nodo de la jerarquía"""
+    if not get_broker().is_active():
+        return
+    model = type(instance)
+    event = {'type': 'member' if model is ProjectMembers else model._meta.model_name, 'id': instance.pk, 'action': action}
+    if model in PARENT_FIELDS:
+        event['parent'] = getattr(instance, PARENT_FIELDS[model])
+    if model is Task:
+        event.update(status=instance.status, progress=instance.completion_percentage)
+    elif model is not ProjectMembers:
+        event['progress'] = instance.progress
+
+    if model is Project:
+        project_ids = [instance.pk]
+    else:
+        name = 'project_id' if model in (Epic, ProjectMembers) else 'root_project_id'
+        project_ids = [getattr(instance, name), instance.get_loaded_value(name) if hasattr(instance, 'get_loaded_value') else None]
+    user_ids = []
+    if model is Task:
+        user_ids = [instance.assignee_id, instance.get_loaded_value('assignee_id')]
+    elif model is ProjectMembers:
+        user_ids = [instance.user_id]
+    emit(event, project_ids, user_ids)
+
+def emit_reset(project_ids=()):
+    """
+    Pide a los clientes de project_ids (o a todos) que recarguen, p. ej.
+    tras reconstruir contadores
+    """
+    if get_broker().is_active():
+        emit({'type': 'reset'}, project_ids)
@@ -0,0 +1,117 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from .models import Project, Epic, Objective
+
+# Sección: Exportación de la jerarquía
+# iter_rows() devuelve el árbol de los proyectos como filas planas, una por
+# tarea (o por el nodo más profundo cuando no tiene hijos), sin armar el
+# árbol en memoria. Se leen tres consultas en paralelo con .iterator(), todas
+# ordenadas por proyecto: los proyectos, las épicas y los objetivos unidos
+# con LEFT JOIN a sus OKRs, actividades, tareas y asignados. Las filas se
+# combinan al vuelo, así que la memoria no depende del tamaño del proyecto.
+
+EXPORT_COLUMNS = (
+    'project_id', 'project', 'tipo', 'project_progress',
+    'epic_id', 'epic', 'epic_progress',
+    'objective_id', 'objective', 'objective_progress',
+    'okr_id', 'key_result', 'okr_progress',
+    'activity_id', 'activity', 'start_date', 'end_date',
+    'task_id', 'task', 'assignee', 'status', 'completion_percentage', 'archived',
+)
+
+# Columna de la exportación -> lookup desde cada modelo
+PROJECT_LOOKUPS = {'project_id': 'id', 'project': 'name', 'tipo': 'tipo', 'project_progress': 'progress'}
+EPIC_LOOKUPS = {'epic_id': 'id', 'epic': 'title', 'epic_progress': 'progress'}
+OBJECTIVE_LOOKUPS = {
+    'objective_id': 'id', 'objective': 'title', 'objective_progress': 'progress',
+    'okr_id': 'okrs__id', 'key_result': 'okrs__key_result', 'okr_progress': 'okrs__progress',
+    'activity_id': 'okrs__activities__id', 'activity': 'okrs__activities__name',
+    'start_date': 'okrs__activities__start_date', 'end_date': 'okrs__activities__end_date',
+    'task_id': 'okrs__activities__tasks__id', 'task': 'okrs__activities__tasks__title',
+    'assignee': 'okrs__activities__tasks__assignee__user__username',
+    'status': 'okrs__activities__tasks__status',
+    'completion_percentage': 'okrs__activities__tasks__completion_percentage',
+    'archived': 'okrs__activities__tasks__archived',
+}
+
+def select(queryset, lookups, *extra):
+    """values() con las columnas de la exportación como claves"""
+    fields = [name for name, lookup in lookups.items() if name == lookup]
+    return queryset.values(*extra, *fields, **{name: F(lookup) for name, lookup in lookups.items() if name != lookup})
+
+def in_project(objective, project):
+    return objective is not None and objective['root_project_id'] == project['project_id']
+
+def iter_rows(project_ids=None, chunk_size=2000):
+    """Filas (dict con EXPORT_COLUMNS) de los proyectos indicados, o de todos"""
+    projects = Project.objects.all()
+    epics = Epic.objects.all()
+    objectives = Objective.objects.filter(root_project__isnull=False)
+    if project_ids is not None:
+        projects = projects.filter(pk__in=project_ids)
+        epics = epics.filter(project_id__in=project_ids)
+        objectives = objectives.filter(root_project_id__in=project_ids)
+
+    projects = select(projects, PROJECT_LOOKUPS).order_by('pk').iterator(chunk_size)
+    epics = select(epics, EPIC_LOOKUPS, 'project_id').order_by('project_id', 'pk').iterator(chunk_size)
+    # Los objetivos directos del proyecto (sin épica) van primero
+    objectives = select(objectives, OBJECTIVE_LOOKUPS, 'root_project_id', 'epic_id').order_by(
+        'root_project_id', F('epic_id').asc(nulls_first=True), 'pk',
+        'okrs__id', 'okrs__activities__id', 'okrs__activities__tasks__id',
+    ).iterator(chunk_size)
+
+    empty = dict.fromkeys(EXPORT_COLUMNS)
+    epic = next(epics, None)
+    objective = next(objectives, None)
+    for project in projects:
+        base = {**empty, **project}
+        emitted = False
+        while in_project(objective, project) and objective['epic_id'] is None:
+            yield {**base, **{name: objective[name] for name in OBJECTIVE_LOOKUPS}}
+            emitted = True
+            objective = next(objectives, None)
+        while epic is not None and epic['project_id'] == project['project_id']:
+            epic_row = {**base, **{name: epic[name] for name in EPIC_LOOKUPS}}
+            has_objectives = False
+            # Se saltean los objetivos de épicas de otro proyecto (datos inconsistentes)
+            while in_project(objective, project) and objective['epic_id'] < epic['epic_id']:
+                objective = next(objectives, None)
+            while in_project(objective, project) and objective['epic_id'] == epic['epic_id']:
+                yield {**epic_row, **{name: objective[name] for name in OBJECTIVE_LOOKUPS}}
+                has_objectives = True
+                objective = next(objectives, None)
+            if not has_objectives:
+                yield epic_row
+            emitted = True
+            epic = next(epics, None)
+        if not emitted:
+            yield base
+        while in_project(objective, project):
+            objective = next(objectives, None)
+
+class Echo:
+    """Archivo falso para csv.writer: devuelve la línea en lugar de escribirla"""
+    def write(self, value):
+        return value
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow([row[name] for name in EXPORT_COLUMNS])
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+# Formato -> (generador de líneas, content type, extensión)
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+def export_lines(output, project_ids=None, chunk_size=2000):
+    """Líneas de texto de la exportación en el formato output ('csv' o 'ndjson')"""
+    return EXPORT_FORMATS[output][0](iter_rows(project_ids, chunk_size))
@@ -0,0 +1,408 @@
+import csv
+import json
+from datetime import date
+from pathlib import Path
+from django.db import transaction
+from users.models import Users
+from .models import Project, Epic, Objective, OKR, Activity, Task, TASK_STATUS, PROGRESS_DICT, bump_revisions
+from . import audit, events, inbox, rollups, search
+
+# Sección: Importación de OKRs
+# import_okrs() carga objetivos, OKRs, actividades y tareas de un proyecto
+# desde un JSON jerárquico o un CSV plano. El archivo se lee por partes y se
+# arman los nodos en memoria sin tocar la base; después los dueños y
+# asignados se resuelven por username con una sola consulta y cada nivel se
+# inserta con un bulk_create dentro de una transacción. Los contadores de
+# progreso de los nodos nuevos se calculan en memoria y el de los padres
+# existentes (épica o proyecto) se recalcula una vez al final.
+#
+# Una fila o nodo con errores se descarta junto con sus descendientes y se
+# informa con su ubicación; el resto se importa. Con strict=True cualquier
+# error cancela la importación completa.
+
+STATUS_VALUES = {value for value, _ in TASK_STATUS}
+
+# Columnas del CSV: una fila por tarea (o por actividad, OKR u objetivo sin hijos)
+CSV_COLUMNS = {
+    'objective': 'title', 'objective_description': 'description', 'objective_owner': 'owner', 'epic': 'epic',
+    'key_result': 'key_result', 'target_value': 'target_value', 'okr_owner': 'owner',
+    'activity': 'name', 'activity_description': 'description', 'activity_owner': 'owner',
+    'start_date': 'start_date', 'end_date': 'end_date',
+    'task': 'title', 'task_desc': 'desc', 'assignee': 'assignee', 'status': 'status',
+}
+CSV_LEVELS = (
+    ('objective', ('objective', 'objective_description', 'objective_owner', 'epic')),
+    ('key_result', ('key_result', 'target_value', 'okr_owner')),
+    ('activity', ('activity', 'activity_description', 'activity_owner', 'start_date', 'end_date')),
+    ('task', ('task', 'task_desc', 'assignee', 'status')),
+)
+
+class ImportFormatError(ValueError):
+    """El archivo no se puede leer (formato desconocido, JSON o CSV mal formado)"""
+
+def get_file_type(name):
+    suffix = Path(name or '').suffix.lower()
+    if suffix not in ('.csv', '.json'):
+        raise ImportFormatError('El archivo debe ser .json o .csv')
+    return suffix[1:]
+
+# Sección: Lectura del JSON por partes
+class JSONStream:
+    """Decodifica valores JSON de un archivo de texto leído de a chunk_size caracteres"""
+    def __init__(self, stream, chunk_size=64 * 1024):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+
+    def fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        # Se descarta lo ya consumido para que la memoria dependa del nodo actual
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return bool(chunk)
+
+    def peek(self):
+        """Siguiente carácter que no es espacio, sin consumirlo ('' al final del archivo)"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ImportFormatError(f'JSON inválido: se esperaba "{char}"')
+        self.position += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, self.position = self.decoder.raw_decode(self.buffer, self.position)
+                return value
+            except json.JSONDecodeError as exc:
+                # Puede ser solo que el valor sigue en el próximo trozo
+                if not self.fill():
+                    raise ImportFormatError(f'JSON inválido: {exc.msg}')
+
+def iter_json_objectives(stream):
+    """
+    Objetivos de un arreglo JSON, o del arreglo "objectives" de un objeto
+    que solo tiene esa clave, decodificados de a uno.
+    """
+    reader = JSONStream(stream)
+    wrapped = reader.peek() == '{'
+    if wrapped:
+        reader.expect('{')
+        if reader.decode() != 'objectives':
+            raise ImportFormatError('JSON inválido: se esperaba la clave "objectives"')
+        reader.expect(':')
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.position += 1
+    else:
+        while True:
+            yield reader.decode()
+            if reader.peek() != ',':
+                reader.expect(']')
+                break
+            reader.position += 1
+    if wrapped:
+        reader.expect('}')
+    if reader.peek():
+        raise ImportFormatError('JSON inválido: hay datos después del arreglo de objetivos')
+
+# Sección: Importador
+class OKRImporter:
+    """Nodos leídos de un archivo para project, validados y listos para insertar"""
+    def __init__(self, project, actor):
+        self.project = project
+        self.actor = actor
+        self.objectives, self.okrs, self.activities, self.tasks = [], [], [], []
+        self.errors = []
+        self.invalid = set()
+        # (nodo, campo, username, ubicación) a resolver con una sola consulta
+        self.users = []
+        self.csv_nodes = {}
+        self.epics = None
+
+    def add_error(self, location, field, message):
+        self.errors.append({'location': location, 'field': field, 'error': message})
+
+    def get_text(self, data, name, max_length, location, required=False):
+        value = data.get(name)
+        if value is None or value == '':
+            if required:
+                self.add_error(location, name, 'Este campo es obligatorio')
+            return None
+        value = str(value).strip()
+        if len(value) > max_length:
+            self.add_error(location, name, f'Máximo {max_length} caracteres')
+            return None
+        return value
+
+    def get_date(self, data, name, location):
+        value = data.get(name)
+        if value is None or value == '':
+            return None
+        try:
+            return date.fromisoformat(str(value).strip())
+        except ValueError:
+            self.add_error(location, name, 'Fecha inválida (AAAA-MM-DD)')
+            return None
+
+    def get_epic(self, value, location):
+        """Épica del proyecto por id o por título"""
+        if self.epics is None:
+            self.epics = list(Epic.objects.filter(project=self.project).only('id', 'title', 'project_id'))
+        value = str(value).strip()
+        for epic in self.epics:
+            if str(epic.pk) == value or epic.title == value:
+                return epic
+        self.add_error(location, 'epic', 'La épica no existe en el proyecto')
+        return None
+
+    def set_user(self, node, field, username, location):
+        if username is None or username == '':
+            if field == 'owner':
+                setattr(node, field, self.actor)
+            return
+        self.users.append((node, field, str(username).strip(), location))
+
+    def get_children(self, data, name, location):
+        children = data.get(name) or []
+        if not isinstance(children, list):
+            self.add_error(location, name, 'Debe ser una lista')
+            return []
+        return children
+
+    def is_object(self, data, location):
+        if not isinstance(data, dict):
+            self.add_error(location, None, 'Se esperaba un objeto')
+            return False
+        return True
+
+    # Nodos
+    def add_objective(self, data, location):
+        errors = len(self.errors)
+        title = self.get_text(data, 'title', 255, location, required=True)
+        description = self.get_text(data, 'description', 2000, location)
+        epic = None
+        if data.get('epic') not in (None, ''):
+            epic = self.get_epic(data['epic'], location)
+        elif self.project.tipo == 'mision':
+            self.add_error(location, 'epic', 'Los objetivos de una misión necesitan su épica')
+        if len(self.errors) > errors:
+            return None
+        objective = Objective(
+            epic=epic, project=None if epic else self.project, root_project=self.project,
+            title=title, description=description or '',
+        )
+        self.set_user(objective, 'owner', data.get('owner'), location)
+        self.objectives.append(objective)
+        return objective
+
+    def add_okr(self, objective, data, location):
+        errors = len(self.errors)
+        key_result = self.get_text(data, 'key_result', 200, location, required=True)
+        target_value = data.get('target_value')
+        if target_value in (None, ''):
+            target_value = 100
+        else:
+            try:
+                target_value = int(target_value)
+            except (TypeError, ValueError):
+                self.add_error(location, 'target_value', 'Debe ser un número entero')
+        if len(self.errors) > errors:
+            return None
+        okr = OKR(objective=objective, root_project=self.project, key_result=key_result, target_value=target_value)
+        self.set_user(okr, 'owner', data.get('owner'), location)
+        self.okrs.append(okr)
+        return okr
+
+    def add_activity(self, okr, data, location):
+        errors = len(self.errors)
+        name = self.get_text(data, 'name', 255, location, required=True)
+        description = self.get_text(data, 'description', 2000, location)
+        start_date = self.get_date(data, 'start_date', location) or date.today()
+        end_date = self.get_date(data, 'end_date', location)
+        if end_date is not None and end_date < start_date:
+            self.add_error(location, 'end_date', 'La fecha de fin es anterior a la de inicio')
+        if len(self.errors) > errors:
+            return None
+        activity = Activity(
+            okr=okr, root_project=self.project, name=name, description=description or '',
+            start_date=start_date, end_date=end_date,
+        )
+        self.set_user(activity, 'owner', data.get('owner'), location)
+        self.activities.append(activity)
+        return activity
+
+    def add_task(self, activity, data, location):
+        errors = len(self.errors)
+        title = self.get_text(data, 'title', 255, location, required=True)
+        desc = self.get_text(data, 'desc', 2000, location)
+        status = data.get('status') or 'backlog'
+        if not isinstance(status, str) or status not in STATUS_VALUES:
+            self.add_error(location, 'status', f'Estado inválido: {status}')
+        if len(self.errors) > errors:
+            return None
+        task = Task(
+            activity=activity, root_project=self.project, title=title, status=status,
+            completion_percentage=PROGRESS_DICT[status],
+        )
+        if desc:
+            task.desc = desc
+        self.set_user(task, 'assignee', data.get('assignee'), location)
+        self.tasks.append(task)
+        return task
+
+    # Lectura
+    def read_json(self, stream):
+        for i, data in enumerate(iter_json_objectives(stream)):
+            location = f'objectives[{i}]'
+            if not self.is_object(data, location) or (objective := self.add_objective(data, location)) is None:
+                continue
+            for j, okr_data in enumerate(self.get_children(data, 'okrs', location)):
+                okr_location = f'{location}.okrs[{j}]'
+                if not self.is_object(okr_data, okr_location) or (okr := self.add_okr(objective, okr_data, okr_location)) is None:
+                    continue
+                for k, activity_data in enumerate(self.get_children(okr_data, 'activities', okr_location)):
+                    activity_location = f'{okr_location}.activities[{k}]'
+                    if not self.is_object(activity_data, activity_location):
+                        continue
+                    activity = self.add_activity(okr, activity_data, activity_location)
+                    if activity is None:
+                        continue
+                    for t, task_data in enumerate(self.get_children(activity_data, 'tasks', activity_location)):
+                        task_location = f'{activity_location}.tasks[{t}]'
+                        if self.is_object(task_data, task_location):
+                            self.add_task(activity, task_data, task_location)
+
+    def read_csv(self, stream):
+        reader = csv.DictReader(stream)
+        if reader.fieldnames is None or 'objective' not in reader.fieldnames:
+            raise ImportFormatError('El CSV necesita una fila de encabezados con la columna "objective"')
+        unknown = set(reader.fieldnames) - set(CSV_COLUMNS)
+        if unknown:
+            raise ImportFormatError(f'Columnas desconocidas: {", ".join(sorted(unknown))}')
+        adders = (self.add_objective, self.add_okr, self.add_activity, self.add_task)
+        for row in reader:
+            location = f'línea {reader.line_num}'
+            values = {column: (value or '').strip() for column, value in row.items() if column}
+            # Las filas con el mismo objetivo, KR o actividad comparten el nodo
+            node, key = None, ()
+            for level, ((name, columns), add) in enumerate(zip(CSV_LEVELS, adders)):
+                if not values.get(name):
+                    if any(values.get(deeper) for deeper, _ in CSV_LEVELS[level + 1:]):
+                        self.add_error(location, name, 'Este campo es obligatorio')
+                    break
+                key += (values.get('epic', ''), values[name]) if name == 'objective' else (values[name],)
+                if key in self.csv_nodes:
+                    node = self.csv_nodes[key]
+                else:
+                    data = {CSV_COLUMNS[column]: values.get(column, '') for column in columns}
+                    node = add(data, location) if node is None else add(node, data, location)
+                    if name != 'task':
+                        self.csv_nodes[key] = node
+                if node is None:
+                    break
+
+    # Resolución y guardado
+    def resolve_users(self):
+        """Asigna dueños y asignados por username con una sola consulta"""
+        usernames = {username for _, _, username, _ in self.users}
+        profiles = {
+            profile.user.username: profile
+            for profile in Users.objects.filter(user__username__in=usernames).select_related('user')
+        }
+        for node, field, username, location in self.users:
+            profile = profiles.get(username)
+            if profile is None:
+                self.add_error(location, field, f'Usuario no encontrado: {username}')
+                self.invalid.add(id(node))
+            else:
+                setattr(node, field, profile)
+
+    def prune(self):
+        """Descarta los nodos inválidos y sus descendientes"""
+        def keep(nodes, parent_field=None):
+            kept = []
+            for node in nodes:
+                parent = getattr(node, parent_field) if parent_field else None
+                if id(node) in self.invalid or (parent is not None and id(parent) in self.invalid):
+                    self.invalid.add(id(node))
+                else:
+                    kept.append(node)
+            return kept
+        self.objectives = keep(self.objectives)
+        self.okrs = keep(self.okrs, 'objective')
+        self.activities = keep(self.activities, 'okr')
+        self.tasks = keep(self.tasks, 'activity')
+
+    def compute_rollups(self):
+        """Contadores de los nodos nuevos, calculados de abajo hacia arriba en memoria"""
+        for task in self.tasks:
+            task.activity.tasks_total += 1
+            task.activity.tasks_completed += task.status == 'completed'
+        for activity in self.activities:
+            activity.okr.activities_total += 1
+            activity.okr.activities_completed += activity.tasks_completed > 0
+        for okr in self.okrs:
+            okr.progress = okr.current_value = rollups.percentage(okr.activities_completed, okr.activities_total)
+            okr.objective.children_total += 1
+            okr.objective.children_progress_sum += okr.progress
+        for objective in self.objectives:
+            objective.progress = rollups.average(objective.children_progress_sum, objective.children_total)
+
+    def save(self):
+        with transaction.atomic():
+            Objective.objects.bulk_create(self.objectives, batch_size=500)
+            OKR.objects.bulk_create(self.okrs, batch_size=500)
+            Activity.objects.bulk_create(self.activities, batch_size=500)
+            Task.objects.bulk_create(self.tasks, batch_size=500)
+            inbox.sync_tasks(self.tasks)
+            for nodes in (self.objectives, self.okrs, self.activities, self.tasks):
+                search.index(nodes)
+            # bulk_create no dispara señales: el promedio de cada padre se
+            # recalcula una sola vez y se propaga hasta el proyecto
+            parents = {(Epic, o.epic_id) if o.epic_id else (Project, o.project_id) for o in self.objectives}
+            for model, pk in parents:
+                rollups.recount_node(model, pk)
+            bump_revisions([self.project.pk])
+            # Se registra y publica cada objetivo importado, no cada nodo: un
+            # plan de miles de tareas no genera miles de logs y notificaciones
+            for objective in self.objectives:
+                audit.record(objective, 'created')
+                events.emit_change(objective, 'created')
+
+    def get_summary(self):
+        return {
+            'Objective': len(self.objectives), 'OKR': len(self.okrs),
+            'Activity': len(self.activities), 'Task': len(self.tasks),
+        }
+
+def import_okrs(project, actor, stream, file_type, strict=False):
+    """
+    Importa el archivo de texto stream (file_type 'json' o 'csv') en project.
+    Los nodos sin dueño quedan a nombre de actor. Devuelve
+    {'created': filas por modelo, 'errors': [...]}; con strict=True y algún
+    error no se importa nada. Lanza ImportFormatError si el archivo no se
+    puede leer.
+    """
+    importer = OKRImporter(project, actor)
+    if file_type == 'csv':
+        importer.read_csv(stream)
+    else:
+        importer.read_json(stream)
+    importer.resolve_users()
+    importer.prune()
+    if strict and importer.errors:
+        return {'created': dict.fromkeys(importer.get_summary(), 0), 'errors': importer.errors}
+    importer.compute_rollups()
+    importer.save()
+    return {'created': importer.get_summary(), 'errors': importer.errors}
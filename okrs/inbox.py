@@ -0,0 +1,60 @@
+from django.apps import apps
+from django.db import transaction
+from .models import Activity, Task, TaskInbox
+
+# Sección: Bandeja de tareas
+# TaskInbox guarda una fila por tarea asignada con título, estado, proyecto,
+# actividad y vencimiento (la fecha de fin de la actividad), para listar la
+# bandeja de un usuario con un rango sobre sus índices y sin joins. Se
+# actualiza desde okrs.signals al guardar tareas y actividades, y desde las
+# rutas masivas (bulk_update, delete_subtree). rebuild() la recalcula entera.
+
+INBOX_FIELDS = ('user', 'root_project', 'activity', 'title', 'status', 'completion_percentage', 'archived', 'due', 'updated')
+
+def build_row(task, due, model=TaskInbox):
+    return model(
+        task_id=task.pk, user_id=task.assignee_id, root_project_id=task.root_project_id, activity_id=task.activity_id,
+        title=task.title, status=task.status, completion_percentage=task.completion_percentage,
+        archived=task.archived, due=due, updated=task.updated,
+    )
+
+def sync_tasks(tasks):
+    """
+    Refleja tasks en la bandeja: un upsert para las asignadas y un DELETE
+    para las que dejaron de estarlo.
+    """
+    assigned = [task for task in tasks if task.assignee_id]
+    # El vencimiento sale de la actividad ya cargada o de una sola consulta
+    due = {task.activity_id: task.activity.end_date for task in assigned if Task.activity.is_cached(task)}
+    missing = {task.activity_id for task in assigned} - set(due)
+    if missing:
+        due.update(Activity.objects.filter(pk__in=missing).values_list('pk', 'end_date'))
+    if assigned:
+        TaskInbox.objects.bulk_create(
+            [build_row(task, due.get(task.activity_id)) for task in assigned],
+            update_conflicts=True, unique_fields=['task'], update_fields=INBOX_FIELDS, batch_size=500,
+        )
+    # Si no se conoce el asignado anterior se borra igual; sin fila no hace nada
+    unassigned = [task.pk for task in tasks if not task.assignee_id and task.get_loaded_value('assignee_id', -1) is not None]
+    if unassigned:
+        TaskInbox.objects.filter(task__in=unassigned).delete()
+
+def update_due(activity):
+    """Propaga a la bandeja la fecha de fin de una actividad"""
+    TaskInbox.objects.filter(activity=activity.pk).exclude(due=activity.end_date).update(due=activity.end_date)
+
+def rebuild(get_model=apps.get_model, batch_size=1000):
+    """Recalcula toda la bandeja desde las tareas. Devuelve cuántas filas quedaron"""
+    Task, TaskInbox = get_model('okrs', 'Task'), get_model('okrs', 'TaskInbox')
+    tasks = Task.objects.filter(assignee__isnull=False).select_related('activity').order_by('pk')
+    total = 0
+    with transaction.atomic():
+        TaskInbox.objects.all().delete()
+        batch = []
+        for task in tasks.iterator(chunk_size=batch_size):
+            batch.append(build_row(task, task.activity.end_date, TaskInbox))
+            if len(batch) == batch_size:
+                total += len(TaskInbox.objects.bulk_create(batch))
+                batch = []
+        total += len(TaskInbox.objects.bulk_create(batch))
+    return total
@@ -0,0 +1,182 @@
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Job
+from . import audit
+
+# Sección: Cola de trabajos
+# Cola respaldada por la tabla Job. Las vistas encolan con enqueue() y los
+# procesos de manage.py run_workers ejecutan los trabajos. Un trabajo se
+# reclama con un UPDATE condicional sobre status, lo que funciona igual en
+# SQLite y en PostgreSQL. Los fallos se reintentan con espera exponencial
+# hasta max_attempts. Un trabajo que sigue en running más de
+# OKRS_JOB_TIMEOUT segundos se da por perdido (el worker murió) y se vuelve
+# a reclamar como un intento más; debe superar la duración del trabajo más largo.
+
+JOB_HANDLERS = {}
+
+def register(name):
+    """Registra la función que ejecuta los trabajos llamados name"""
+    def decorator(func):
+        JOB_HANDLERS[name] = func
+        return func
+    return decorator
+
+def get_retention_days():
+    return getattr(settings, 'OKRS_NOTIFICATION_RETENTION_DAYS', 90)
+
+def get_backoff(attempts):
+    base = getattr(settings, 'OKRS_JOB_BACKOFF_SECONDS', 10)
+    return timedelta(seconds=base * 2 ** max(attempts - 1, 0))
+
+def enqueue(name, payload=None, key=None, delay=0, created_by=None, max_attempts=5):
+    """
+    Encola un trabajo. Si ya hay uno pendiente con la misma key se devuelve
+    ese, así varios pedidos seguidos se ejecutan una sola vez.
+    """
+    if name not in JOB_HANDLERS:
+        raise LookupError(f'Trabajo no registrado: {name}')
+    if key is not None:
+        existing = Job.objects.filter(key=key, status='pending').first()
+        if existing is not None:
+            return existing
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name, key=key, payload=payload or {}, created_by=created_by,
+                run_at=timezone.now() + timedelta(seconds=delay), max_attempts=max_attempts,
+            )
+    except IntegrityError:
+        # Otro proceso encoló la misma key entre la consulta y el insert
+        return Job.objects.get(key=key, status='pending')
+
+# Sección: Progreso
+# El progreso se publica en la caché y no en la fila: los trabajos largos
+# corren dentro de una transacción y sus escrituras no se verían hasta el
+# final. Para verlo desde otro proceso la caché debe ser compartida
+# (FileBasedCache, Redis...).
+
+def get_progress_key(job_id):
+    return f'okrs:job-progress:{job_id}'
+
+def set_progress(job, **progress):
+    caches['default'].set(get_progress_key(job.pk), progress, timeout=24 * 3600)
+
+def get_progress(job):
+    if job.status == 'running':
+        return caches['default'].get(get_progress_key(job.pk), job.progress)
+    return job.progress
+
+# Sección: Ejecución
+def get_timeout():
+    return timedelta(seconds=getattr(settings, 'OKRS_JOB_TIMEOUT', 3600))
+
+def claim_next_job():
+    """Reclama el próximo trabajo listo para correr (o abandonado por un worker), o None si no hay"""
+    now = timezone.now()
+    expired = Q(status='running', started__lt=now - get_timeout())
+    # Los abandonados sin intentos restantes no se vuelven a correr
+    Job.objects.filter(expired, attempts__gte=F('max_attempts')).update(
+        status='failed', finished=now, last_error='El worker no terminó el trabajo antes de OKRS_JOB_TIMEOUT.',
+    )
+    candidates = Job.objects.filter(
+        Q(status='pending', run_at__lte=now) | expired & Q(attempts__lt=F('max_attempts'))
+    ).values_list('pk', 'status', 'started')[:10]
+    for pk, status, started in candidates:
+        # started distingue al trabajo abandonado de uno que otro worker ya reclamó
+        claimed = Job.objects.filter(pk=pk, status=status, started=started).update(
+            status='running', started=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+def run_job(job):
+    """Ejecuta un trabajo reclamado y registra el resultado o el reintento"""
+    try:
+        handler = JOB_HANDLERS.get(job.name)
+        if handler is None:
+            raise LookupError(f'Trabajo no registrado: {job.name}')
+        # Lo que audite el trabajo se atribuye a quien lo encoló
+        with audit.scope(actor_id=job.created_by_id):
+            result = handler(job)
+    except Exception:
+        fail_job(job, traceback.format_exc())
+        return False
+    progress = caches['default'].get(get_progress_key(job.pk), job.progress)
+    Job.objects.filter(pk=job.pk).update(status='done', finished=timezone.now(), result=result, progress=progress)
+    caches['default'].delete(get_progress_key(job.pk))
+    return True
+
+def fail_job(job, error):
+    now = timezone.now()
+    superseded = job.key is not None and Job.objects.filter(key=job.key, status='pending').exists()
+    if job.attempts >= job.max_attempts or superseded:
+        if superseded:
+            error += '\nReemplazado por un trabajo pendiente con la misma clave.'
+        Job.objects.filter(pk=job.pk).update(status='failed', finished=now, last_error=error)
+    else:
+        Job.objects.filter(pk=job.pk).update(status='pending', run_at=now + get_backoff(job.attempts), last_error=error)
+
+def run_pending(limit=None):
+    """Ejecuta trabajos hasta vaciar la cola (o hasta limit). Devuelve cuántos corrió"""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+def get_queue_stats():
+    """Profundidad de la cola y latencia reciente, para el admin"""
+    now = timezone.now()
+    pending = Job.objects.filter(status='pending')
+    oldest = pending.filter(run_at__lte=now).order_by('run_at').values_list('run_at', flat=True).first()
+    recent = Job.objects.filter(started__isnull=False).order_by('-started').values_list('run_at', 'started')[:100]
+    waits = [(started - run_at).total_seconds() for run_at, started in recent]
+    return {
+        'ready': pending.filter(run_at__lte=now).count(),
+        'scheduled': pending.filter(run_at__gt=now).count(),
+        'running': Job.objects.filter(status='running').count(),
+        'failed': Job.objects.filter(status='failed').count(),
+        'oldest_wait': (now - oldest).total_seconds() if oldest else 0,
+        'average_latency': sum(waits) / len(waits) if waits else 0,
+    }
+
+# Sección: Trabajos registrados
+@register('delete_subtree')
+def delete_subtree_job(job):
+    from .deletion import SUBTREE_LOOKUPS, delete_subtree
+    models = {model.__name__: model for model in SUBTREE_LOOKUPS}
+
+    def report(step, total, name, count):
+        set_progress(job, step=step, total=total, model=name, deleted=count)
+
+    return delete_subtree(models[job.payload['model']], job.payload['ids'], progress=report)
+
+@register('prune_notifications')
+def prune_notifications_job(job):
+    from .notifications import prune
+    before = timezone.now() - timedelta(days=job.payload.get('days', get_retention_days()))
+    return {'deleted': prune(before, job.payload.get('batch_size', 1000))}
+
+@register('rebuild_progress')
+def rebuild_progress_job(job):
+    from .rollups import rebuild
+    return {'drift': len(rebuild())}
+
+@register('archive_logs')
+def archive_logs_job(job):
+    from datetime import date
+    from .archive import archive_logs
+
+    def report(month, count):
+        set_progress(job, month=month, archived=count)
+
+    return archive_logs(date.fromisoformat(job.payload['before']), job.payload.get('batch_size', 1000), progress=report)
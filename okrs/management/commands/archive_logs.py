@@ -0,0 +1,38 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from okrs.archive import archive_logs, get_archive_dir
+from okrs.jobs import enqueue
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los logs de los meses anteriores a --before a archivos JSONL comprimidos '
+        '(uno por mes, en OKRS_LOG_ARCHIVE_DIR) y los borra de la tabla en lotes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True, help='Mes (AAAA-MM) o fecha; se archivan los meses anteriores')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Logs por lote (por defecto 1000)')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Encola el archivado para run_workers en lugar de ejecutarlo ahora.'
+        )
+
+    def handle(self, *args, **options):
+        value = options['before']
+        try:
+            before = date.fromisoformat(value if len(value) > 7 else f'{value}-01')
+        except ValueError:
+            raise CommandError('--before debe tener el formato AAAA-MM o AAAA-MM-DD')
+
+        if options['background']:
+            job = enqueue(
+                'archive_logs', {'before': before.isoformat(), 'batch_size': options['batch_size']}, key='archive_logs'
+            )
+            self.stdout.write(self.style.SUCCESS(f'Archivado encolado (trabajo {job.pk}).'))
+            return
+
+        def report(month, count):
+            self.stdout.write(f'{month}: {count} logs archivados')
+
+        summary = archive_logs(before, options['batch_size'], progress=report)
+        self.stdout.write(self.style.SUCCESS(f'{sum(summary.values())} logs archivados en {get_archive_dir()}.'))
@@ -0,0 +1,44 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+def backfill_root_project(get_model=apps.get_model):
+    """
+    Recalcula root_project en toda la jerarquía con una sentencia UPDATE por
+    tabla, de arriba hacia abajo. Devuelve el número de filas por modelo.
+    """
+    Epic, Objective, OKR, Activity, Task, Log, Comment = (
+        get_model('okrs', name) for name in ('Epic', 'Objective', 'OKR', 'Activity', 'Task', 'Log', 'Comment')
+    )
+
+    def root_of(model, field_name, root_field='root_project_id'):
+        return Subquery(model.objects.filter(pk=OuterRef(field_name)).values(root_field)[:1])
+
+    counts = {}
+    with transaction.atomic():
+        counts['Objective'] = Objective.objects.update(
+            root_project_id=Coalesce(F('project_id'), root_of(Epic, 'epic_id', 'project_id'))
+        )
+        counts['OKR'] = OKR.objects.update(root_project_id=root_of(Objective, 'objective_id'))
+        counts['Activity'] = Activity.objects.update(root_project_id=root_of(OKR, 'okr_id'))
+        counts['Task'] = Task.objects.update(root_project_id=root_of(Activity, 'activity_id'))
+        counts['Comment'] = Comment.objects.update(root_project_id=root_of(Task, 'task_id'))
+        counts['Log'] = Log.objects.update(root_project_id=Coalesce(
+            F('project_id'),
+            root_of(Epic, 'epic_id', 'project_id'),
+            root_of(Objective, 'objective_id'),
+            root_of(OKR, 'okr_id'),
+            root_of(Activity, 'activity_id'),
+            root_of(Task, 'task_id'),
+        ))
+    return counts
+
+class Command(BaseCommand):
+    help = 'Recalcula el proyecto raíz desnormalizado (root_project) de toda la jerarquía'
+
+    def handle(self, *args, **options):
+        for model, count in backfill_root_project().items():
+            self.stdout.write(f'{model}: {count} filas actualizadas')
+        self.stdout.write(self.style.SUCCESS('root_project actualizado.'))
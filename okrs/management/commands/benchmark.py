@@ -0,0 +1,62 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from okrs.benchmark import BENCHMARK_ENDPOINTS, compare_reports, run_benchmark
+
+class Command(BaseCommand):
+    help = (
+        'Mide cada endpoint de la API con el cliente de pruebas de DRF (consultas, latencias p50/p95/p99 '
+        'y pico de memoria) y escribe un reporte JSON comparable entre commits'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Requests medidos por endpoint (por defecto 20)')
+        parser.add_argument('--output', help='Archivo donde escribir el reporte JSON')
+        parser.add_argument('--compare', help='Reporte JSON anterior contra el que comparar')
+        parser.add_argument(
+            '--endpoint', action='append', choices=[name for name, _, _ in BENCHMARK_ENDPOINTS],
+            help='Mide solo este endpoint (se puede repetir)'
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Muestra el plan (EXPLAIN) de tareas, comentarios y logs con el filtro de visibilidad anterior y el actual'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations debe ser al menos 1')
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as file:
+                    previous = json.load(file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'No se pudo leer {options["compare"]}: {exc}')
+
+        self.stdout.write(
+            f'{"endpoint":<16} {"status":>6} {"queries":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"pico KB":>9}'
+        )
+
+        def report(name, result):
+            self.stdout.write(
+                f'{name:<16} {result["status"]:>6} {result["queries"]:>8} {result["p50_ms"]:>8.1f} '
+                f'{result["p95_ms"]:>8.1f} {result["p99_ms"]:>8.1f} {result["peak_kb"]:>9.1f}'
+            )
+
+        try:
+            result = run_benchmark(options['iterations'], options['endpoint'], progress=report, plans=options['plans'])
+        except LookupError as exc:
+            raise CommandError(str(exc))
+
+        for model, plans in result.get('plans', {}).items():
+            for name, label in (('before', 'antes (caminos por la jerarquía)'), ('after', 'después (root_project)')):
+                self.stdout.write(f'\n{model}, {label}:\n{plans[name]}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(result, file, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Reporte escrito en {options["output"]}.'))
+
+        if previous is not None:
+            self.stdout.write(f'\n{"endpoint":<16} {"métrica":<8} {"antes":>10} {"después":>10} {"cambio":>8}')
+            for name, metric, before, after, change in compare_reports(previous, result):
+                self.stdout.write(f'{name:<16} {metric:<8} {before:>10} {after:>10} {change:>7}%')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from okrs.deletion import SUBTREE_LOOKUPS, delete_subtree
+
+MODELS = {model.__name__.lower(): model for model in SUBTREE_LOOKUPS}
+
+class Command(BaseCommand):
+    help = 'Borra nodos de la jerarquía con todo su subárbol usando una sentencia DELETE por tabla'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(MODELS), help='Tipo de nodo a borrar')
+        parser.add_argument('ids', nargs='+', type=int, help='Ids de los nodos a borrar')
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        ids = options['ids']
+        missing = set(ids) - set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        if missing:
+            raise CommandError(f'{model.__name__} no encontrados: {sorted(missing)}')
+
+        def report(step, total, name, count):
+            self.stdout.write(f'[{step}/{total}] {name}: {count} filas borradas')
+
+        summary = delete_subtree(model, ids, progress=report)
+        self.stdout.write(self.style.SUCCESS(f'{sum(summary.values())} filas borradas en total.'))
@@ -0,0 +1,35 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from okrs.export import EXPORT_FORMATS, export_lines
+from okrs.models import Project
+
+class Command(BaseCommand):
+    help = (
+        'Exporta la jerarquía de los proyectos (proyecto, épica, objetivo, OKR, actividad y tarea) '
+        'como filas planas en CSV o NDJSON, leyendo la base por partes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, action='append', help='Proyecto a exportar (se puede repetir; por defecto todos)')
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv', help='Formato (por defecto csv)')
+        parser.add_argument('--output', help='Archivo de salida (por defecto la salida estándar)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Filas por lectura (por defecto 2000)')
+
+    def handle(self, *args, **options):
+        project_ids = options['project']
+        if project_ids:
+            missing = set(project_ids) - set(Project.objects.filter(pk__in=project_ids).values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f'No existen los proyectos {sorted(missing)}')
+        lines = export_lines(options['format'], project_ids, options['chunk_size'])
+        if not options['output']:
+            sys.stdout.writelines(lines)
+            return
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8', newline='') as file:
+            for line in lines:
+                file.write(line)
+                count += 1
+        if options['format'] == 'csv':
+            count -= 1
+        self.stderr.write(self.style.SUCCESS(f'{count} filas exportadas a {options["output"]}.'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from users.models import Users
+from okrs.importer import ImportFormatError, get_file_type, import_okrs
+from okrs.models import Project
+
+class Command(BaseCommand):
+    help = (
+        'Importa objetivos, OKRs, actividades y tareas de un proyecto desde un JSON jerárquico '
+        'o un CSV plano, con inserciones masivas en una sola transacción'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo .json o .csv')
+        parser.add_argument('--project', type=int, required=True, help='Id del proyecto destino')
+        parser.add_argument('--user', required=True, help='Username al que se atribuye la importación y los nodos sin dueño')
+        parser.add_argument('--format', choices=['json', 'csv'], help='Formato del archivo (por defecto, según la extensión)')
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='No importa nada si alguna fila tiene errores.'
+        )
+
+    def handle(self, *args, **options):
+        project = Project.objects.filter(pk=options['project']).first()
+        if project is None:
+            raise CommandError(f'No existe el proyecto {options["project"]}')
+        actor = Users.objects.filter(user__username=options['user']).first()
+        if actor is None:
+            raise CommandError(f'No existe el usuario {options["user"]}')
+        try:
+            file_type = options['format'] or get_file_type(options['path'])
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                result = import_okrs(project, actor, stream, file_type, strict=options['strict'])
+        except (ImportFormatError, OSError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+
+        for error in result['errors']:
+            field = f' ({error["field"]})' if error['field'] else ''
+            self.stdout.write(f'{error["location"]}{field}: {error["error"]}')
+        created = ', '.join(f'{count} {name}' for name, count in result['created'].items())
+        if options['strict'] and result['errors']:
+            raise CommandError(f'{len(result["errors"])} errores; no se importó nada.')
+        self.stdout.write(self.style.SUCCESS(f'Importados: {created}. Errores: {len(result["errors"])}.'))
@@ -0,0 +1,83 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+from okrs.benchmark import BENCHMARK_ENDPOINTS, generate_dataset, get_benchmark_subjects
+
+# Endpoints de BENCHMARK_ENDPOINTS que tienen variante en /api/okrs/async/
+LOAD_TEST_ENDPOINTS = ('projects', 'project_detail', 'my_tasks', 'project_tasks')
+
+class Command(BaseCommand):
+    help = (
+        'Compara el rendimiento de las lecturas del dashboard entre un servidor WSGI '
+        '(vistas DRF) y uno ASGI (vistas /api/okrs/async/)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', default='http://127.0.0.1:8000', help='URL base del servidor WSGI ("" para omitirlo)')
+        parser.add_argument('--asgi', default='http://127.0.0.1:8001', help='URL base del servidor ASGI ("" para omitirlo)')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests simultáneos (por defecto 32)')
+        parser.add_argument('--requests', type=int, default=300, help='Requests por endpoint (por defecto 300)')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Crea antes N proyectos de prueba con okrs.benchmark.generate_dataset (como seed_benchmark)'
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            summary = generate_dataset(projects=options['seed'], prefix='loadtest')
+            self.stdout.write(self.style.SUCCESS(f'{summary["Task"]} tareas creadas en {summary["Project"]} proyectos.'))
+        # Los mismos usuarios y proyecto que mide benchmark
+        try:
+            profiles, project_id = get_benchmark_subjects()
+        except LookupError as exc:
+            raise CommandError(f'{exc}; use --seed para crear datos de prueba')
+
+        tokens = {role: str(AccessToken.for_user(profile.user)) for role, profile in profiles.items()}
+        endpoints = [
+            (role, path.format(project=project_id))
+            for name, role, path in BENCHMARK_ENDPOINTS if name in LOAD_TEST_ENDPOINTS
+        ]
+        targets = [('WSGI', options['wsgi'], '/api/okrs/'), ('ASGI', options['asgi'], '/api/okrs/async/')]
+
+        self.stdout.write(f'{"servidor":<8} {"endpoint":<40} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errores":>8}')
+        for label, base, prefix in targets:
+            if not base:
+                continue
+            for role, path in endpoints:
+                result = self.run(base.rstrip('/') + prefix + path, tokens[role], options['requests'], options['concurrency'])
+                self.stdout.write(
+                    f'{label:<8} {path:<40} {result["rps"]:>8.1f} {result["p50"]:>8.1f} '
+                    f'{result["p95"]:>8.1f} {result["errors"]:>8}'
+                )
+
+    def run(self, url, token, total, concurrency):
+        """Hace total requests GET a url con concurrency hilos y mide latencias"""
+        def fetch(_):
+            request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    ok = response.status == 200
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+            results = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for latency, ok in results if ok)
+        if not latencies:
+            return {'rps': 0, 'p50': 0, 'p95': 0, 'errors': total}
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0],
+            'errors': total - len(latencies),
+        }
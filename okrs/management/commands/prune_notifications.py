@@ -0,0 +1,29 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from okrs.jobs import enqueue, get_retention_days
+from okrs.notifications import prune, recount_unread
+
+class Command(BaseCommand):
+    help = 'Borra en lotes las notificaciones más antiguas que el período de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Días de retención (por defecto OKRS_NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Notificaciones por lote (por defecto 1000)')
+        parser.add_argument('--recount', action='store_true', help='Además recalcula los contadores de no leídas')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Encola la limpieza para run_workers en lugar de ejecutarla ahora.'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else get_retention_days()
+        if options['background']:
+            job = enqueue('prune_notifications', {'days': days, 'batch_size': options['batch_size']}, key='prune_notifications')
+            self.stdout.write(self.style.SUCCESS(f'Limpieza encolada (trabajo {job.pk}).'))
+            return
+
+        deleted = prune(timezone.now() - timedelta(days=days), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{deleted} notificaciones borradas.'))
+        if options['recount']:
+            self.stdout.write(self.style.SUCCESS(f'{recount_unread()} contadores corregidos.'))
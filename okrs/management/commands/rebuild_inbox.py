@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from okrs.inbox import rebuild
+
+class Command(BaseCommand):
+    help = 'Recalcula la bandeja materializada de tareas (TaskInbox) desde las tareas asignadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por lote (por defecto 1000)')
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} tareas en las bandejas.'))
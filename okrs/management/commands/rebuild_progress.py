@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from okrs.jobs import enqueue
+from okrs.rollups import rebuild
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los contadores de progreso y reporta las diferencias encontradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo reporta las diferencias, sin corregirlas. Termina con error si hay diferencias.'
+        )
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Encola la reconstrucción para run_workers en lugar de ejecutarla ahora.'
+        )
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = enqueue('rebuild_progress', key='rebuild_progress')
+            self.stdout.write(self.style.SUCCESS(f'Reconstrucción encolada (trabajo {job.pk}).'))
+            return
+
+        check = options['check']
+        drift = rebuild(commit=not check)
+        for model, pk, field, stored, expected in drift:
+            self.stdout.write(f'{model} {pk}: {field} = {stored}, esperado {expected}')
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Los contadores de progreso están al día.'))
+        elif check:
+            raise CommandError(f'{len(drift)} diferencias encontradas.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{len(drift)} diferencias corregidas.'))
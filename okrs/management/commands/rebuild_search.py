@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from okrs.search import get_backend, rebuild
+
+class Command(BaseCommand):
+    help = 'Recalcula el índice de búsqueda (SearchDocument y FTS5 o SearchTerm) desde los modelos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Documentos por lote (por defecto 1000)')
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} documentos indexados ({get_backend()}).'))
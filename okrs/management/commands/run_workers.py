@@ -0,0 +1,56 @@
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from okrs.jobs import run_pending
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos de la cola (okrs.Job) con un pool de hilos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Cantidad de hilos (por defecto 2)')
+        parser.add_argument('--interval', type=float, default=1.0, help='Segundos de espera cuando la cola está vacía')
+        parser.add_argument('--once', action='store_true', help='Vacía la cola y termina')
+
+    def handle(self, *args, **options):
+        counts = self.run_workers(max(options['workers'], 1), options['interval'], options['once'], threading.Event())
+        self.stdout.write(self.style.SUCCESS(f'{sum(counts)} trabajos ejecutados.'))
+
+    def run_workers(self, workers, interval, once, stop):
+        """
+        Corre workers hilos hasta que terminen (--once) o hasta que se active
+        stop. KeyboardInterrupt solo llega al hilo principal: Ctrl-C y SIGTERM
+        activan stop, cada hilo termina el trabajo en curso y se espera a todos.
+        Devuelve la cantidad de trabajos que corrió cada hilo.
+        """
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(self.work, interval, once, stop) for _ in range(workers)]
+                try:
+                    while wait(futures, timeout=0.5).not_done:
+                        pass
+                except KeyboardInterrupt:
+                    stop.set()
+                return [future.result() for future in futures]
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+
+    def work(self, interval, once, stop):
+        count = 0
+        try:
+            # Un trabajo por vuelta para revisar stop entre trabajos
+            while not stop.is_set():
+                ran = run_pending(limit=1)
+                count += ran
+                if not ran:
+                    if once:
+                        break
+                    stop.wait(interval)
+            return count
+        finally:
+            close_old_connections()
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from okrs.benchmark import DEFAULT_DEPTH, generate_dataset, parse_depth
+
+class Command(BaseCommand):
+    help = (
+        'Genera un conjunto de datos sintético (misiones con épicas, proyectos con objetivos directos, '
+        'tareas, logs, comentarios y miembros) con inserciones masivas, para correr benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=10, help='Proyectos a crear, mitad misiones (por defecto 10)')
+        parser.add_argument(
+            '--depth', default=','.join(map(str, DEFAULT_DEPTH)),
+            help='Épicas,objetivos,okrs,actividades,tareas por nodo padre (por defecto %(default)s)'
+        )
+        parser.add_argument('--users', type=int, default=20, help='Usuarios nuevos; el primero es admin (por defecto 20)')
+        parser.add_argument('--members', type=int, default=5, help='Miembros por proyecto además del dueño (por defecto 5)')
+        parser.add_argument('--logs-per-task', type=int, default=1, help='Logs por tarea (por defecto 1)')
+        parser.add_argument('--comments-per-task', type=int, default=1, help='Comentarios por tarea (por defecto 1)')
+        parser.add_argument('--seed', type=int, default=0, help='Semilla del generador (por defecto 0)')
+        parser.add_argument('--prefix', default='bench', help='Prefijo de los nombres de usuario (por defecto bench)')
+
+    def handle(self, *args, **options):
+        try:
+            depth = parse_depth(options['depth'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['projects'] < 1 or options['users'] < 2:
+            raise CommandError('Se necesitan al menos 1 proyecto y 2 usuarios')
+
+        def report(created, total):
+            self.stdout.write(f'{created}/{total} proyectos')
+
+        summary = generate_dataset(
+            projects=options['projects'], depth=depth, users=options['users'],
+            logs_per_task=options['logs_per_task'], comments_per_task=options['comments_per_task'],
+            members_per_project=options['members'], seed=options['seed'], prefix=options['prefix'], progress=report,
+        )
+        for name, count in summary.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'{summary["Task"]} tareas creadas en {summary["Project"]} proyectos.'))
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('okrs', '0008_projectmembers_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='tasks_completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='tasks_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='epic',
+            name='children_progress_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='epic',
+            name='children_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='epic',
+            name='progress',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='objective',
+            name='children_progress_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='objective',
+            name='children_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='objective',
+            name='progress',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='okr',
+            name='activities_completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='okr',
+            name='activities_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='children_progress_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='children_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='progress',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_root_project(apps, schema_editor):
+    # Mismos UPDATE que el comando backfill_root_project, sobre los modelos históricos
+    Epic, Objective, OKR, Activity, Task, Log, Comment = (
+        apps.get_model('okrs', name) for name in ('Epic', 'Objective', 'OKR', 'Activity', 'Task', 'Log', 'Comment')
+    )
+
+    def root_of(model, field_name, root_field='root_project_id'):
+        return Subquery(model.objects.filter(pk=OuterRef(field_name)).values(root_field)[:1])
+
+    Objective.objects.update(root_project_id=Coalesce(F('project_id'), root_of(Epic, 'epic_id', 'project_id')))
+    OKR.objects.update(root_project_id=root_of(Objective, 'objective_id'))
+    Activity.objects.update(root_project_id=root_of(OKR, 'okr_id'))
+    Task.objects.update(root_project_id=root_of(Activity, 'activity_id'))
+    Comment.objects.update(root_project_id=root_of(Task, 'task_id'))
+    Log.objects.update(root_project_id=Coalesce(
+        F('project_id'),
+        root_of(Epic, 'epic_id', 'project_id'),
+        root_of(Objective, 'objective_id'),
+        root_of(OKR, 'okr_id'),
+        root_of(Activity, 'activity_id'),
+        root_of(Task, 'task_id'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('okrs', '0009_progress_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='root_project',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='okrs.project'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='root_project',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='okrs.project'),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='root_project',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='okrs.project'),
+        ),
+        migrations.AddField(
+            model_name='objective',
+            name='root_project',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='okrs.project'),
+        ),
+        migrations.AddField(
+            model_name='okr',
+            name='root_project',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='okrs.project'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='root_project',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='okrs.project'),
+        ),
+        migrations.RunPython(backfill_root_project, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('okrs', '0013_job_queue'),
+        ('users', '0003_users_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('log_type', models.CharField(choices=[('Task Created', 'Task Created'), ('Task Updated', 'Task Updated'), ('Project Created', 'Project Created'), ('Epic Created', 'Epic Created'), ('Objective Created', 'Objective Created'), ('OKR Created', 'OKR Created'), ('Activity Created', 'Activity Created')], default='Task Created', max_length=255)),
+                ('message', models.CharField(max_length=255)),
+                ('read', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='okrs.project')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='users.users')),
+            ],
+            options={
+                'ordering': ['-created', '-id'],
+                'indexes': [models.Index(fields=['recipient', 'created', 'id'], name='notification_recipient_idx'), models.Index(fields=['created'], name='notification_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('okrs', '0014_notifications'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='log',
+            name='log_type',
+            field=models.CharField(choices=[('Task Created', 'Task Created'), ('Task Updated', 'Task Updated'), ('Task Deleted', 'Task Deleted'), ('Project Created', 'Project Created'), ('Project Updated', 'Project Updated'), ('Project Deleted', 'Project Deleted'), ('Epic Created', 'Epic Created'), ('Epic Updated', 'Epic Updated'), ('Epic Deleted', 'Epic Deleted'), ('Objective Created', 'Objective Created'), ('Objective Updated', 'Objective Updated'), ('Objective Deleted', 'Objective Deleted'), ('OKR Created', 'OKR Created'), ('OKR Updated', 'OKR Updated'), ('OKR Deleted', 'OKR Deleted'), ('Activity Created', 'Activity Created'), ('Activity Updated', 'Activity Updated'), ('Activity Deleted', 'Activity Deleted')], default='Task Created', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='log_type',
+            field=models.CharField(choices=[('Task Created', 'Task Created'), ('Task Updated', 'Task Updated'), ('Task Deleted', 'Task Deleted'), ('Project Created', 'Project Created'), ('Project Updated', 'Project Updated'), ('Project Deleted', 'Project Deleted'), ('Epic Created', 'Epic Created'), ('Epic Updated', 'Epic Updated'), ('Epic Deleted', 'Epic Deleted'), ('Objective Created', 'Objective Created'), ('Objective Updated', 'Objective Updated'), ('Objective Deleted', 'Objective Deleted'), ('OKR Created', 'OKR Created'), ('OKR Updated', 'OKR Updated'), ('OKR Deleted', 'OKR Deleted'), ('Activity Created', 'Activity Created'), ('Activity Updated', 'Activity Updated'), ('Activity Deleted', 'Activity Deleted')], default='Task Created', max_length=255),
+        ),
+    ]
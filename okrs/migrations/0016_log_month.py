@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:59
+
+import okrs.models
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def backfill_month(apps, schema_editor):
+    Log = apps.get_model('okrs', 'Log')
+    Log.objects.update(month=TruncMonth('created', output_field=models.DateField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('okrs', '0015_log_types_audit'),
+        ('users', '0003_users_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='month',
+            field=models.DateField(default=okrs.models.current_month, editable=False),
+        ),
+        migrations.RunPython(backfill_month, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['month', 'id'], name='log_month_id_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def rebuild_inbox(apps, schema_editor):
+    # Mismas filas que okrs.inbox.rebuild, sobre los modelos históricos
+    Task = apps.get_model('okrs', 'Task')
+    TaskInbox = apps.get_model('okrs', 'TaskInbox')
+    tasks = Task.objects.filter(assignee__isnull=False).select_related('activity').order_by('pk')
+    batch = []
+    for task in tasks.iterator(chunk_size=1000):
+        batch.append(TaskInbox(
+            task_id=task.pk, user_id=task.assignee_id, root_project_id=task.root_project_id,
+            activity_id=task.activity_id, title=task.title, status=task.status,
+            completion_percentage=task.completion_percentage, archived=task.archived,
+            due=task.activity.end_date, updated=task.updated,
+        ))
+        if len(batch) == 1000:
+            TaskInbox.objects.bulk_create(batch)
+            batch = []
+    TaskInbox.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('okrs', '0016_log_month'),
+        ('users', '0003_users_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskInbox',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inbox', serialize=False, to='okrs.task')),
+                ('title', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('backlog', 'Backlog'), ('in progress', 'In Progress'), ('completed', 'Completed')], max_length=255)),
+                ('completion_percentage', models.PositiveBigIntegerField(default=0)),
+                ('archived', models.BooleanField(default=False)),
+                ('due', models.DateField(blank=True, null=True)),
+                ('updated', models.DateTimeField()),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='okrs.activity')),
+                ('root_project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='okrs.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox', to='users.users')),
+            ],
+            options={
+                'ordering': ['-updated', '-task_id'],
+                'indexes': [models.Index(fields=['user', 'archived', 'updated'], name='inbox_user_updated_idx'), models.Index(fields=['user', 'archived', 'status', 'updated'], name='inbox_user_status_idx'), models.Index(fields=['user', 'archived', 'due'], name='inbox_user_due_idx')],
+            },
+        ),
+        migrations.RunPython(rebuild_inbox, migrations.RunPython.noop),
+    ]
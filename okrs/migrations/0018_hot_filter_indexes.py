@@ -0,0 +1,58 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('okrs', '0017_task_inbox'),
+        ('users', '0003_users_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['created'], name='activity_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['root_project', 'created', 'id'], name='comment_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='epic',
+            index=models.Index(fields=['created'], name='epic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['root_project', 'created', 'id'], name='log_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read', False)), fields=['recipient'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='objective',
+            index=models.Index(fields=['created'], name='objective_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='okr',
+            index=models.Index(fields=['created'], name='okr_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created'], name='project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['tipo', 'created'], name='project_tipo_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['activity', 'status'], name='task_activity_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['root_project', 'assignee'], name='task_project_assignee_idx'),
+        ),
+    ]
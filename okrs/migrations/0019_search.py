@@ -0,0 +1,157 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:24
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import OperationalError, migrations, models, transaction
+
+
+# Copia de okrs.search.FTS_SQL: la migración no debe depender del código actual
+FTS_SQL = [
+    "CREATE VIRTUAL TABLE okrs_search_fts USING fts5(title, content, content='okrs_searchdocument', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER okrs_search_fts_ai AFTER INSERT ON okrs_searchdocument BEGIN "
+    "INSERT INTO okrs_search_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER okrs_search_fts_ad AFTER DELETE ON okrs_searchdocument BEGIN "
+    "INSERT INTO okrs_search_fts(okrs_search_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER okrs_search_fts_au AFTER UPDATE OF title, content ON okrs_searchdocument BEGIN "
+    "INSERT INTO okrs_search_fts(okrs_search_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO okrs_search_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+
+def forget_backend(connection):
+    # okrs.search.get_backend guarda en la conexión si existe la tabla FTS
+    if hasattr(connection, 'okrs_has_fts'):
+        del connection.okrs_has_fts
+
+
+def create_fts(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=connection.alias):
+            for sql in FTS_SQL:
+                schema_editor.execute(sql)
+    except OperationalError:
+        # SQLite compilado sin FTS5: queda el índice de SearchTerm
+        pass
+    forget_backend(connection)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS okrs_search_fts_{name}')
+    schema_editor.execute('DROP TABLE IF EXISTS okrs_search_fts')
+    forget_backend(schema_editor.connection)
+
+
+# Tipo -> (campo del título, campo del contenido), como okrs.search.SEARCH_FIELDS
+SEARCH_FIELDS = {
+    'project': ('name', 'description'),
+    'epic': ('title', 'description'),
+    'objective': ('title', 'description'),
+    'okr': ('key_result', None),
+    'activity': ('name', 'description'),
+    'task': ('title', 'desc'),
+    'comment': (None, 'text'),
+}
+
+
+def tokenize(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return [term[:64] for term in re.findall(r'\w+', text)]
+
+
+def build_search(apps, schema_editor):
+    # Mismos documentos y términos que okrs.search.rebuild, sobre los modelos históricos
+    SearchDocument = apps.get_model('okrs', 'SearchDocument')
+    SearchTerm = apps.get_model('okrs', 'SearchTerm')
+    connection = schema_editor.connection
+    has_fts = connection.vendor == 'sqlite' and 'okrs_search_fts' in connection.introspection.table_names()
+    use_terms = getattr(settings, 'OKRS_SEARCH_BACKEND', None) == 'terms' or not has_fts
+    for kind, (title_field, content_field) in SEARCH_FIELDS.items():
+        model = apps.get_model('okrs', kind)
+        default = model._meta.get_field(content_field).default if content_field else None
+        batch = []
+        for instance in model.objects.order_by('pk').iterator(chunk_size=1000):
+            content = getattr(instance, content_field) if content_field else ''
+            root_project_id = instance.pk if kind == 'project' else (
+                instance.project_id if kind == 'epic' else instance.root_project_id
+            )
+            batch.append(SearchDocument(
+                kind=kind, root_project_id=root_project_id,
+                title=(getattr(instance, title_field) or '')[:255] if title_field else '',
+                # La descripción por defecto de las tareas no aporta a la búsqueda
+                content='' if content == default else content or '', **{f'{kind}_id': instance.pk},
+            ))
+            if len(batch) == 1000:
+                write_documents(batch, SearchDocument, SearchTerm, use_terms)
+                batch = []
+        write_documents(batch, SearchDocument, SearchTerm, use_terms)
+    if has_fts:
+        schema_editor.execute("INSERT INTO okrs_search_fts(okrs_search_fts) VALUES ('rebuild')")
+
+
+def write_documents(documents, SearchDocument, SearchTerm, use_terms):
+    documents = SearchDocument.objects.bulk_create(documents)
+    if not use_terms:
+        return
+    terms = []
+    for document in documents:
+        weights = {term: 1 for term in tokenize(document.content)}
+        weights.update((term, 2) for term in tokenize(document.title))
+        terms += [SearchTerm(term=term, document_id=document.pk, weight=weight) for term, weight in weights.items()]
+    SearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('okrs', '0018_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Proyecto'), ('epic', 'Épica'), ('objective', 'Objetivo'), ('okr', 'OKR'), ('activity', 'Actividad'), ('task', 'Tarea'), ('comment', 'Comentario')], max_length=20)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('content', models.TextField(blank=True)),
+                ('activity', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='okrs.activity')),
+                ('comment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='okrs.comment')),
+                ('epic', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='okrs.epic')),
+                ('objective', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='okrs.objective')),
+                ('okr', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='okrs.okr')),
+                ('project', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='okrs.project')),
+                ('root_project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='okrs.project')),
+                ('task', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='okrs.task')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='okrs.searchdocument')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchdocument',
+            index=models.Index(fields=['root_project', 'kind'], name='search_project_kind_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'document'], name='search_term_document_idx'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(build_search, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MaxValueValidator
 from colorfield.fields import ColorField
 from users.models import Users
@@ -12,16 +13,123 @@ TASK_STATUS = (
 LOG_TYPES = (
     ('Task Created', "Task Created"),
     ('Task Updated', "Task Updated"),
+    ('Task Deleted', "Task Deleted"),
     ('Project Created', "Project Created"),
+    ('Project Updated', "Project Updated"),
+    ('Project Deleted', "Project Deleted"),
     ('Epic Created', "Epic Created"),
+    ('Epic Updated', "Epic Updated"),
+    ('Epic Deleted', "Epic Deleted"),
     ('Objective Created', "Objective Created"),
+    ('Objective Updated', "Objective Updated"),
+    ('Objective Deleted', "Objective Deleted"),
     ('OKR Created', "OKR Created"),
+    ('OKR Updated', "OKR Updated"),
+    ('OKR Deleted', "OKR Deleted"),
     ('Activity Created', "Activity Created"),
+    ('Activity Updated', "Activity Updated"),
+    ('Activity Deleted', "Activity Deleted"),
 )
 
 PROGRESS_DICT = {'backlog': 0, 'in progress': 50, 'completed': 100}
 
-class Project(models.Model):
+def current_month():
+    """Primer día del mes actual: el valor de Log.month de los logs nuevos"""
+    return timezone.localdate().replace(day=1)
+
+def deletion_result(summary):
+    """Convierte el resumen de okrs.deletion al formato de Model.delete()"""
+    return sum(summary.values()), {f'okrs.{name}': count for name, count in summary.items()}
+
+class TrackedFieldsMixin:
+    """
+    Recuerda los valores de tracked_fields leídos de la BD para detectar al
+    guardar si el nodo cambió de padre. Los valores se renuevan después de
+    cada save(), una vez que las señales post_save ya los consultaron.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, (value for value in values if value is not models.DEFERRED)))
+        instance._loaded_values = {name: loaded[name] for name in cls.tracked_fields if name in loaded}
+        return instance
+
+    def get_loaded_value(self, name, default=None):
+        return getattr(self, '_loaded_values', {}).get(name, default)
+
+    def has_loaded_value(self, name):
+        return name in getattr(self, '_loaded_values', {})
+
+    def has_moved(self):
+        return any(
+            self.get_loaded_value(name, getattr(self, name)) != getattr(self, name)
+            for name in self.tracked_fields
+        )
+
+    def reset_loaded_values(self):
+        self._loaded_values = {name: getattr(self, name) for name in self.tracked_fields}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.reset_loaded_values()
+
+class RollupMixin(TrackedFieldsMixin):
+    """
+    Soporte para los contadores de progreso que mantiene okrs.rollups: evita
+    que un save() normal sobrescriba los campos de rollup_fields con valores
+    desactualizados. Lo mismo vale para update_only_fields, otros campos
+    que solo se escriben con queryset.update().
+    """
+    rollup_fields = ()
+    update_only_fields = ()
+
+    def save(self, *args, **kwargs):
+        protected_fields = self.rollup_fields + self.update_only_fields
+        if not self._state.adding and kwargs.get('update_fields') is None and protected_fields:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in protected_fields
+            ]
+        super().save(*args, **kwargs)
+
+class RootProjectMixin(TrackedFieldsMixin):
+    """
+    Mantiene root_project, el proyecto raíz desnormalizado del nodo, para
+    filtrar la visibilidad con root_project__in en lugar de recorrer la
+    jerarquía. Se toma del primer padre no nulo de root_parent_fields y, si
+    el nodo cambia de proyecto, se propaga a sus descendientes.
+    """
+    root_parent_fields = ()
+
+    def resolve_root_project_id(self):
+        for name in self.root_parent_fields:
+            field = self._meta.get_field(name)
+            parent_id = getattr(self, field.attname)
+            if parent_id is None:
+                continue
+            if field.related_model is Project:
+                return parent_id
+            root_attname = 'project_id' if field.related_model is Epic else 'root_project_id'
+            if field.is_cached(self):
+                return getattr(getattr(self, name), root_attname)
+            return field.related_model.objects.filter(pk=parent_id).values_list(root_attname, flat=True).first()
+        return None
+
+    def has_new_parent(self):
+        attnames = [self._meta.get_field(name).attname for name in self.root_parent_fields]
+        return any(self.get_loaded_value(name, getattr(self, name)) != getattr(self, name) for name in attnames)
+
+    def save(self, *args, **kwargs):
+        old_root_project_id = self.root_project_id
+        if self._state.adding or self.root_project_id is None or self.has_new_parent():
+            self.root_project_id = self.resolve_root_project_id()
+        super().save(*args, **kwargs)
+        if old_root_project_id is not None and old_root_project_id != self.root_project_id:
+            propagate_root_project(type(self), [self.pk], self.root_project_id)
+
+class Project(RollupMixin, models.Model):
     TIPO_CHOICES = (
         ('mision', 'Misión'),
         ('proyecto', 'Proyecto'),
@@ -34,11 +142,23 @@ class Project(models.Model):
     end_date = models.DateField(null=True, blank=True)
     color = ColorField(default='#FF5733')
     tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, default='mision')
+    progress = models.IntegerField(default=0)
+    children_total = models.PositiveIntegerField(default=0)
+    children_progress_sum = models.PositiveIntegerField(default=0)
+    # Se incrementa con cada cambio en el proyecto o en su árbol (ver bump_revisions)
+    revision = models.PositiveBigIntegerField(default=0, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    rollup_fields = ('progress', 'children_total', 'children_progress_sum')
+    update_only_fields = ('revision',)
+
     class Meta:
         ordering = ['created']
+        indexes = [
+            models.Index(fields=['created'], name='project_created_idx'),
+            models.Index(fields=['tipo', 'created'], name='project_tipo_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.get_tipo_display()})"
@@ -113,16 +233,23 @@ class ProjectMembers(models.Model):
         """Verifica si el miembro puede asignar tareas"""
         return self.role in ['owner', 'manager']
 
-class Epic(models.Model):
+class Epic(RollupMixin, models.Model):
     project = models.ForeignKey(Project, related_name='epics', on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     description = models.TextField(max_length=2000, blank=True)
     owner = models.ForeignKey(Users, related_name='epics', on_delete=models.CASCADE)
+    progress = models.IntegerField(default=0)
+    children_total = models.PositiveIntegerField(default=0)
+    children_progress_sum = models.PositiveIntegerField(default=0)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    tracked_fields = ('project_id',)
+    rollup_fields = ('progress', 'children_total', 'children_progress_sum')
+
     class Meta:
         ordering = ['-created']
+        indexes = [models.Index(fields=['created'], name='epic_created_idx')]
         verbose_name = 'Epic'
         verbose_name_plural = 'Epics'
     
@@ -134,24 +261,38 @@ class Epic(models.Model):
 
     def delete(self, *args, **kwargs):
         try:
-            # Primero eliminamos todos los objetivos asociados
-            for objective in self.objectives.all():
-                objective.delete()
-            super().delete(*args, **kwargs)
+            # Borra la épica con todo su subárbol en sentencias por tabla
+            from .deletion import delete_subtree
+            return deletion_result(delete_subtree(Epic, [self.pk]))
         except Exception as e:
             raise Exception(f"Error al eliminar la épica: {str(e)}")
 
-class Objective(models.Model):
+    def save(self, *args, **kwargs):
+        moved = not self._state.adding and self.has_moved()
+        super().save(*args, **kwargs)
+        if moved:
+            propagate_root_project(Epic, [self.pk], self.project_id)
+
+class Objective(RootProjectMixin, RollupMixin, models.Model):
     epic = models.ForeignKey(Epic, related_name='objectives', on_delete=models.CASCADE, null=True, blank=True)
     project = models.ForeignKey(Project, related_name='objectives', on_delete=models.CASCADE, null=True, blank=True)
+    root_project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, null=True, blank=True, editable=False)
     title = models.CharField(max_length=255)
     description = models.TextField(max_length=2000, blank=True)
     owner = models.ForeignKey(Users, related_name='objectives', on_delete=models.CASCADE)
+    progress = models.IntegerField(default=0)
+    children_total = models.PositiveIntegerField(default=0)
+    children_progress_sum = models.PositiveIntegerField(default=0)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+
+    tracked_fields = ('epic_id', 'project_id', 'root_project_id')
+    root_parent_fields = ('project', 'epic')
+    rollup_fields = ('progress', 'children_total', 'children_progress_sum')
     
     class Meta:
         ordering = ['created']
+        indexes = [models.Index(fields=['created'], name='objective_created_idx')]
     
     def __str__(self):
         return self.title
@@ -159,30 +300,29 @@ class Objective(models.Model):
     def get_okrs_num(self):
         return self.okrs.all().count()
 
-class OKR(models.Model):
+class OKR(RootProjectMixin, RollupMixin, models.Model):
     objective = models.ForeignKey(Objective, on_delete=models.CASCADE, related_name='okrs')
+    root_project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, null=True, blank=True, editable=False)
     key_result = models.CharField(max_length=200)
     current_value = models.IntegerField(default=0)
     target_value = models.IntegerField(default=100)
     progress = models.IntegerField(default=0)
+    activities_total = models.PositiveIntegerField(default=0)
+    activities_completed = models.PositiveIntegerField(default=0)
     owner = models.ForeignKey(Users, on_delete=models.CASCADE)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     tasks = models.ManyToManyField('Task', related_name='okrs', blank=True)
 
+    tracked_fields = ('objective_id', 'root_project_id')
+    root_parent_fields = ('objective',)
+    rollup_fields = ('current_value', 'progress', 'activities_total', 'activities_completed')
+
     def calculate_progress(self):
-        activities = self.activities.all()
-        if not activities.exists():
-            self.progress = 0
-            self.current_value = 0
-            self.save()
-            return 0
-        total_activities = activities.count()
-        completed_activities = activities.filter(tasks__status='completed').distinct().count()
-        progress = (completed_activities / total_activities) * 100 if total_activities > 0 else 0
-        self.progress = round(progress)
-        self.current_value = round(progress)
-        self.save()
+        """Recalcula el progreso desde las tareas y lo propaga hacia arriba"""
+        from .rollups import recount_okr
+        recount_okr(self.pk)
+        self.refresh_from_db(fields=list(self.rollup_fields))
         return self.progress
 
     def __str__(self):
@@ -190,21 +330,30 @@ class OKR(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [models.Index(fields=['created'], name='okr_created_idx')]
         verbose_name = 'OKR'
         verbose_name_plural = 'OKRs'
 
-class Activity(models.Model):
+class Activity(RootProjectMixin, RollupMixin, models.Model):
     okr = models.ForeignKey(OKR, related_name='activities', on_delete=models.CASCADE)
+    root_project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, null=True, blank=True, editable=False)
     name = models.CharField(max_length=255)
     description = models.TextField(max_length=2000, blank=True)
     owner = models.ForeignKey(Users, related_name='activities', on_delete=models.CASCADE)
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
+    tasks_total = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+
+    tracked_fields = ('okr_id', 'root_project_id', 'end_date')
+    root_parent_fields = ('okr',)
+    rollup_fields = ('tasks_total', 'tasks_completed')
     
     class Meta:
         ordering = ['-created']
+        indexes = [models.Index(fields=['created'], name='activity_created_idx')]
         verbose_name = 'Activity'
         verbose_name_plural = 'Activities'
     
@@ -214,26 +363,35 @@ class Activity(models.Model):
     def get_tasks_num(self):
         return self.tasks.all().count()
 
-    def calculate_progress(self):
-        tasks = self.tasks.all()
-        if not tasks.exists():
+    @property
+    def progress(self):
+        """Porcentaje de tareas completadas, desde los contadores de la fila"""
+        if self.tasks_total == 0:
             return 0
-        total_tasks = tasks.count()
-        completed_tasks = tasks.filter(status='completed').count()
-        progress = (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0
-        return round(progress)
+        return round(self.tasks_completed * 100 / self.tasks_total)
+
+    def calculate_progress(self, recount=False):
+        """
+        Devuelve el progreso usando los contadores ya cargados, sin consultas.
+        Con recount=True los recalcula antes desde las tareas.
+        """
+        if recount:
+            from .rollups import recount_activity
+            recount_activity(self.pk)
+            self.refresh_from_db(fields=list(self.rollup_fields))
+        return self.progress
 
     def delete(self, *args, **kwargs):
         try:
-            # Primero eliminamos todas las tareas asociadas
-            for task in self.tasks.all():
-                task.delete()
-            super().delete(*args, **kwargs)
+            # Borra la actividad con sus tareas en sentencias por tabla
+            from .deletion import delete_subtree
+            return deletion_result(delete_subtree(Activity, [self.pk]))
         except Exception as e:
             raise Exception(f"Error al eliminar la actividad: {str(e)}")
 
-class Task(models.Model):
+class Task(RootProjectMixin, RollupMixin, models.Model):
     activity = models.ForeignKey(Activity, related_name='tasks', on_delete=models.CASCADE)
+    root_project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, null=True, blank=True, editable=False)
     title = models.CharField(max_length=255, default="No Title")
     desc = models.TextField(max_length=2000, default="No description")
     assignee = models.ForeignKey(Users, related_name='tasks', on_delete=models.CASCADE, null=True)
@@ -244,8 +402,18 @@ class Task(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    tracked_fields = ('activity_id', 'status', 'root_project_id', 'assignee_id')
+    root_parent_fields = ('activity',)
+
     class Meta:
         ordering = ['created']
+        indexes = [
+            models.Index(fields=['created', 'id'], name='task_created_id_idx'),
+            # Conteos por estado de rollups.recount_activity (cubiertos por el índice)
+            models.Index(fields=['activity', 'status'], name='task_activity_status_idx'),
+            # project_tasks de un empleado
+            models.Index(fields=['root_project', 'assignee'], name='task_project_assignee_idx'),
+        ]
     
     def __str__(self):
         return f"Task-{self.id}"
@@ -285,31 +453,218 @@ class Task(models.Model):
         
         return False
 
-class Log(models.Model):
+class Log(RootProjectMixin, models.Model):
     project = models.ForeignKey(Project, related_name='logs', on_delete=models.CASCADE, null=True, blank=True)
     epic = models.ForeignKey(Epic, related_name='logs', on_delete=models.CASCADE, null=True, blank=True)  # Nuevo
     objective = models.ForeignKey(Objective, related_name='logs', on_delete=models.CASCADE, null=True, blank=True)
     okr = models.ForeignKey(OKR, related_name='logs', on_delete=models.CASCADE, null=True, blank=True)
     activity = models.ForeignKey(Activity, related_name='logs', on_delete=models.CASCADE, null=True, blank=True)
     task = models.ForeignKey(Task, related_name='logs', on_delete=models.CASCADE, null=True, blank=True)
+    root_project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, null=True, blank=True, editable=False)
     user = models.ForeignKey(Users, related_name='logs', on_delete=models.CASCADE, null=True) 
     log_text = models.CharField(max_length=255)
     log_type = models.CharField(max_length=255, choices=LOG_TYPES, default="Task Created")
     log_color = ColorField(default='#955251')
     created = models.DateTimeField(auto_now_add=True)
+    # Mes del log (día 1): agrupa la tabla para archivar meses completos (ver okrs.archive)
+    month = models.DateField(default=current_month, editable=False)
+
+    tracked_fields = ('project_id', 'epic_id', 'objective_id', 'okr_id', 'activity_id', 'task_id', 'root_project_id')
+    root_parent_fields = ('project', 'epic', 'objective', 'okr', 'activity', 'task')
 
     class Meta:
         ordering = ['created']
+        indexes = [
+            models.Index(fields=['created', 'id'], name='log_created_id_idx'),
+            models.Index(fields=['month', 'id'], name='log_month_id_idx'),
+            # Historial de los proyectos de un empleado, en el orden de la paginación
+            models.Index(fields=['root_project', 'created', 'id'], name='log_project_created_idx'),
+        ]
     
     def __str__(self):
         return f"Log-{self.id}"
 
-class Comment(models.Model):
+class Notification(models.Model):
+    """Aviso de un Log para un miembro del proyecto (ver okrs.notifications)"""
+    recipient = models.ForeignKey(Users, related_name='notifications', on_delete=models.CASCADE)
+    project = models.ForeignKey(Project, related_name='notifications', on_delete=models.CASCADE, null=True, blank=True)
+    log_type = models.CharField(max_length=255, choices=LOG_TYPES, default="Task Created")
+    message = models.CharField(max_length=255)
+    read = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created', '-id']
+        indexes = [
+            models.Index(fields=['recipient', 'created', 'id'], name='notification_recipient_idx'),
+            models.Index(fields=['created'], name='notification_created_idx'),
+            # Solo las no leídas: mark_read y los descuentos del contador
+            models.Index(fields=['recipient'], condition=models.Q(read=False), name='notification_unread_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notification-{self.id}"
+
+class TaskInbox(models.Model):
+    """
+    Bandeja materializada de tareas por asignado: una fila por tarea asignada
+    con lo necesario para listarla sin joins. La mantiene okrs.inbox.
+    """
+    task = models.OneToOneField(Task, related_name='inbox', on_delete=models.CASCADE, primary_key=True)
+    user = models.ForeignKey(Users, related_name='inbox', on_delete=models.CASCADE)
+    root_project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, null=True, blank=True)
+    activity = models.ForeignKey(Activity, related_name='+', on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+    status = models.CharField(max_length=255, choices=TASK_STATUS)
+    completion_percentage = models.PositiveBigIntegerField(default=0)
+    archived = models.BooleanField(default=False)
+    # Fecha de fin de la actividad de la tarea
+    due = models.DateField(null=True, blank=True)
+    updated = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-updated', '-task_id']
+        indexes = [
+            models.Index(fields=['user', 'archived', 'updated'], name='inbox_user_updated_idx'),
+            models.Index(fields=['user', 'archived', 'status', 'updated'], name='inbox_user_status_idx'),
+            models.Index(fields=['user', 'archived', 'due'], name='inbox_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"TaskInbox-{self.task_id}"
+
+class Comment(RootProjectMixin, models.Model):
     task = models.ForeignKey(Task, related_name='comments', on_delete=models.CASCADE)
+    root_project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, null=True, blank=True, editable=False)
     user = models.ForeignKey(Users, related_name='comments', on_delete=models.CASCADE, null=True) 
     text = models.TextField(max_length=1250, blank=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+
+    tracked_fields = ('task_id', 'root_project_id')
+    root_parent_fields = ('task',)
+
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(fields=['created', 'id'], name='comment_created_id_idx'),
+            models.Index(fields=['root_project', 'created', 'id'], name='comment_project_created_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.text[:20]}..."
\ No newline at end of file
+        return f"{self.text[:20]}..."
+
+class SearchDocument(models.Model):
+    """
+    Texto buscable de un nodo de la jerarquía o comentario: una fila por
+    objeto, con el FK del objeto en el campo de su tipo. La mantiene
+    okrs.search; en SQLite la tabla FTS5 okrs_search_fts la indexa con
+    triggers.
+    """
+    KIND_CHOICES = (
+        ('project', 'Proyecto'),
+        ('epic', 'Épica'),
+        ('objective', 'Objetivo'),
+        ('okr', 'OKR'),
+        ('activity', 'Actividad'),
+        ('task', 'Tarea'),
+        ('comment', 'Comentario'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    project = models.OneToOneField(Project, related_name='search_document', on_delete=models.CASCADE, null=True, blank=True)
+    epic = models.OneToOneField(Epic, related_name='search_document', on_delete=models.CASCADE, null=True, blank=True)
+    objective = models.OneToOneField(Objective, related_name='search_document', on_delete=models.CASCADE, null=True, blank=True)
+    okr = models.OneToOneField(OKR, related_name='search_document', on_delete=models.CASCADE, null=True, blank=True)
+    activity = models.OneToOneField(Activity, related_name='search_document', on_delete=models.CASCADE, null=True, blank=True)
+    task = models.OneToOneField(Task, related_name='search_document', on_delete=models.CASCADE, null=True, blank=True)
+    comment = models.OneToOneField(Comment, related_name='search_document', on_delete=models.CASCADE, null=True, blank=True)
+    root_project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, null=True, blank=True)
+    title = models.CharField(max_length=255, blank=True)
+    content = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['root_project', 'kind'], name='search_project_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"SearchDocument-{self.kind}-{self.id}"
+
+class SearchTerm(models.Model):
+    """
+    Índice invertido portable (sin FTS5): un término normalizado por
+    documento, con peso 2 si aparece en el título.
+    """
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, related_name='terms', on_delete=models.CASCADE)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'document'], name='search_term_document_idx'),
+        ]
+
+    def __str__(self):
+        return self.term
+
+class Job(models.Model):
+    """
+    Trabajo diferido de la cola de okrs.jobs. key deduplica: solo puede
+    haber un trabajo pendiente por clave.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pendiente'),
+        ('running', 'En ejecución'),
+        ('done', 'Completado'),
+        ('failed', 'Fallido'),
+    )
+
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=255, null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    progress = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_by = models.ForeignKey(Users, related_name='jobs', on_delete=models.SET_NULL, null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx')]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status='pending'), name='unique_pending_job_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+# Hijos directos de cada nodo que guardan root_project, con el campo que los une al padre
+ROOT_PROJECT_CHILDREN = {
+    Epic: [(Objective, 'epic'), (Log, 'epic'), (SearchDocument, 'epic')],
+    Objective: [(OKR, 'objective'), (Log, 'objective'), (SearchDocument, 'objective')],
+    OKR: [(Activity, 'okr'), (Log, 'okr'), (SearchDocument, 'okr')],
+    Activity: [(Task, 'activity'), (Log, 'activity'), (SearchDocument, 'activity')],
+    Task: [(Comment, 'task'), (Log, 'task'), (TaskInbox, 'task'), (SearchDocument, 'task')],
+    Comment: [(SearchDocument, 'comment')],
+}
+
+def propagate_root_project(model, pks, root_project_id):
+    """Actualiza root_project de todos los descendientes de los nodos indicados"""
+    for child_model, field_name in ROOT_PROJECT_CHILDREN.get(model, []):
+        children = child_model.objects.filter(**{f'{field_name}__in': pks})
+        children.update(root_project_id=root_project_id)
+        if child_model in ROOT_PROJECT_CHILDREN:
+            propagate_root_project(child_model, children.values('pk'), root_project_id)
+
+def bump_revisions(project_ids):
+    """Incrementa la revisión de los proyectos indicados"""
+    project_ids = {pk for pk in project_ids if pk is not None}
+    if project_ids:
+        Project.objects.filter(pk__in=project_ids).update(revision=models.F('revision') + 1)
@@ -0,0 +1,89 @@
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from users.models import Users
+from .models import ProjectMembers, Notification
+from . import events
+
+# Sección: Notificaciones
+# Cada Log se reparte como Notification a los miembros de su proyecto (salvo
+# al autor) con un bulk_create. Users.unread_notifications guarda cuántas
+# tiene sin leer cada usuario, así el contador del badge sale de la fila del
+# perfil ya cargada en el request. Toda operación que crea, lee o borra
+# notificaciones ajusta el contador con un UPDATE por valor de delta.
+
+def apply_unread_deltas(deltas):
+    """Suma a unread_notifications el delta de cada usuario ({user_id: delta})"""
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        Users.objects.filter(pk__in=user_ids).update(
+            unread_notifications=Greatest(F('unread_notifications') + delta, Value(0))
+        )
+
+def notify(logs):
+    """Crea las notificaciones de los logs y devuelve la lista creada"""
+    logs = [log for log in logs if log.root_project_id]
+    if not logs:
+        return []
+    members = defaultdict(set)
+    memberships = ProjectMembers.objects.filter(project__in={log.root_project_id for log in logs})
+    for project_id, user_id in memberships.values_list('project_id', 'user_id'):
+        members[project_id].add(user_id)
+
+    notifications = [
+        Notification(recipient_id=user_id, project_id=log.root_project_id, log_type=log.log_type, message=log.log_text)
+        for log in logs for user_id in sorted(members[log.root_project_id]) if user_id != log.user_id
+    ]
+    if not notifications:
+        return []
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, batch_size=500)
+        apply_unread_deltas(Counter(notification.recipient_id for notification in notifications))
+    if events.get_broker().is_active():
+        events.emit({'type': 'notification', 'action': 'created'}, user_ids={n.recipient_id for n in notifications})
+    return notifications
+
+def mark_read(recipient, pks=None):
+    """Marca como leídas las notificaciones indicadas (o todas) con un solo UPDATE"""
+    queryset = Notification.objects.filter(recipient=recipient, read=False)
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    with transaction.atomic():
+        count = queryset.update(read=True)
+        apply_unread_deltas({recipient.pk: -count})
+    return count
+
+def delete_notifications(queryset):
+    """Borra las notificaciones de queryset descontando las no leídas. Devuelve cuántas borró"""
+    with transaction.atomic():
+        unread = queryset.filter(read=False).values('recipient').annotate(count=Count('pk')).order_by()
+        apply_unread_deltas({row['recipient']: -row['count'] for row in unread})
+        return queryset._raw_delete(queryset.db)
+
+def discard_project(project_ids):
+    """Borra las notificaciones de proyectos que se están borrando"""
+    return delete_notifications(Notification.objects.filter(project__in=project_ids))
+
+def prune(before, batch_size=1000):
+    """
+    Borra las notificaciones creadas antes de before en lotes de batch_size,
+    cada uno en su propia transacción. Devuelve cuántas borró.
+    """
+    total = 0
+    while True:
+        pks = list(Notification.objects.filter(created__lt=before).order_by('created').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return total
+        total += delete_notifications(Notification.objects.filter(pk__in=pks))
+
+def recount_unread():
+    """Recalcula unread_notifications de todos los usuarios desde la tabla (reparación)"""
+    unread = Notification.objects.filter(recipient=OuterRef('pk'), read=False).values('recipient')
+    unread = unread.annotate(count=Count('pk')).values('count')
+    return Users.objects.exclude(
+        unread_notifications=Coalesce(Subquery(unread), 0)
+    ).update(unread_notifications=Coalesce(Subquery(unread), 0))
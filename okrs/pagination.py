@@ -0,0 +1,94 @@
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+
+# Sección: Paginación
+class CreatedCursorPagination(CursorPagination):
+    """
+    Paginación por cursor sobre (created, id) para las tablas que más crecen.
+    Cada página es un rango sobre el índice (created, id), sin OFFSET ni
+    COUNT(*). El total solo se calcula si se pide con ?count=true.
+
+    DRF solo guarda en el cursor el primer campo del orden y desempata con un
+    OFFSET; aquí la posición lleva todos los campos ("created|id"), así que
+    las filas con el mismo created se parten por id y el offset es siempre 0.
+    """
+    ordering = ('created', 'id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (self.cursor.reverse, self.cursor.position) if self.cursor else (False, None)
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = self._get_position_from_instance(results[-1], self.ordering) if len(results) > self.page_size else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following is not None, following
+        else:
+            self.has_next, self.next_position = following is not None, following
+            self.has_previous, self.previous_position = position is not None, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def position_filter(self, position, reverse):
+        """
+        Filas estrictamente después de position en el orden de la página:
+        (a > x) OR (a = x AND b > y) para ordering (a, b).
+        """
+        values = position.split('|')
+        condition, equal = Q(), Q()
+        for field, value in zip(self.ordering, values):
+            attr = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= equal & Q(**{f'{attr}__{lookup}': value})
+            equal &= Q(**{attr: value})
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        get = instance.get if isinstance(instance, dict) else instance.__getattribute__
+        return '|'.join(str(get(field.lstrip('-'))) for field in ordering)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = {'count': self.count, **response.data}
+        return response
+
+class RecentFirstCursorPagination(CreatedCursorPagination):
+    """La misma paginación, de la más reciente a la más antigua"""
+    ordering = ('-created', '-id')
+
+class InboxCursorPagination(CreatedCursorPagination):
+    """Bandeja de tareas, de la modificada más recientemente a la más antigua"""
+    ordering = ('-updated', '-task_id')
+
+class SearchPagination(PageNumberPagination):
+    """
+    Resultados de búsqueda por página: vienen ordenados por relevancia, no
+    por (created, id), así que se pagina con LIMIT/OFFSET.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,324 +1,214 @@
 from rest_framework import permissions
 from users.models import Users
 
-class IsAdminOrManager(permissions.BasePermission):
+# Sección: Contexto de autorización
+class AuthorizationContext:
+    """
+    Perfil del usuario y sus roles en cada proyecto, cargados una sola vez
+    por request. Los permisos y las vistas responden desde memoria.
+    """
+    def __init__(self, user, memberships=None, profile=None):
+        self.user = user
+        # Una sola consulta trae las membresías junto con el perfil; solo si
+        # el usuario no pertenece a ningún proyecto se busca el perfil aparte.
+        if memberships is None:
+            memberships = list(self.get_memberships(user))
+            if not memberships:
+                profile = Users.objects.filter(user_id=user.pk).first()
+        self.profile = memberships[0].user if memberships else profile
+        self.roles = {member.project_id: member.role for member in memberships}
+        if self.profile is not None:
+            self.profile.user = user
+            user.users = self.profile
+
+    @staticmethod
+    def get_memberships(user):
+        from .models import ProjectMembers
+        return ProjectMembers.objects.filter(user__user_id=user.pk).select_related('user')
+
+    @classmethod
+    async def aload(cls, user):
+        """Igual que el constructor, pero con el ORM asíncrono"""
+        memberships = [member async for member in cls.get_memberships(user)]
+        profile = None
+        if not memberships:
+            profile = await Users.objects.filter(user_id=user.pk).afirst()
+        return cls(user, memberships, profile)
+
+    @property
+    def project_ids(self):
+        return set(self.roles)
+
+    def has_global_role(self, *roles):
+        return self.profile is not None and self.profile.role in roles
+
+    def get_role(self, project_id):
+        """Obtiene el rol del usuario en el proyecto, o None si no es miembro"""
+        if project_id is None:
+            return None
+        try:
+            return self.roles.get(int(project_id))
+        except (TypeError, ValueError):
+            return None
+
+    def is_member(self, project_id):
+        return self.get_role(project_id) is not None
+
+    def has_project_role(self, project_id, roles):
+        return self.get_role(project_id) in roles
+
+def get_authorization_context(request):
+    """Devuelve el contexto de autorización del request, creándolo la primera vez"""
+    http_request = getattr(request, '_request', request)
+    context = getattr(http_request, 'authorization_context', None)
+    if context is None or context.user.pk != request.user.pk:
+        context = AuthorizationContext(request.user)
+        http_request.authorization_context = context
+    return context
+
+# Campo con el id del proyecto raíz de cada modelo de la jerarquía
+PROJECT_FIELDS = {
+    'Epic': 'project_id',
+    'Objective': 'root_project_id',
+    'OKR': 'root_project_id',
+    'Activity': 'root_project_id',
+    'Task': 'root_project_id',
+}
+
+def resolve_project_id(model, pk):
+    """Obtiene con una sola consulta el id del proyecto raíz de un objeto"""
+    try:
+        return model.objects.filter(pk=pk).values_list(PROJECT_FIELDS[model.__name__], flat=True).first()
+    except (TypeError, ValueError):
+        return None
+
+# Sección: Permisos
+class ProjectRolePermission(permissions.BasePermission):
     """
-    Permite acceso solo a administradores y managers.
+    Base para los permisos que dependen del rol en el proyecto. Los roles
+    globales en global_roles pasan siempre; el resto necesita uno de
+    project_roles en el proyecto que devuelve get_project_id.
     """
+    global_roles = ('admin',)
+    project_roles = ()
+
+    def get_project_id(self, request, view):
+        return None
+
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            return user_profile.role in ['admin', 'manager']
-        except Users.DoesNotExist:
+
+        context = get_authorization_context(request)
+        if context.profile is None:
+            return False
+        if context.has_global_role(*self.global_roles):
+            return True
+
+        project_id = self.get_project_id(request, view)
+        if not project_id:
             return False
+        return context.has_project_role(project_id, self.project_roles)
 
-class IsProjectMember(permissions.BasePermission):
+class IsAdminOrManager(permissions.BasePermission):
     """
-    Permite acceso solo a miembros del proyecto.
+    Permite acceso solo a administradores y managers.
     """
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        
-        # Los admins pueden acceder a todo
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            if user_profile.role == 'admin':
-                return True
-        except Users.DoesNotExist:
-            return False
-        
-        # Para otros usuarios, verificar si son miembros del proyecto
-        project_id = request.data.get('project') or request.query_params.get('project')
-        if not project_id:
-            return False
-        
-        try:
-            from .models import Project
-            project = Project.objects.get(id=project_id)
-            return project.is_member(user_profile)
-        except Project.DoesNotExist:
-            return False
+        return get_authorization_context(request).has_global_role('admin', 'manager')
+
+class IsProjectMember(ProjectRolePermission):
+    """
+    Permite acceso solo a miembros del proyecto.
+    """
+    project_roles = ('owner', 'manager', 'member', 'viewer')
+
+    def get_project_id(self, request, view):
+        return request.data.get('project') or request.query_params.get('project')
 
-class CanEditProject(permissions.BasePermission):
+class CanEditProject(ProjectRolePermission):
     """
     Permite editar proyectos solo a owners y managers del proyecto.
     """
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        
-        # Los admins pueden editar cualquier proyecto
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            if user_profile.role == 'admin':
-                return True
-        except Users.DoesNotExist:
-            return False
-        
-        # Para otros usuarios, verificar permisos específicos del proyecto
-        project_id = request.data.get('project') or request.query_params.get('project')
-        if not project_id:
-            return False
-        
-        try:
-            from .models import Project
-            project = Project.objects.get(id=project_id)
-            if not project.is_member(user_profile):
-                return False
-            
-            member_role = project.get_member_role(user_profile)
-            return member_role in ['owner', 'manager']
-        except Project.DoesNotExist:
-            return False
+    project_roles = ('owner', 'manager')
+
+    def get_project_id(self, request, view):
+        return request.data.get('project') or request.query_params.get('project')
 
-class CanCreateEpics(permissions.BasePermission):
+class CanCreateEpics(ProjectRolePermission):
     """
     Permite crear épicas solo a owners y managers del proyecto.
     """
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        
-        # Los admins pueden crear épicas en cualquier proyecto
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            if user_profile.role == 'admin':
-                return True
-        except Users.DoesNotExist:
-            return False
-        
-        # Para otros usuarios, verificar permisos específicos del proyecto
-        project_id = request.data.get('project')
-        if not project_id:
-            return False
-        
-        try:
-            from .models import Project
-            project = Project.objects.get(id=project_id)
-            if not project.is_member(user_profile):
-                return False
-            
-            member_role = project.get_member_role(user_profile)
-            return member_role in ['owner', 'manager']
-        except Project.DoesNotExist:
-            return False
+    project_roles = ('owner', 'manager')
+
+    def get_project_id(self, request, view):
+        return request.data.get('project')
 
-class CanCreateObjectives(permissions.BasePermission):
+class CanCreateObjectives(ProjectRolePermission):
     """
     Permite crear objetivos solo a owners y managers del proyecto.
     """
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        
-        # Los admins pueden crear objetivos en cualquier proyecto
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            if user_profile.role == 'admin':
-                return True
-        except Users.DoesNotExist:
-            return False
-        
-        # Para otros usuarios, verificar permisos específicos del proyecto
+    project_roles = ('owner', 'manager')
+
+    def get_project_id(self, request, view):
+        from .models import Epic
         project_id = request.data.get('project')
+        if project_id:
+            return project_id
         epic_id = request.data.get('epic')
-        
-        try:
-            from .models import Project, Epic
-            if project_id:
-                project = Project.objects.get(id=project_id)
-                if not project.is_member(user_profile):
-                    return False
-                member_role = project.get_member_role(user_profile)
-                return member_role in ['owner', 'manager']
-            elif epic_id:
-                epic = Epic.objects.get(id=epic_id)
-                project = epic.project
-                if not project.is_member(user_profile):
-                    return False
-                member_role = project.get_member_role(user_profile)
-                return member_role in ['owner', 'manager']
-        except (Project.DoesNotExist, Epic.DoesNotExist):
-            return False
-        
-        return False
+        if epic_id:
+            return resolve_project_id(Epic, epic_id)
+        return None
 
-class CanEditOKRs(permissions.BasePermission):
+class CanEditOKRs(ProjectRolePermission):
     """
     Permite editar OKRs a owners, managers y members del proyecto.
     """
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        
-        # Los admins pueden editar cualquier OKR
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            if user_profile.role == 'admin':
-                return True
-        except Users.DoesNotExist:
-            return False
-        
-        # Para otros usuarios, verificar permisos específicos del proyecto
+    project_roles = ('owner', 'manager', 'member')
+
+    def get_project_id(self, request, view):
+        from .models import Objective
         objective_id = request.data.get('objective')
-        if not objective_id:
-            return False
-        
-        try:
-            from .models import Objective
-            objective = Objective.objects.get(id=objective_id)
-            project = objective.project or objective.epic.project
-            
-            if not project.is_member(user_profile):
-                return False
-            
-            member_role = project.get_member_role(user_profile)
-            return member_role in ['owner', 'manager', 'member']
-        except Objective.DoesNotExist:
-            return False
+        return resolve_project_id(Objective, objective_id) if objective_id else None
 
-class CanEditActivities(permissions.BasePermission):
+class CanEditActivities(ProjectRolePermission):
     """
     Permite editar actividades a owners, managers y members del proyecto.
     """
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        
-        # Los admins pueden editar cualquier actividad
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            if user_profile.role == 'admin':
-                return True
-        except Users.DoesNotExist:
-            return False
-        
-        # Para otros usuarios, verificar permisos específicos del proyecto
+    project_roles = ('owner', 'manager', 'member')
+
+    def get_project_id(self, request, view):
+        from .models import OKR
         okr_id = request.data.get('okr')
-        if not okr_id:
-            return False
-        
-        try:
-            from .models import OKR
-            okr = OKR.objects.get(id=okr_id)
-            objective = okr.objective
-            project = objective.project or objective.epic.project
-            
-            if not project.is_member(user_profile):
-                return False
-            
-            member_role = project.get_member_role(user_profile)
-            return member_role in ['owner', 'manager', 'member']
-        except OKR.DoesNotExist:
-            return False
+        return resolve_project_id(OKR, okr_id) if okr_id else None
 
-class CanEditTasks(permissions.BasePermission):
+class CanEditTasks(ProjectRolePermission):
     """
     Permite editar tareas al asignado, owners, managers y members del proyecto.
     """
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        
-        # Los admins pueden editar cualquier tarea
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            if user_profile.role == 'admin':
-                return True
-        except Users.DoesNotExist:
-            return False
-        
-        # Para otros usuarios, verificar permisos específicos
+    project_roles = ('owner', 'manager', 'member')
+
+    def get_project_id(self, request, view):
+        from .models import Activity
         activity_id = request.data.get('activity')
-        if not activity_id:
-            return False
-        
-        try:
-            from .models import Activity
-            activity = Activity.objects.get(id=activity_id)
-            okr = activity.okr
-            objective = okr.objective
-            project = objective.project or objective.epic.project
-            
-            if not project.is_member(user_profile):
-                return False
-            
-            member_role = project.get_member_role(user_profile)
-            return member_role in ['owner', 'manager', 'member']
-        except Activity.DoesNotExist:
-            return False
+        return resolve_project_id(Activity, activity_id) if activity_id else None
 
-class CanAssignTasks(permissions.BasePermission):
+class CanAssignTasks(CanEditTasks):
     """
     Permite asignar tareas solo a owners y managers del proyecto.
     """
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        
-        # Los admins pueden asignar tareas
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            if user_profile.role == 'admin':
-                return True
-        except Users.DoesNotExist:
-            return False
-        
-        # Para otros usuarios, verificar permisos específicos del proyecto
-        activity_id = request.data.get('activity')
-        if not activity_id:
-            return False
-        
-        try:
-            from .models import Activity
-            activity = Activity.objects.get(id=activity_id)
-            okr = activity.okr
-            objective = okr.objective
-            project = objective.project or objective.epic.project
-            
-            if not project.is_member(user_profile):
-                return False
-            
-            member_role = project.get_member_role(user_profile)
-            return member_role in ['owner', 'manager']
-        except Activity.DoesNotExist:
-            return False
+    project_roles = ('owner', 'manager')
 
-class CanManageProjectMembers(permissions.BasePermission):
+class CanManageProjectMembers(ProjectRolePermission):
     """
     Permite gestionar miembros del proyecto solo a owners y managers.
     """
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        
-        # Los admins pueden gestionar miembros de cualquier proyecto
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            if user_profile.role == 'admin':
-                return True
-        except Users.DoesNotExist:
-            return False
-        
-        # Para otros usuarios, verificar permisos específicos del proyecto
-        project_id = request.data.get('project') or request.query_params.get('project')
-        if not project_id:
-            return False
-        
-        try:
-            from .models import Project
-            project = Project.objects.get(id=project_id)
-            if not project.is_member(user_profile):
-                return False
-            
-            member_role = project.get_member_role(user_profile)
-            return member_role in ['owner', 'manager']
-        except Project.DoesNotExist:
-            return False
+    project_roles = ('owner', 'manager')
+
+    def get_project_id(self, request, view):
+        return request.data.get('project') or request.query_params.get('project')
 
 class EmployeeTaskAccess(permissions.BasePermission):
     """
@@ -327,38 +217,25 @@ class EmployeeTaskAccess(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            # Los admins y managers tienen acceso completo
-            if user_profile.role in ['admin', 'manager']:
-                return True
-            
-            # Los empleados solo pueden acceder a sus tareas
-            if user_profile.role == 'employee':
-                return True  # Se verificará en has_object_permission
-            
-        except Users.DoesNotExist:
-            return False
-        
-        return False
-    
+
+        # Los admins y managers tienen acceso completo; para los empleados
+        # se verificará en has_object_permission
+        return get_authorization_context(request).has_global_role('admin', 'manager', 'employee')
+
     def has_object_permission(self, request, view, obj):
-        try:
-            user_profile = Users.objects.get(user=request.user)
-            
-            # Los admins y managers tienen acceso completo
-            if user_profile.role in ['admin', 'manager']:
-                return True
-            
-            # Los empleados solo pueden acceder a sus tareas asignadas
-            if user_profile.role == 'employee':
-                if hasattr(obj, 'assignee'):
-                    return obj.assignee.id == user_profile.id
-                elif hasattr(obj, 'owner'):
-                    return obj.owner.id == user_profile.id
-            
-        except Users.DoesNotExist:
+        context = get_authorization_context(request)
+        if context.profile is None:
             return False
-        
+
+        # Los admins y managers tienen acceso completo
+        if context.has_global_role('admin', 'manager'):
+            return True
+
+        # Los empleados solo pueden acceder a sus tareas asignadas
+        if context.has_global_role('employee'):
+            if hasattr(obj, 'assignee'):
+                return obj.assignee_id == context.profile.id
+            elif hasattr(obj, 'owner'):
+                return obj.owner_id == context.profile.id
+
         return False
@@ -0,0 +1,77 @@
+from django.db.models import Prefetch
+from .models import Project, Epic, Objective, OKR, Activity, Task
+from users.models import Users
+
+# Sección: Planificación de consultas
+# Cada función recibe un queryset (o parte del queryset base del modelo) y le
+# agrega exactamente las relaciones que consume el serializer de ese nivel:
+# select_related para las FKs que se muestran y Prefetch para los hijos.
+# Así el árbol completo cuesta un número fijo de consultas sin importar
+# cuántos nodos tenga. fields y depth son los mismos de ?fields= y ?depth=:
+# los hijos que el serializer no va a mostrar no se precargan.
+
+def includes(name, fields, depth):
+    """Indica si el campo anidado name se serializa con estas opciones"""
+    return (fields is None or name in fields) and (depth is None or depth > 0)
+
+def nested_depth(depth):
+    return None if depth is None else depth - 1
+
+def plan_tasks(queryset=None, fields=None, depth=None):
+    """Tareas con el asignado y su usuario ya cargados"""
+    if queryset is None:
+        queryset = Task.objects.all()
+    return queryset.select_related('assignee__user')
+
+def plan_activities(queryset=None, fields=None, depth=None):
+    """Actividades con dueño y tareas precargadas"""
+    if queryset is None:
+        queryset = Activity.objects.all()
+    queryset = queryset.select_related('owner__user')
+    if includes('tasks', fields, depth):
+        queryset = queryset.prefetch_related(Prefetch('tasks', queryset=plan_tasks(depth=nested_depth(depth))))
+    return queryset
+
+def plan_okrs(queryset=None, fields=None, depth=None):
+    """OKRs con dueño y tareas precargadas"""
+    if queryset is None:
+        queryset = OKR.objects.all()
+    queryset = queryset.select_related('owner__user')
+    if includes('tasks', fields, depth):
+        queryset = queryset.prefetch_related(Prefetch('tasks', queryset=plan_tasks(depth=nested_depth(depth))))
+    return queryset
+
+def plan_objectives(queryset=None, fields=None, depth=None):
+    """Objetivos con dueño y OKRs precargados"""
+    if queryset is None:
+        queryset = Objective.objects.all()
+    queryset = queryset.select_related('owner__user')
+    if includes('okrs', fields, depth):
+        queryset = queryset.prefetch_related(Prefetch('okrs', queryset=plan_okrs(depth=nested_depth(depth))))
+    return queryset
+
+def plan_epics(queryset=None, fields=None, depth=None):
+    """Épicas con dueño y objetivos precargados"""
+    if queryset is None:
+        queryset = Epic.objects.all()
+    queryset = queryset.select_related('owner__user')
+    if includes('objectives', fields, depth):
+        queryset = queryset.prefetch_related(
+            Prefetch('objectives', queryset=plan_objectives(depth=nested_depth(depth)))
+        )
+    return queryset
+
+def plan_projects(queryset=None, fields=None, depth=None):
+    """Proyectos con creador, miembros, épicas y objetivos directos precargados"""
+    if queryset is None:
+        queryset = Project.objects.all()
+    queryset = queryset.select_related('created_by__user')
+    if includes('members', fields, depth):
+        queryset = queryset.prefetch_related(Prefetch('members', queryset=Users.objects.select_related('user')))
+    if includes('epics', fields, depth):
+        queryset = queryset.prefetch_related(Prefetch('epics', queryset=plan_epics(depth=nested_depth(depth))))
+    if includes('objectives', fields, depth):
+        queryset = queryset.prefetch_related(
+            Prefetch('objectives', queryset=plan_objectives(depth=nested_depth(depth)))
+        )
+    return queryset
@@ -0,0 +1,275 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from .models import Project, Epic, Objective, OKR, Activity, Task
+from . import events
+
+# Sección: Rollups de progreso
+# Los contadores se mantienen con aritmética de deltas sobre la fila del padre
+# (bloqueada con select_for_update) y el cambio de progreso se propaga hacia
+# arriba nivel por nivel: Task -> Activity -> OKR -> Objective -> Epic/Project.
+# - Activity guarda tasks_total/tasks_completed.
+# - OKR guarda activities_total/activities_completed; una actividad cuenta como
+#   completada cuando tiene al menos una tarea completada.
+# - Objective, Epic y Project guardan children_total/children_progress_sum y su
+#   progreso es el promedio del progreso de sus hijos.
+# Las escrituras usan queryset.update() para no disparar señales ni tocar
+# el campo updated.
+
+def percentage(done, total):
+    return round(done * 100 / total) if total else 0
+
+def average(progress_sum, total):
+    return round(progress_sum / total) if total else 0
+
+def get_parent(node):
+    """Devuelve (modelo, id) del padre que promedia el progreso del nodo"""
+    if isinstance(node, Objective):
+        if node.epic_id:
+            return Epic, node.epic_id
+        if node.project_id:
+            return Project, node.project_id
+    elif isinstance(node, Epic):
+        return Project, node.project_id
+    return None, None
+
+# Sección: Deltas
+def apply_task_delta(activity_id, total=0, completed=0):
+    """Suma el delta de tareas a una actividad y propaga si cambia su estado"""
+    if not (total or completed):
+        return
+    with transaction.atomic():
+        activity = Activity.objects.select_for_update().filter(pk=activity_id).only(
+            'id', 'okr_id', 'tasks_total', 'tasks_completed'
+        ).first()
+        if activity is None:
+            return
+        was_completed = activity.tasks_completed > 0
+        tasks_total = max(activity.tasks_total + total, 0)
+        tasks_completed = max(activity.tasks_completed + completed, 0)
+        Activity.objects.filter(pk=activity_id).update(tasks_total=tasks_total, tasks_completed=tasks_completed)
+        is_completed = tasks_completed > 0
+        if was_completed != is_completed:
+            apply_activity_delta(activity.okr_id, completed=1 if is_completed else -1)
+
+def apply_task_deltas(deltas):
+    """
+    Aplica en bloque deltas de tareas {activity_id: (total, completed)}.
+    Cada actividad se escribe una vez y cada OKR afectado recibe un único delta.
+    """
+    with transaction.atomic():
+        activities = list(Activity.objects.select_for_update().filter(pk__in=deltas).only(
+            'id', 'okr_id', 'tasks_total', 'tasks_completed'
+        ))
+        okr_deltas = {}
+        for activity in activities:
+            total, completed = deltas[activity.pk]
+            was_completed = activity.tasks_completed > 0
+            activity.tasks_total = max(activity.tasks_total + total, 0)
+            activity.tasks_completed = max(activity.tasks_completed + completed, 0)
+            is_completed = activity.tasks_completed > 0
+            if was_completed != is_completed:
+                okr_deltas[activity.okr_id] = okr_deltas.get(activity.okr_id, 0) + (1 if is_completed else -1)
+        Activity.objects.bulk_update(activities, ['tasks_total', 'tasks_completed'])
+        for okr_id, completed in okr_deltas.items():
+            apply_activity_delta(okr_id, completed=completed)
+
+def apply_activity_delta(okr_id, total=0, completed=0):
+    """Suma el delta de actividades a un OKR y propaga el cambio de progreso"""
+    if not (total or completed):
+        return
+    with transaction.atomic():
+        okr = OKR.objects.select_for_update().filter(pk=okr_id).only(
+            'id', 'objective_id', 'progress', 'activities_total', 'activities_completed'
+        ).first()
+        if okr is None:
+            return
+        activities_total = max(okr.activities_total + total, 0)
+        activities_completed = max(okr.activities_completed + completed, 0)
+        progress = percentage(activities_completed, activities_total)
+        OKR.objects.filter(pk=okr_id).update(
+            activities_total=activities_total,
+            activities_completed=activities_completed,
+            progress=progress,
+            current_value=progress,
+        )
+        apply_child_delta(Objective, okr.objective_id, progress=progress - okr.progress)
+
+def apply_child_delta(model, pk, total=0, progress=0):
+    """Ajusta el promedio de un Objective, Epic o Project y lo propaga"""
+    if not (total or progress) or pk is None:
+        return
+    with transaction.atomic():
+        node = model.objects.select_for_update().filter(pk=pk).first()
+        if node is None:
+            return
+        children_total = max(node.children_total + total, 0)
+        children_progress_sum = max(node.children_progress_sum + progress, 0)
+        new_progress = average(children_progress_sum, children_total)
+        model.objects.filter(pk=pk).update(
+            children_total=children_total,
+            children_progress_sum=children_progress_sum,
+            progress=new_progress,
+        )
+        parent_model, parent_id = get_parent(node)
+        if parent_model is not None:
+            apply_child_delta(parent_model, parent_id, progress=new_progress - node.progress)
+
+# Sección: Recuentos
+# Se usan cuando no hay un delta confiable (borrados en cascada, nodos movidos
+# de padre): se recalculan los contadores del nodo desde sus hijos y la
+# diferencia con lo guardado se aplica como delta para propagarla.
+
+def recount_activity(activity_id):
+    with transaction.atomic():
+        activity = Activity.objects.select_for_update().filter(pk=activity_id).first()
+        if activity is None:
+            return
+        counts = Task.objects.filter(activity_id=activity_id).aggregate(
+            total=Count('id'), completed=Count('id', filter=Q(status='completed'))
+        )
+        apply_task_delta(
+            activity_id,
+            total=counts['total'] - activity.tasks_total,
+            completed=counts['completed'] - activity.tasks_completed,
+        )
+
+def recount_okr(okr_id):
+    with transaction.atomic():
+        okr = OKR.objects.select_for_update().filter(pk=okr_id).first()
+        if okr is None:
+            return
+        activities = Activity.objects.filter(okr_id=okr_id)
+        total = activities.count()
+        completed = activities.filter(tasks__status='completed').distinct().count()
+        progress = percentage(completed, total)
+        OKR.objects.filter(pk=okr_id).update(
+            activities_total=total,
+            activities_completed=completed,
+            progress=progress,
+            current_value=progress,
+        )
+        apply_child_delta(Objective, okr.objective_id, progress=progress - okr.progress)
+
+def get_children_stats(model, pk):
+    if model is Objective:
+        querysets = [OKR.objects.filter(objective_id=pk)]
+    elif model is Epic:
+        querysets = [Objective.objects.filter(epic_id=pk)]
+    else:
+        querysets = [Epic.objects.filter(project_id=pk), Objective.objects.filter(project_id=pk)]
+    total, progress_sum = 0, 0
+    for queryset in querysets:
+        stats = queryset.aggregate(total=Count('id'), progress_sum=Sum('progress'))
+        total += stats['total']
+        progress_sum += stats['progress_sum'] or 0
+    return total, progress_sum
+
+def recount_node(model, pk):
+    """Recalcula el promedio de un Objective, Epic o Project desde sus hijos"""
+    if pk is None:
+        return
+    with transaction.atomic():
+        node = model.objects.select_for_update().filter(pk=pk).first()
+        if node is None:
+            return
+        total, progress_sum = get_children_stats(model, pk)
+        apply_child_delta(
+            model, pk,
+            total=total - node.children_total,
+            progress=progress_sum - node.children_progress_sum,
+        )
+
+# Sección: Reconstrucción completa
+def rebuild(commit=True, project_ids=None):
+    """
+    Recalcula todos los contadores desde cero, de abajo hacia arriba, y
+    devuelve la lista de diferencias encontradas como tuplas
+    (modelo, id, campo, valor guardado, valor esperado). Con commit=False
+    solo informa las diferencias sin escribirlas. project_ids limita el
+    recálculo a los árboles de esos proyectos.
+    """
+    def scoped(queryset, field='root_project'):
+        return queryset if project_ids is None else queryset.filter(**{f'{field}__in': project_ids})
+
+    drift = []
+    updates = {}
+
+    def compare(model, pk, stored, expected):
+        changed = {}
+        for field, value in expected.items():
+            if stored[field] != value:
+                drift.append((model.__name__, pk, field, stored[field], value))
+                changed[field] = value
+        if changed:
+            updates.setdefault(model, []).append(model(pk=pk, **expected))
+
+    # Actividades
+    okr_stats = {}
+    activities = scoped(Activity.objects).annotate(
+        total=Count('tasks'), completed=Count('tasks', filter=Q(tasks__status='completed'))
+    ).values_list('id', 'okr_id', 'tasks_total', 'tasks_completed', 'total', 'completed')
+    for pk, okr_id, tasks_total, tasks_completed, total, completed in activities.iterator():
+        compare(Activity, pk, {'tasks_total': tasks_total, 'tasks_completed': tasks_completed},
+                {'tasks_total': total, 'tasks_completed': completed})
+        stats = okr_stats.setdefault(okr_id, [0, 0])
+        stats[0] += 1
+        stats[1] += 1 if completed > 0 else 0
+
+    # OKRs
+    objective_stats = {}
+    okrs = scoped(OKR.objects).values_list(
+        'id', 'objective_id', 'activities_total', 'activities_completed', 'progress', 'current_value'
+    )
+    for pk, objective_id, activities_total, activities_completed, progress, current_value in okrs.iterator():
+        total, completed = okr_stats.get(pk, (0, 0))
+        expected_progress = percentage(completed, total)
+        compare(OKR, pk, {
+            'activities_total': activities_total, 'activities_completed': activities_completed,
+            'progress': progress, 'current_value': current_value,
+        }, {
+            'activities_total': total, 'activities_completed': completed,
+            'progress': expected_progress, 'current_value': expected_progress,
+        })
+        stats = objective_stats.setdefault(objective_id, [0, 0])
+        stats[0] += 1
+        stats[1] += expected_progress
+
+    # Objetivos, épicas y proyectos
+    epic_stats, project_stats = {}, {}
+    average_fields = ('children_total', 'children_progress_sum', 'progress')
+    objectives = scoped(Objective.objects).values_list('id', 'epic_id', 'project_id', *average_fields)
+    for pk, epic_id, project_id, *stored in objectives.iterator():
+        total, progress_sum = objective_stats.get(pk, (0, 0))
+        expected = dict(zip(average_fields, (total, progress_sum, average(progress_sum, total))))
+        compare(Objective, pk, dict(zip(average_fields, stored)), expected)
+        if epic_id:
+            stats = epic_stats.setdefault(epic_id, [0, 0])
+        elif project_id:
+            stats = project_stats.setdefault(project_id, [0, 0])
+        else:
+            continue
+        stats[0] += 1
+        stats[1] += expected['progress']
+
+    for pk, project_id, *stored in scoped(Epic.objects, 'project').values_list('id', 'project_id', *average_fields).iterator():
+        total, progress_sum = epic_stats.get(pk, (0, 0))
+        expected = dict(zip(average_fields, (total, progress_sum, average(progress_sum, total))))
+        compare(Epic, pk, dict(zip(average_fields, stored)), expected)
+        stats = project_stats.setdefault(project_id, [0, 0])
+        stats[0] += 1
+        stats[1] += expected['progress']
+
+    for pk, *stored in scoped(Project.objects, 'pk').values_list('id', *average_fields).iterator():
+        total, progress_sum = project_stats.get(pk, (0, 0))
+        expected = dict(zip(average_fields, (total, progress_sum, average(progress_sum, total))))
+        compare(Project, pk, dict(zip(average_fields, stored)), expected)
+
+    if commit:
+        with transaction.atomic():
+            for model, objs in updates.items():
+                model.objects.bulk_update(objs, list(objs[0].rollup_fields), batch_size=500)
+            if updates:
+                # Las correcciones cambian el árbol serializado de los proyectos
+                scoped(Project.objects, 'pk').update(revision=F('revision') + 1)
+                events.emit_reset(project_ids or ())
+    return drift
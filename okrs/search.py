@@ -0,0 +1,296 @@
+import re
+import unicodedata
+from django.apps import apps
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, Max, Q, Sum, When
+from .models import Project, Epic, Objective, OKR, Activity, Task, Comment, SearchDocument, SearchTerm
+
+# Sección: Búsqueda
+# SearchDocument guarda el texto buscable de cada proyecto, épica, objetivo,
+# OKR, actividad, tarea y comentario, con su proyecto raíz para filtrar la
+# visibilidad. Se mantiene desde okrs.signals y desde las rutas masivas.
+# Hay dos índices:
+# - fts5: en SQLite, la tabla virtual okrs_search_fts (FTS5 con contenido
+#   externo) que los triggers de la migración sincronizan con SearchDocument.
+#   Ordena por bm25.
+# - terms: índice invertido portable en SearchTerm, un término normalizado
+#   por documento. Ordena por la suma de pesos de los términos encontrados.
+# Los términos de la consulta se buscan por prefijo y deben aparecer todos.
+
+FTS_TABLE = 'okrs_search_fts'
+
+# Tipo (model_name) -> (modelo, campo del título, campo del contenido)
+SEARCH_FIELDS = {
+    'project': (Project, 'name', 'description'),
+    'epic': (Epic, 'title', 'description'),
+    'objective': (Objective, 'title', 'description'),
+    'okr': (OKR, 'key_result', None),
+    'activity': (Activity, 'name', 'description'),
+    'task': (Task, 'title', 'desc'),
+    'comment': (Comment, None, 'text'),
+}
+
+# Ancestros de cada tipo para la ruta hasta el proyecto: (tipo, lookup, campo del título)
+PATH_LOOKUPS = {
+    'project': [],
+    'epic': [('project', 'project', 'name')],
+    'objective': [('project', 'root_project', 'name'), ('epic', 'epic', 'title')],
+    'okr': [('project', 'root_project', 'name'), ('epic', 'objective__epic', 'title'), ('objective', 'objective', 'title')],
+    'activity': [
+        ('project', 'root_project', 'name'), ('epic', 'okr__objective__epic', 'title'),
+        ('objective', 'okr__objective', 'title'), ('okr', 'okr', 'key_result'),
+    ],
+    'task': [
+        ('project', 'root_project', 'name'), ('epic', 'activity__okr__objective__epic', 'title'),
+        ('objective', 'activity__okr__objective', 'title'), ('okr', 'activity__okr', 'key_result'),
+        ('activity', 'activity', 'name'),
+    ],
+    'comment': [
+        ('project', 'root_project', 'name'), ('epic', 'task__activity__okr__objective__epic', 'title'),
+        ('objective', 'task__activity__okr__objective', 'title'), ('okr', 'task__activity__okr', 'key_result'),
+        ('activity', 'task__activity', 'name'), ('task', 'task', 'title'),
+    ],
+}
+
+# Triggers que mantienen la tabla FTS (contenido externo) igual a SearchDocument
+FTS_SQL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, content, content='okrs_searchdocument', "
+    f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON okrs_searchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON okrs_searchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF title, content ON okrs_searchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+TITLE_WEIGHT = 2
+MAX_TERM_LENGTH = 64
+
+def normalize(text):
+    """Minúsculas y sin tildes, como el tokenizador unicode61 de FTS5"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def tokenize(text):
+    return [term[:MAX_TERM_LENGTH] for term in re.findall(r'\w+', normalize(text))]
+
+def get_backend():
+    """'fts5' en SQLite con la tabla FTS creada, 'terms' en otro caso (o según OKRS_SEARCH_BACKEND)"""
+    backend = getattr(settings, 'OKRS_SEARCH_BACKEND', None)
+    if backend:
+        return backend
+    if connection.vendor != 'sqlite':
+        return 'terms'
+    if not hasattr(connection, 'okrs_has_fts'):
+        connection.okrs_has_fts = FTS_TABLE in connection.introspection.table_names()
+    return 'fts5' if connection.okrs_has_fts else 'terms'
+
+def create_fts(schema_editor):
+    """Crea la tabla FTS5 y sus triggers si la base es SQLite con FTS5. Devuelve si se creó"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return False
+    try:
+        with transaction.atomic(using=connection.alias):
+            for sql in FTS_SQL:
+                schema_editor.execute(sql)
+    except OperationalError:
+        # SQLite compilado sin FTS5: queda el índice de SearchTerm
+        return False
+    connection.okrs_has_fts = True
+    return True
+
+def drop_fts(schema_editor):
+    for name in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    schema_editor.connection.okrs_has_fts = False
+
+# Sección: Indexación
+def build_document(instance, model=SearchDocument):
+    kind = instance._meta.model_name
+    _, title_field, content_field = SEARCH_FIELDS[kind]
+    content = getattr(instance, content_field) if content_field else ''
+    # La descripción por defecto de las tareas no aporta a la búsqueda
+    if content_field and content == instance._meta.get_field(content_field).default:
+        content = ''
+    root_project_id = instance.pk if kind == 'project' else (
+        instance.project_id if kind == 'epic' else instance.root_project_id
+    )
+    return model(
+        kind=kind, root_project_id=root_project_id, content=content or '',
+        title=(getattr(instance, title_field) or '')[:255] if title_field else '',
+        **{f'{kind}_id': instance.pk},
+    )
+
+def get_indexed_fields(model):
+    """Campos de model que cambian su documento: título, contenido y proyecto"""
+    _, title_field, content_field = SEARCH_FIELDS[model._meta.model_name]
+    return {field for field in (title_field, content_field, 'root_project', 'project') if field}
+
+def build_terms(document, model=SearchTerm):
+    weights = {term: 1 for term in tokenize(document.content)}
+    weights.update((term, TITLE_WEIGHT) for term in tokenize(document.title))
+    return [model(term=term, document_id=document.pk, weight=weight) for term, weight in weights.items()]
+
+def index(instances):
+    """Crea o actualiza los documentos de instances (todas del mismo modelo)"""
+    instances = list(instances)
+    if not instances:
+        return
+    kind = instances[0]._meta.model_name
+    documents = SearchDocument.objects.bulk_create(
+        [build_document(instance) for instance in instances], batch_size=500,
+        update_conflicts=True, unique_fields=[kind], update_fields=['root_project', 'title', 'content'],
+    )
+    if get_backend() == 'terms':
+        SearchTerm.objects.filter(document__in=[document.pk for document in documents]).delete()
+        SearchTerm.objects.bulk_create([term for document in documents for term in build_terms(document)], batch_size=1000)
+
+def rebuild(get_model=apps.get_model, batch_size=1000):
+    """Recalcula todo el índice desde los modelos. Devuelve cuántos documentos quedaron"""
+    Document, Term = get_model('okrs', 'SearchDocument'), get_model('okrs', 'SearchTerm')
+    use_terms = get_backend() == 'terms'
+    total = 0
+    with transaction.atomic():
+        Term.objects.all().delete()
+        Document.objects.all().delete()
+        for kind in SEARCH_FIELDS:
+            batch = []
+            for instance in get_model('okrs', kind).objects.order_by('pk').iterator(chunk_size=batch_size):
+                batch.append(build_document(instance, Document))
+                if len(batch) == batch_size:
+                    total += write_batch(batch, Document, Term, use_terms)
+                    batch = []
+            total += write_batch(batch, Document, Term, use_terms)
+        if get_backend() == 'fts5':
+            # Reconstruye la tabla FTS desde SearchDocument por si quedó desincronizada
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return total
+
+def write_batch(documents, Document, Term, use_terms):
+    documents = Document.objects.bulk_create(documents)
+    if use_terms:
+        Term.objects.bulk_create([term for document in documents for term in build_terms(document, Term)], batch_size=1000)
+    return len(documents)
+
+# Sección: Consulta
+class FTSResults:
+    """Resultados de FTS5 como secuencia paginable: count() y rebanadas con LIMIT/OFFSET"""
+    def __init__(self, terms, project_ids=None, kinds=None):
+        self.match = ' '.join(f'"{term}"*' for term in terms)
+        where = [f'{FTS_TABLE} MATCH %s']
+        self.params = [self.match]
+        if project_ids is not None:
+            project_ids = list(project_ids)
+            where.append(f'd.root_project_id IN ({", ".join(["%s"] * len(project_ids)) or "NULL"})')
+            self.params += project_ids
+        if kinds:
+            where.append(f'd.kind IN ({", ".join(["%s"] * len(kinds))})')
+            self.params += list(kinds)
+        self.sql = (
+            f'FROM {FTS_TABLE} JOIN okrs_searchdocument d ON d.id = {FTS_TABLE}.rowid WHERE {" AND ".join(where)}'
+        )
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) {self.sql}', self.params)
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, window):
+        start, stop = window.start or 0, window.stop
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT d.id, bm25({FTS_TABLE}, {TITLE_WEIGHT}.0, 1.0) AS rank {self.sql} '
+                f'ORDER BY rank, d.id LIMIT %s OFFSET %s',
+                [*self.params, stop - start, start],
+            )
+            return [{'document': pk, 'rank': -rank} for pk, rank in cursor.fetchall()]
+
+def search_terms(terms, project_ids=None, kinds=None):
+    """Documentos que tienen todos los terms (por prefijo), con su puntaje, desde SearchTerm"""
+    # El prefijo se busca como rango para usar el índice (LIKE con ESCAPE no lo usa en SQLite)
+    ranges = [Q(term__gte=term, term__lt=term + '\U0010ffff') for term in terms]
+    queryset = SearchTerm.objects.filter(Q.create(ranges, connector=Q.OR))
+    if project_ids is not None:
+        queryset = queryset.filter(document__root_project__in=project_ids)
+    if kinds:
+        queryset = queryset.filter(document__kind__in=kinds)
+    matched = {f'matched_{i}': Max(Case(When(condition, then=1), default=0)) for i, condition in enumerate(ranges)}
+    return queryset.values('document').annotate(rank=Sum('weight'), **matched).filter(
+        **{name: 1 for name in matched}
+    ).order_by('-rank', 'document')
+
+def search(query, project_ids=None, kinds=None):
+    """
+    Resultados de query como secuencia de {'document', 'rank'} ordenada por
+    relevancia, lista para paginar. project_ids limita a esos proyectos
+    (None: todos) y kinds a esos tipos.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    if get_backend() == 'fts5':
+        return FTSResults(terms, project_ids, kinds)
+    return search_terms(terms, project_ids, kinds)
+
+def get_snippet(text, terms, length=160):
+    """Fragmento de text alrededor del primer término encontrado"""
+    normalized = normalize(text)
+    # normalize() conserva el largo salvo con ligaduras o 'ß': en ese caso se muestra el texto normalizado
+    source = text if len(normalized) == len(text) else normalized
+    positions = [match.start() for term in terms for match in [re.search(rf'\b{re.escape(term)}', normalized)] if match]
+    start = max(min(positions, default=0) - length // 4, 0)
+    snippet = source[start:start + length].strip()
+    return ('…' if start else '') + snippet + ('…' if start + length < len(source) else '')
+
+def get_hits(rows, query):
+    """
+    Resultados de una página de search(): tipo, id, título, fragmento,
+    proyecto y ruta, con una consulta para los documentos y una por tipo.
+    """
+    terms = tokenize(query)
+    documents = SearchDocument.objects.in_bulk([row['document'] for row in rows])
+    documents = [documents[row['document']] for row in rows if row['document'] in documents]
+    paths = get_paths(documents)
+    return [
+        {
+            'type': document.kind,
+            'id': getattr(document, f'{document.kind}_id'),
+            'title': document.title or document.content[:80],
+            'snippet': get_snippet(document.content, terms) if document.content else '',
+            'project': document.root_project_id,
+            'path': paths.get(document.pk, []),
+        }
+        for document in documents
+    ]
+
+def get_paths(documents):
+    """
+    Ruta hasta el proyecto de cada documento ({id: [{type, id, title}]}),
+    con una consulta por tipo de documento presente.
+    """
+    by_kind = {}
+    for document in documents:
+        by_kind.setdefault(document.kind, []).append(document)
+    paths = {}
+    for kind, kind_documents in by_kind.items():
+        lookups = PATH_LOOKUPS[kind]
+        if not lookups:
+            paths.update((document.pk, []) for document in kind_documents)
+            continue
+        names = [value for _, lookup, field in lookups for value in (f'{lookup}__id', f'{lookup}__{field}')]
+        object_ids = {getattr(document, f'{kind}_id'): document.pk for document in kind_documents}
+        for row in SEARCH_FIELDS[kind][0].objects.filter(pk__in=object_ids).values('pk', *names):
+            paths[object_ids[row['pk']]] = [
+                {'type': ancestor, 'id': row[f'{lookup}__id'], 'title': row[f'{lookup}__{field}']}
+                for ancestor, lookup, field in lookups if row[f'{lookup}__id'] is not None
+            ]
+    return paths
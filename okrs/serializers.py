@@ -1,6 +1,58 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Project, Epic, Objective, OKR, Activity, Task, Log, Comment, ProjectMembers
+from .models import Project, Epic, Objective, OKR, Activity, Task, Log, Comment, ProjectMembers, Job, Notification, TaskInbox, TASK_STATUS, PROGRESS_DICT, bump_revisions
 from users.models import Users
+from . import audit, events, inbox, rollups
+
+# Sección: Campos parciales
+def get_field_options(request, serializer_class):
+    """
+    Lee ?fields=, ?depth= y ?view=summary de una lectura y devuelve
+    {'fields': conjunto de campos o None, 'depth': niveles anidados o None}.
+    En escrituras no se recorta nada.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return {'fields': None, 'depth': None}
+    params = request.query_params
+    fields = None
+    if params.get('view') == 'summary':
+        fields = set(getattr(serializer_class.Meta, 'summary_fields', ())) or None
+    if params.get('fields'):
+        requested = {name.strip() for name in params['fields'].split(',') if name.strip()}
+        fields = requested if fields is None else fields & requested
+    depth = params.get('depth')
+    if depth is not None:
+        try:
+            depth = int(depth)
+        except ValueError:
+            depth = -1
+        if depth < 0:
+            raise serializers.ValidationError({'depth': 'Debe ser un entero mayor o igual a 0'})
+    return {'fields': fields, 'depth': depth}
+
+class DynamicFieldsMixin:
+    """
+    Quita del serializer los campos que no se pidieron (context['fields']) y
+    los anidados de Meta.nested_fields cuando se agotó la profundidad
+    (context['depth']). Los campos quitados no se evalúan, así que sus
+    consultas tampoco se ejecutan.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        depth = self.context.get('depth')
+        excluded = set()
+        if fields is not None:
+            excluded |= set(self.fields) - fields
+        if depth is not None and depth <= 0:
+            excluded |= set(getattr(self.Meta, 'nested_fields', ()))
+        for name in excluded:
+            self.fields.pop(name, None)
+
+    def get_nested_context(self):
+        """Contexto para los serializers hijos: todos sus campos y un nivel menos"""
+        depth = self.context.get('depth')
+        return {**self.context, 'fields': None, 'depth': None if depth is None else depth - 1}
 
 class ProjectMembersSerializer(serializers.ModelSerializer):
     user_id = serializers.IntegerField(source='user.id')
@@ -54,7 +106,7 @@ class RemoveProjectMemberSerializer(serializers.Serializer):
         except Users.DoesNotExist:
             raise serializers.ValidationError("Usuario no encontrado")
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     epics = serializers.SerializerMethodField()
     objectives = serializers.SerializerMethodField()
     members = ProjectMembersSerializer(many=True, read_only=True)
@@ -63,41 +115,36 @@ class ProjectSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Project
-        fields = ['id', 'name', 'description', 'created_by', 'created_by_name', 'members', 'start_date', 'end_date', 'color', 'tipo', 'created', 'updated', 'epics', 'objectives']
-        read_only_fields = ['created_by', 'created', 'updated']
+        fields = ['id', 'name', 'description', 'created_by', 'created_by_name', 'members', 'start_date', 'end_date', 'color', 'tipo', 'progress', 'created', 'updated', 'epics', 'objectives']
+        read_only_fields = ['created_by', 'progress', 'created', 'updated']
+        nested_fields = ['members', 'epics', 'objectives']
+        summary_fields = ['id', 'name', 'description', 'created_by_name', 'start_date', 'end_date', 'color', 'tipo', 'progress']
     
     def get_epics(self, obj):
         if obj.tipo == 'mision':
-            return EpicSerializer(obj.epics.all(), many=True, context=self.context).data
+            return EpicSerializer(obj.epics.all(), many=True, context=self.get_nested_context()).data
         return []
     
     def get_objectives(self, obj):
         if obj.tipo == 'proyecto':
-            return ObjectiveSerializer(obj.objectives.all(), many=True, context=self.context).data
+            return ObjectiveSerializer(obj.objectives.all(), many=True, context=self.get_nested_context()).data
         return []
-    
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        if instance.tipo == 'proyecto':
-            data['epics'] = []
-            data['objectives'] = ObjectiveSerializer(instance.objectives.all(), many=True, context=self.context).data
-        else:
-            data['objectives'] = []
-        return data
 
-class EpicSerializer(serializers.ModelSerializer):
+class EpicSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     objectives = serializers.SerializerMethodField()
     owner_name = serializers.CharField(source='owner.user.username', read_only=True)
     
     class Meta:
         model = Epic
-        fields = ['id', 'project', 'title', 'description', 'owner', 'owner_name', 'created', 'updated', 'objectives']
-        read_only_fields = ['owner', 'created', 'updated']
+        fields = ['id', 'project', 'title', 'description', 'owner', 'owner_name', 'progress', 'created', 'updated', 'objectives']
+        read_only_fields = ['owner', 'progress', 'created', 'updated']
+        nested_fields = ['objectives']
+        summary_fields = ['id', 'project', 'title', 'owner_name', 'progress']
     
     def get_objectives(self, obj):
-        return ObjectiveSerializer(Objective.objects.filter(epic=obj), many=True, context=self.context).data
+        return ObjectiveSerializer(obj.objectives.all(), many=True, context=self.get_nested_context()).data
 
-class ObjectiveSerializer(serializers.ModelSerializer):
+class ObjectiveSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     okrs = serializers.SerializerMethodField()
     owner_name = serializers.CharField(source='owner.user.username', read_only=True)
     epic = serializers.PrimaryKeyRelatedField(queryset=Epic.objects.all(), allow_null=True, required=False)
@@ -105,8 +152,10 @@ class ObjectiveSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Objective
-        fields = ['id', 'epic', 'project', 'title', 'description', 'owner', 'owner_name', 'created', 'updated', 'okrs']
-        read_only_fields = ['owner', 'created', 'updated']
+        fields = ['id', 'epic', 'project', 'title', 'description', 'owner', 'owner_name', 'progress', 'created', 'updated', 'okrs']
+        read_only_fields = ['owner', 'progress', 'created', 'updated']
+        nested_fields = ['okrs']
+        summary_fields = ['id', 'epic', 'project', 'title', 'owner_name', 'progress']
     
     def validate(self, data):
         epic = data.get('epic')
@@ -121,9 +170,9 @@ class ObjectiveSerializer(serializers.ModelSerializer):
         return data
     
     def get_okrs(self, obj):
-        return OKRSerializer(obj.okrs.all(), many=True, context=self.context).data
+        return OKRSerializer(obj.okrs.all(), many=True, context=self.get_nested_context()).data
 
-class OKRSerializer(serializers.ModelSerializer):
+class OKRSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     tasks = serializers.SerializerMethodField()
     owner_name = serializers.CharField(source='owner.user.username', read_only=True)
     current_value = serializers.IntegerField(read_only=True)
@@ -134,47 +183,28 @@ class OKRSerializer(serializers.ModelSerializer):
         model = OKR
         fields = ['id', 'objective', 'key_result', 'current_value', 'target_value', 'progress', 'owner', 'owner_name', 'created', 'updated', 'tasks']
         read_only_fields = ['owner', 'current_value', 'target_value', 'progress', 'created', 'updated']
+        nested_fields = ['tasks']
+        summary_fields = ['id', 'objective', 'key_result', 'owner_name', 'progress']
     
     def get_tasks(self, obj):
-        return TaskSerializer(obj.tasks.all(), many=True, context=self.context).data
-    
-    def create(self, validated_data):
-        okr = super().create(validated_data)
-        okr.calculate_progress()
-        return okr
-    
-    def update(self, instance, validated_data):
-        okr = super().update(instance, validated_data)
-        okr.calculate_progress()
-        return okr
+        return TaskSerializer(obj.tasks.all(), many=True, context=self.get_nested_context()).data
 
-class ActivitySerializer(serializers.ModelSerializer):
+class ActivitySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     tasks = serializers.SerializerMethodField()
     owner_name = serializers.CharField(source='owner.user.username', read_only=True)
-    progress = serializers.SerializerMethodField()
+    progress = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Activity
         fields = ['id', 'okr', 'name', 'description', 'owner', 'owner_name', 'start_date', 'end_date', 'created', 'updated', 'tasks', 'progress']
         read_only_fields = ['owner', 'created', 'updated']
+        nested_fields = ['tasks']
+        summary_fields = ['id', 'okr', 'name', 'owner_name', 'start_date', 'end_date', 'progress']
     
     def get_tasks(self, obj):
-        return TaskSerializer(obj.tasks.all(), many=True, context=self.context).data
-    
-    def get_progress(self, obj):
-        return obj.calculate_progress()
-    
-    def create(self, validated_data):
-        activity = super().create(validated_data)
-        activity.calculate_progress()
-        return activity
-    
-    def update(self, instance, validated_data):
-        activity = super().update(instance, validated_data)
-        activity.calculate_progress()
-        return activity
+        return TaskSerializer(obj.tasks.all(), many=True, context=self.get_nested_context()).data
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     assignee_name = serializers.CharField(source='assignee.user.username', read_only=True)
     assignee_id = serializers.IntegerField(source='assignee.id', required=False, allow_null=True)
     
@@ -182,22 +212,68 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = ['id', 'activity', 'title', 'desc', 'assignee', 'assignee_id', 'assignee_name', 'parent_task', 'status', 'completion_percentage', 'archived', 'created', 'updated']
         read_only_fields = ['completion_percentage', 'created', 'updated']
-    
-    def create(self, validated_data):
-        task = super().create(validated_data)
-        # Recalcular progreso de la actividad y OKR
-        task.activity.calculate_progress()
-        task.activity.okr.calculate_progress()
-        return task
-    
-    def update(self, instance, validated_data):
-        task = super().update(instance, validated_data)
-        # Recalcular progreso de la actividad y OKR
-        task.activity.calculate_progress()
-        task.activity.okr.calculate_progress()
-        return task
-
-class LogSerializer(serializers.ModelSerializer):
+        summary_fields = ['id', 'activity', 'title', 'assignee_id', 'assignee_name', 'status', 'completion_percentage']
+
+class TaskBulkUpdateListSerializer(serializers.ListSerializer):
+    def validate(self, data):
+        ids = [item['id'] for item in data]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Cada tarea solo puede aparecer una vez")
+        assignee_ids = {item['assignee'] for item in data if item.get('assignee') is not None}
+        existing = set(Users.objects.filter(id__in=assignee_ids).values_list('id', flat=True))
+        if assignee_ids - existing:
+            raise serializers.ValidationError(f"Usuarios no encontrados: {sorted(assignee_ids - existing)}")
+        return data
+
+    def update(self, instances, validated_data):
+        """
+        Aplica los cambios con un solo bulk_update y recalcula el progreso
+        de cada actividad y OKR afectados una única vez.
+        """
+        tasks = {task.id: task for task in instances}
+        now = timezone.now()
+        deltas = {}
+        for item in validated_data:
+            task = tasks[item['id']]
+            was_completed = task.status == 'completed'
+            if 'status' in item:
+                task.status = item['status']
+                task.completion_percentage = PROGRESS_DICT.get(task.status, 0)
+            if 'assignee' in item:
+                task.assignee_id = item['assignee']
+            task.updated = now
+            completed = (task.status == 'completed') - was_completed
+            if completed:
+                total_delta, completed_delta = deltas.get(task.activity_id, (0, 0))
+                deltas[task.activity_id] = (total_delta, completed_delta + completed)
+        Task.objects.bulk_update(tasks.values(), ['status', 'completion_percentage', 'assignee', 'updated'])
+        rollups.apply_task_deltas(deltas)
+        inbox.sync_tasks(list(tasks.values()))
+        # bulk_update no dispara señales: la revisión se incrementa explícitamente
+        bump_revisions(task.root_project_id for task in tasks.values())
+        for task in tasks.values():
+            audit.record(task, 'updated')
+            events.emit_change(task, 'updated')
+        return list(tasks.values())
+
+class TaskBulkUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=TASK_STATUS, required=False)
+    assignee = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        list_serializer_class = TaskBulkUpdateListSerializer
+
+class TaskInboxSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='task_id', read_only=True)
+    project = serializers.IntegerField(source='root_project_id', read_only=True)
+
+    class Meta:
+        model = TaskInbox
+        fields = ['id', 'project', 'activity', 'title', 'status', 'completion_percentage', 'archived', 'due', 'updated']
+        read_only_fields = fields
+
+class LogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.user.username', read_only=True)
     
     class Meta:
@@ -205,7 +281,7 @@ class LogSerializer(serializers.ModelSerializer):
         fields = ['id', 'project', 'epic', 'objective', 'okr', 'activity', 'task', 'user', 'user_name', 'log_text', 'log_type', 'log_color', 'created']
         read_only_fields = ['user', 'created']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.user.username', read_only=True)
     
     class Meta:
@@ -213,10 +289,22 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'task', 'user', 'user_name', 'text', 'created', 'updated']
         read_only_fields = ['user', 'created', 'updated']
 
-class UserSerializer(serializers.ModelSerializer):
-    username = serializers.CharField(source='user.username', read_only=True)
-    email = serializers.CharField(source='user.email', read_only=True)
-    
+class JobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'name', 'key', 'status', 'attempts', 'progress', 'result', 'last_error', 'run_at', 'created', 'started', 'finished']
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        from .jobs import get_progress
+        return get_progress(obj)
+
+class NotificationSerializer(serializers.ModelSerializer):
+    created_at = serializers.DateTimeField(source='created', read_only=True)
+
     class Meta:
-        model = Users
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'role']
\ No newline at end of file
+        model = Notification
+        fields = ['id', 'project', 'log_type', 'message', 'read', 'created_at']
+        read_only_fields = fields
@@ -0,0 +1,186 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Project, ProjectMembers, Epic, Objective, OKR, Activity, Task, Log, Comment, bump_revisions
+from . import audit, events, inbox, notifications, rollups, search
+
+# Sección: Rollups de progreso
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    is_completed = 1 if instance.status == 'completed' else 0
+    if created:
+        rollups.apply_task_delta(instance.activity_id, total=1, completed=is_completed)
+    elif not (instance.has_loaded_value('activity_id') and instance.has_loaded_value('status')):
+        rollups.recount_activity(instance.activity_id)
+    else:
+        old_activity_id = instance.get_loaded_value('activity_id')
+        was_completed = 1 if instance.get_loaded_value('status') == 'completed' else 0
+        if old_activity_id != instance.activity_id:
+            rollups.apply_task_delta(old_activity_id, total=-1, completed=-was_completed)
+            rollups.apply_task_delta(instance.activity_id, total=1, completed=is_completed)
+        else:
+            rollups.apply_task_delta(instance.activity_id, completed=is_completed - was_completed)
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    status = instance.get_loaded_value('status', instance.status)
+    rollups.apply_task_delta(instance.activity_id, total=-1, completed=-1 if status == 'completed' else 0)
+
+@receiver(post_save, sender=Activity)
+def activity_saved(sender, instance, created, **kwargs):
+    if created:
+        rollups.apply_activity_delta(instance.okr_id, total=1, completed=1 if instance.tasks_completed else 0)
+    elif instance.get_loaded_value('okr_id', instance.okr_id) != instance.okr_id:
+        rollups.recount_okr(instance.get_loaded_value('okr_id'))
+        rollups.recount_okr(instance.okr_id)
+
+@receiver(post_delete, sender=Activity)
+def activity_deleted(sender, instance, **kwargs):
+    rollups.recount_okr(instance.okr_id)
+
+@receiver(post_save, sender=OKR)
+def okr_saved(sender, instance, created, **kwargs):
+    if created:
+        rollups.apply_child_delta(Objective, instance.objective_id, total=1, progress=instance.progress)
+    elif instance.get_loaded_value('objective_id', instance.objective_id) != instance.objective_id:
+        rollups.recount_node(Objective, instance.get_loaded_value('objective_id'))
+        rollups.recount_node(Objective, instance.objective_id)
+
+@receiver(post_delete, sender=OKR)
+def okr_deleted(sender, instance, **kwargs):
+    rollups.recount_node(Objective, instance.objective_id)
+
+@receiver(post_save, sender=Objective)
+@receiver(post_save, sender=Epic)
+def average_node_saved(sender, instance, created, **kwargs):
+    parent_model, parent_id = rollups.get_parent(instance)
+    if created:
+        rollups.apply_child_delta(parent_model, parent_id, total=1, progress=instance.progress)
+    elif instance.has_moved():
+        old = sender(**{name: instance.get_loaded_value(name) for name in instance.tracked_fields})
+        rollups.recount_node(*rollups.get_parent(old))
+        rollups.recount_node(parent_model, parent_id)
+
+@receiver(post_delete, sender=Objective)
+@receiver(post_delete, sender=Epic)
+def average_node_deleted(sender, instance, **kwargs):
+    parent_model, parent_id = rollups.get_parent(instance)
+    if parent_model is not None:
+        rollups.recount_node(parent_model, parent_id)
+
+# Sección: Revisión de proyectos
+def get_affected_project_ids(instance):
+    """Proyecto raíz actual del nodo y, si se movió, el anterior"""
+    if isinstance(instance, Project):
+        return [instance.pk]
+    name = 'project_id' if isinstance(instance, (Epic, ProjectMembers)) else 'root_project_id'
+    project_id = getattr(instance, name)
+    if hasattr(instance, 'get_loaded_value'):
+        return [project_id, instance.get_loaded_value(name, project_id)]
+    return [project_id]
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectMembers)
+@receiver(post_save, sender=Epic)
+@receiver(post_save, sender=Objective)
+@receiver(post_save, sender=OKR)
+@receiver(post_save, sender=Activity)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=ProjectMembers)
+@receiver(post_delete, sender=Epic)
+@receiver(post_delete, sender=Objective)
+@receiver(post_delete, sender=OKR)
+@receiver(post_delete, sender=Activity)
+@receiver(post_delete, sender=Task)
+def bump_project_revision(sender, instance, **kwargs):
+    bump_revisions(get_affected_project_ids(instance))
+
+@receiver(m2m_changed, sender=OKR.tasks.through)
+def okr_tasks_changed(sender, instance, action, **kwargs):
+    # instance es el OKR o la tarea según el lado desde el que se modificó la relación
+    if action.startswith('post_'):
+        bump_revisions([instance.root_project_id])
+
+# Sección: Eventos en vivo
+# Se registran después de la revisión para que al publicar ya esté incrementada
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectMembers)
+@receiver(post_save, sender=Epic)
+@receiver(post_save, sender=Objective)
+@receiver(post_save, sender=OKR)
+@receiver(post_save, sender=Activity)
+@receiver(post_save, sender=Task)
+def publish_saved(sender, instance, created, **kwargs):
+    events.emit_change(instance, 'created' if created else 'updated')
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=ProjectMembers)
+@receiver(post_delete, sender=Epic)
+@receiver(post_delete, sender=Objective)
+@receiver(post_delete, sender=OKR)
+@receiver(post_delete, sender=Activity)
+@receiver(post_delete, sender=Task)
+def publish_deleted(sender, instance, **kwargs):
+    events.emit_change(instance, 'deleted')
+
+@receiver(m2m_changed, sender=OKR.tasks.through)
+def publish_okr_tasks_changed(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        events.emit_change(instance, 'updated')
+
+# Sección: Auditoría
+# Se acumula en okrs.audit y se escribe con un bulk_create por request
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Epic)
+@receiver(post_save, sender=Objective)
+@receiver(post_save, sender=OKR)
+@receiver(post_save, sender=Activity)
+@receiver(post_save, sender=Task)
+def audit_saved(sender, instance, created, **kwargs):
+    audit.record(instance, 'created' if created else 'updated')
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Epic)
+@receiver(post_delete, sender=Objective)
+@receiver(post_delete, sender=OKR)
+@receiver(post_delete, sender=Activity)
+@receiver(post_delete, sender=Task)
+def audit_deleted(sender, instance, **kwargs):
+    audit.record(instance, 'deleted')
+
+# Sección: Bandeja de tareas
+@receiver(post_save, sender=Task)
+def inbox_task_saved(sender, instance, created, **kwargs):
+    # Una tarea nueva sin asignar no tiene fila que crear ni borrar
+    if instance.assignee_id or not created:
+        inbox.sync_tasks([instance])
+
+@receiver(post_save, sender=Activity)
+def inbox_activity_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    if not instance.has_loaded_value('end_date') or instance.get_loaded_value('end_date') != instance.end_date:
+        inbox.update_due(instance)
+
+# Sección: Búsqueda
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Epic)
+@receiver(post_save, sender=Objective)
+@receiver(post_save, sender=OKR)
+@receiver(post_save, sender=Activity)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Comment)
+def search_saved(sender, instance, update_fields=None, **kwargs):
+    # Los guardados parciales que no tocan el texto (p. ej. el progreso) no reindexan
+    if update_fields is None or not search.get_indexed_fields(sender).isdisjoint(update_fields):
+        search.index([instance])
+
+# Sección: Notificaciones
+@receiver(post_save, sender=Log)
+def log_saved(sender, instance, created, **kwargs):
+    if created:
+        notifications.notify([instance])
+
+@receiver(pre_delete, sender=Project)
+def project_deleting(sender, instance, **kwargs):
+    # Antes del CASCADE, para descontar las no leídas de cada destinatario
+    notifications.discard_project([instance.pk])
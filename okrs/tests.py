@@ -1 +1,1508 @@
 # Sección: Tests
+import asyncio
+import io
+import json
+import re
+from datetime import date
+from unittest import mock, skipUnless
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from users.models import Users
+from .models import Project, ProjectMembers, Epic, Objective, OKR, Activity, Task, Log, Comment, Job, Notification
+from . import events
+
+def create_profile(username, role='employee'):
+    user = User.objects.create_user(username=username, password='secret', first_name=username, last_name='Test')
+    return Users.objects.create(user=user, role=role)
+
+def create_mission(owner, epics=1, objectives=1, okrs=1, activities=1, tasks=1):
+    """Crea una misión completa con el número de nodos indicado por nivel"""
+    project = Project.objects.create(name='Misión', created_by=owner, start_date=date.today(), tipo='mision')
+    ProjectMembers.objects.create(project=project, user=owner, role='owner')
+    for e in range(epics):
+        epic = Epic.objects.create(project=project, title=f'Épica {e}', owner=owner)
+        for o in range(objectives):
+            objective = Objective.objects.create(epic=epic, title=f'Objetivo {o}', owner=owner)
+            for k in range(okrs):
+                okr = OKR.objects.create(objective=objective, key_result=f'KR {k}', owner=owner)
+                for a in range(activities):
+                    activity = Activity.objects.create(okr=okr, name=f'Actividad {a}', owner=owner, start_date=date.today())
+                    for t in range(tasks):
+                        task = Task.objects.create(activity=activity, title=f'Tarea {t}', assignee=owner)
+                        okr.tasks.add(task)
+    return project
+
+class ProjectTreeQueriesTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = create_profile('admin', role='admin')
+        self.client.force_authenticate(self.admin.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_project_list_query_count_is_constant(self):
+        create_mission(self.admin)
+        small = self.count_queries('/api/okrs/projects/')
+        create_mission(self.admin, epics=3, objectives=3, okrs=2, activities=2, tasks=2)
+        large = self.count_queries('/api/okrs/projects/')
+        self.assertEqual(small, large)
+
+    def test_project_detail_query_count_is_constant(self):
+        small_project = create_mission(self.admin)
+        large_project = create_mission(self.admin, epics=4, objectives=3, okrs=3, activities=1, tasks=3)
+        small = self.count_queries(f'/api/okrs/projects/{small_project.id}/?tipo=mision')
+        large = self.count_queries(f'/api/okrs/projects/{large_project.id}/?tipo=mision')
+        self.assertEqual(small, large)
+
+    def test_project_tree_is_fully_serialized(self):
+        project = create_mission(self.admin, epics=2, objectives=2, okrs=1, activities=1, tasks=2)
+        response = self.client.get(f'/api/okrs/projects/{project.id}/')
+        epics = response.data['epics']
+        self.assertEqual(len(epics), 2)
+        self.assertEqual(len(epics[0]['objectives']), 2)
+        self.assertEqual(epics[0]['owner_name'], 'admin')
+        self.assertEqual(len(epics[0]['objectives'][0]['okrs'][0]['tasks']), 2)
+        self.assertEqual(response.data['objectives'], [])
+
+class ProgressRollupTest(APITestCase):
+    def setUp(self):
+        self.owner = create_profile('owner', role='manager')
+        self.project = create_mission(self.owner, epics=1, objectives=1, okrs=1, activities=2, tasks=2)
+        self.epic = self.project.epics.get()
+        self.objective = self.epic.objectives.get()
+        self.okr = self.objective.okrs.get()
+        self.activity, self.other_activity = self.okr.activities.order_by('id')
+
+    def assertProgress(self, okr, objective, epic, project):
+        self.okr.refresh_from_db()
+        self.objective.refresh_from_db()
+        self.epic.refresh_from_db()
+        self.project.refresh_from_db()
+        self.assertEqual(
+            (self.okr.progress, self.objective.progress, self.epic.progress, self.project.progress),
+            (okr, objective, epic, project),
+        )
+
+    def test_counters_follow_task_status_transitions(self):
+        task = self.activity.tasks.first()
+        task.status = 'completed'
+        task.save()
+        self.activity.refresh_from_db()
+        self.assertEqual((self.activity.tasks_total, self.activity.tasks_completed), (2, 1))
+        self.assertProgress(50, 50, 50, 50)
+
+        task.status = 'in progress'
+        task.save()
+        self.assertProgress(0, 0, 0, 0)
+
+    def test_counters_follow_creation_and_deletion(self):
+        Task.objects.create(activity=self.other_activity, title='Nueva', status='completed')
+        self.assertProgress(50, 50, 50, 50)
+
+        Objective.objects.create(epic=self.epic, title='Vacío', owner=self.owner)
+        self.assertProgress(50, 50, 25, 25)
+
+        self.other_activity.delete()
+        self.assertProgress(0, 0, 0, 0)
+
+    def test_moving_a_task_updates_both_activities(self):
+        task = self.activity.tasks.first()
+        task.status = 'completed'
+        task.save()
+        task.activity = self.other_activity
+        task.save()
+        self.activity.refresh_from_db()
+        self.other_activity.refresh_from_db()
+        self.assertEqual(self.activity.tasks_total, 1)
+        self.assertEqual((self.other_activity.tasks_total, self.other_activity.tasks_completed), (3, 1))
+        self.assertProgress(50, 50, 50, 50)
+
+    def test_saving_a_stale_instance_keeps_counters(self):
+        stale = Activity.objects.get(pk=self.activity.pk)
+        Task.objects.create(activity=self.activity, title='Nueva', status='completed')
+        stale.name = 'Renombrada'
+        stale.save()
+        self.activity.refresh_from_db()
+        self.assertEqual((self.activity.tasks_total, self.activity.tasks_completed), (3, 1))
+
+    def test_rebuild_detects_and_fixes_drift(self):
+        from .rollups import rebuild
+        self.assertEqual(rebuild(commit=False), [])
+        Task.objects.filter(activity=self.activity).update(status='completed')
+        drift = rebuild(commit=False)
+        self.assertIn(('Activity', self.activity.pk, 'tasks_completed', 0, 2), drift)
+        rebuild()
+        self.assertEqual(rebuild(commit=False), [])
+        self.assertProgress(50, 50, 50, 50)
+
+    def test_task_endpoint_updates_progress(self):
+        self.client.force_authenticate(self.owner.user)
+        task = self.activity.tasks.first()
+        response = self.client.patch(f'/api/okrs/tasks/{task.id}/', {'status': 'completed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertProgress(50, 50, 50, 50)
+
+class TaskBulkUpdateTest(APITestCase):
+    def setUp(self):
+        self.owner = create_profile('owner', role='manager')
+        self.employee = create_profile('employee')
+        self.project = create_mission(self.owner, epics=1, objectives=1, okrs=1, activities=2, tasks=3)
+        self.okr = OKR.objects.get()
+        self.tasks = list(Task.objects.order_by('id'))
+
+    def test_bulk_update_applies_changes_and_rollups(self):
+        self.client.force_authenticate(self.owner.user)
+        changes = [{'id': task.id, 'status': 'completed'} for task in self.tasks[:3]]
+        changes.append({'id': self.tasks[3].id, 'status': 'in progress', 'assignee': self.employee.id})
+        response = self.client.post('/api/okrs/tasks/bulk_update/', changes, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 4)
+
+        task = Task.objects.get(id=self.tasks[3].id)
+        self.assertEqual((task.status, task.completion_percentage, task.assignee_id), ('in progress', 50, self.employee.id))
+        self.assertEqual(Task.objects.get(id=self.tasks[0].id).completion_percentage, 100)
+        first, second = Activity.objects.order_by('id')
+        self.assertEqual((first.tasks_total, first.tasks_completed), (3, 3))
+        self.assertEqual((second.tasks_total, second.tasks_completed), (3, 0))
+        self.okr.refresh_from_db()
+        self.assertEqual(self.okr.progress, 50)
+
+    def test_bulk_update_checks_project_roles(self):
+        ProjectMembers.objects.create(project=self.project, user=self.employee, role='viewer')
+        self.client.force_authenticate(self.employee.user)
+        response = self.client.post('/api/okrs/tasks/bulk_update/', [{'id': self.tasks[0].id, 'status': 'completed'}], format='json')
+        self.assertEqual(response.status_code, 403)
+
+        ProjectMembers.objects.filter(user=self.employee).update(role='member')
+        response = self.client.post('/api/okrs/tasks/bulk_update/', [{'id': self.tasks[0].id, 'status': 'completed'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/okrs/tasks/bulk_update/', [{'id': self.tasks[0].id, 'assignee': self.employee.id}], format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_bulk_update_rejects_unknown_tasks(self):
+        self.client.force_authenticate(self.owner.user)
+        response = self.client.post('/api/okrs/tasks/bulk_update/', [{'id': 9999, 'status': 'completed'}], format='json')
+        self.assertEqual(response.status_code, 404)
+
+class AuthorizationContextTest(APITestCase):
+    def setUp(self):
+        self.owner = create_profile('owner', role='manager')
+        self.employee = create_profile('employee')
+        self.project = create_mission(self.owner)
+        ProjectMembers.objects.create(project=self.project, user=self.employee, role='member')
+        self.okr = OKR.objects.get()
+
+    def test_write_permission_check_uses_two_queries(self):
+        from rest_framework.request import Request
+        from rest_framework.parsers import JSONParser
+        from rest_framework.test import APIRequestFactory
+        from .permissions import CanEditActivities, get_authorization_context
+        from .views import get_authenticated_profile
+
+        factory = APIRequestFactory()
+        http_request = factory.post('/api/okrs/activities/', {'okr': self.okr.id}, format='json')
+        request = Request(http_request, parsers=[JSONParser()], authenticators=[])
+        request.user = self.employee.user
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(CanEditActivities().has_permission(request, None))
+            self.assertEqual(get_authenticated_profile(request), self.employee)
+            self.assertEqual(get_authorization_context(request).get_role(self.project.id), 'member')
+            self.assertEqual(request.user.users, self.employee)
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_viewer_cannot_edit_activities(self):
+        ProjectMembers.objects.filter(user=self.employee).update(role='viewer')
+        self.client.force_authenticate(self.employee.user)
+        response = self.client.post('/api/okrs/activities/', {
+            'okr': self.okr.id, 'name': 'Nueva', 'start_date': str(date.today()),
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_member_can_create_activity(self):
+        self.client.force_authenticate(self.employee.user)
+        response = self.client.post('/api/okrs/activities/', {
+            'okr': self.okr.id, 'name': 'Nueva', 'start_date': str(date.today()),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Activity.objects.get(name='Nueva').owner, self.employee)
+
+class RootProjectTest(APITestCase):
+    def setUp(self):
+        self.owner = create_profile('owner', role='manager')
+        self.employee = create_profile('employee')
+        self.project = create_mission(self.owner, epics=1, objectives=1, okrs=1, activities=1, tasks=2)
+        self.other_project = create_mission(self.owner)
+        self.task = Task.objects.filter(root_project=self.project).first()
+        Comment.objects.create(task=self.task, user=self.owner, text='Hola')
+        Log.objects.create(task=self.task, user=self.owner, log_text='Creada')
+
+    def roots(self, model):
+        return set(model.objects.filter(root_project__isnull=False).values_list('root_project_id', flat=True))
+
+    def test_root_project_is_set_on_create(self):
+        for model in (Objective, OKR, Activity, Task):
+            self.assertEqual(model.objects.filter(root_project__isnull=True).count(), 0)
+        self.assertEqual(Comment.objects.get().root_project_id, self.project.id)
+        self.assertEqual(Log.objects.get().root_project_id, self.project.id)
+
+    def test_moving_an_epic_propagates_root_project(self):
+        epic = self.project.epics.get()
+        epic.project = self.other_project
+        epic.save()
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.root_project_id, self.other_project.id)
+        self.assertEqual(Comment.objects.get().root_project_id, self.other_project.id)
+        self.assertEqual(Log.objects.get().root_project_id, self.other_project.id)
+
+    def test_moving_an_objective_propagates_root_project(self):
+        objective = Objective.objects.get(root_project=self.project)
+        objective.epic = None
+        objective.project = self.other_project
+        objective.save()
+        self.assertEqual(self.roots(Activity), {self.other_project.id})
+        self.assertEqual(Task.objects.filter(root_project=self.other_project).count(), 3)
+
+    def test_backfill_command_restores_root_project(self):
+        from django.core.management import call_command
+        for model in (Objective, OKR, Activity, Task, Log, Comment):
+            model.objects.update(root_project=None)
+        call_command('backfill_root_project', stdout=io.StringIO())
+        self.assertEqual(self.roots(Task), {self.project.id, self.other_project.id})
+        self.assertEqual(Log.objects.get().root_project_id, self.project.id)
+
+    def test_employee_sees_only_member_projects(self):
+        ProjectMembers.objects.create(project=self.project, user=self.employee, role='member')
+        self.client.force_authenticate(self.employee.user)
+        response = self.client.get('/api/okrs/tasks/')
+        self.assertEqual({task['id'] for task in response.data['results']}, set(Task.objects.filter(root_project=self.project).values_list('id', flat=True)))
+        response = self.client.get('/api/okrs/comments/')
+        self.assertEqual(len(response.data['results']), 1)
+
+class CursorPaginationTest(APITestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        self.client.force_authenticate(self.admin.user)
+        create_mission(self.admin, epics=1, objectives=1, okrs=1, activities=5, tasks=5)
+
+    def test_pages_cover_all_tasks_in_order(self):
+        ids, url = [], '/api/okrs/tasks/?page_size=7'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 7)
+            ids += [task['id'] for task in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, list(Task.objects.order_by('created', 'id').values_list('id', flat=True)))
+
+    def test_duplicate_timestamps_across_pages_break_ties_by_id(self):
+        from django.utils import timezone
+        Task.objects.update(created=timezone.now())
+        pages, url = [], '/api/okrs/tasks/?page_size=7'
+        while url:
+            response = self.client.get(url)
+            pages.append([task['id'] for task in response.data['results']])
+            url = response.data['next']
+        ids = [pk for page in pages for pk in page]
+        self.assertEqual(ids, sorted(Task.objects.values_list('id', flat=True)))
+        self.assertEqual(len(pages), 4)
+
+        # Volviendo con previous desde la última página se recorren las mismas páginas
+        url = self.client.get(response.data['previous']).data['previous']
+        self.assertEqual([task['id'] for task in self.client.get(url).data['results']], pages[1])
+
+    def test_page_size_is_capped_and_count_is_optional(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/okrs/tasks/?page_size=1000')
+        self.assertEqual(len(response.data['results']), 25)
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in ctx.captured_queries))
+
+        response = self.client.get('/api/okrs/tasks/?page_size=5&count=true')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+class ProjectTreeCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = create_profile('admin', role='admin')
+        self.client.force_authenticate(self.admin.user)
+        self.project = create_mission(self.admin, epics=1, objectives=1, okrs=1, activities=1, tasks=2)
+        self.url = f'/api/okrs/projects/{self.project.id}/?tipo=mision'
+
+    def get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_second_request_is_a_hit_with_fewer_queries(self):
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(self.client.get('/api/okrs/projects/cache_stats/').data, {'hits': 1, 'misses': 1})
+
+    def test_changes_in_the_tree_invalidate_the_cache(self):
+        self.get()
+        task = Task.objects.first()
+        task.status = 'completed'
+        task.save()
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['progress'], 100)
+
+        self.client.post('/api/okrs/tasks/bulk_update/', [{'id': task.id, 'status': 'backlog'}], format='json')
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['progress'], 0)
+
+    def test_other_projects_stay_cached(self):
+        other = create_mission(self.admin)
+        self.get()
+        Task.objects.filter(root_project=other).first().delete()
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_file_based_backend(self):
+        import tempfile
+        from django.test import override_settings
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with override_settings(CACHES={'default': backend}):
+                self.assertEqual(self.get()['X-Cache'], 'MISS')
+                self.assertEqual(self.get()['X-Cache'], 'HIT')
+                Epic.objects.create(project=self.project, title='Nueva', owner=self.admin)
+                response = self.get()
+                self.assertEqual(response['X-Cache'], 'MISS')
+                self.assertEqual(len(response.data['epics']), 2)
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = create_profile('admin', role='admin')
+        self.client.force_authenticate(self.admin.user)
+        self.project = create_mission(self.admin, epics=2, objectives=1, okrs=1, activities=1, tasks=2)
+        self.other = create_mission(self.admin)
+
+    def test_revision_increases_with_changes_below_the_project(self):
+        self.project.refresh_from_db()
+        revision = self.project.revision
+        Task.objects.filter(root_project=self.project).first().delete()
+        self.project.refresh_from_db()
+        self.assertGreater(self.project.revision, revision)
+
+        other_revision = Project.objects.get(pk=self.other.pk).revision
+        self.project.name = 'Renombrada'
+        self.project.save()
+        self.assertEqual(Project.objects.get(pk=self.other.pk).revision, other_revision)
+
+    def test_detail_answers_304_without_loading_the_tree(self):
+        url = f'/api/okrs/projects/{self.project.id}/'
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('okrs_epic' in query['sql'] for query in ctx.captured_queries))
+
+        Epic.objects.filter(project=self.project).first().save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_lists_follow_the_revisions_of_their_projects(self):
+        url = f'/api/okrs/epics/?project={self.project.id}'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Task.objects.filter(root_project=self.other).update(status='completed')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        task = Task.objects.filter(root_project=self.project).first()
+        task.status = 'completed'
+        task.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_task_detail_etag(self):
+        task = Task.objects.first()
+        url = f'/api/okrs/tasks/{task.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/okrs/tasks/999999/').status_code, 404)
+
+    def test_etag_does_not_bypass_object_permissions(self):
+        from .conditional import make_revision_etag
+        employee = create_profile('employee')
+        ProjectMembers.objects.create(project=self.project, user=employee, role='member')
+        task = Task.objects.filter(root_project=self.project).first()
+        url = f'/api/okrs/tasks/{task.id}/'
+        self.project.refresh_from_db()
+        etag = make_revision_etag(employee.user.pk, url, 'json', [(self.project.pk, self.project.revision)])
+        self.client.force_authenticate(employee.user)
+        # La tarea no está asignada al empleado: 403 aunque el ETag coincida
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 403)
+        Task.objects.filter(pk=task.pk).update(assignee=employee)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+class SparseFieldsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = create_profile('admin', role='admin')
+        self.client.force_authenticate(self.admin.user)
+        self.project = create_mission(self.admin, epics=2, objectives=2, okrs=1, activities=1, tasks=2)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in ctx.captured_queries]
+
+    def test_fields_limit_output_and_skip_nested_queries(self):
+        response, queries = self.get('/api/okrs/projects/?fields=id,name,progress')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'progress'})
+        _, full_queries = self.get('/api/okrs/projects/')
+        self.assertFalse(any('okrs_epic' in sql for sql in queries))
+        self.assertEqual(len(full_queries) - len(queries), 6)
+
+    def test_depth_cuts_the_tree(self):
+        response, queries = self.get(f'/api/okrs/projects/{self.project.id}/?depth=1')
+        epic = response.data['epics'][0]
+        self.assertNotIn('objectives', epic)
+        self.assertFalse(any('okrs_okr' in sql for sql in queries))
+
+        response, _ = self.get(f'/api/okrs/projects/{self.project.id}/?depth=3')
+        okr = response.data['epics'][0]['objectives'][0]['okrs'][0]
+        self.assertNotIn('tasks', okr)
+
+        self.assertEqual(self.client.get('/api/okrs/projects/?depth=-1').status_code, 400)
+
+    def test_summary_view_for_lists(self):
+        response, queries = self.get('/api/okrs/projects/?tipo=mision&view=summary')
+        self.assertEqual(set(response.data['results'][0]), {
+            'id', 'name', 'description', 'created_by_name', 'start_date', 'end_date', 'color', 'tipo', 'progress',
+        })
+        response, _ = self.get('/api/okrs/tasks/?view=summary&fields=id,status')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status'})
+
+    def test_writes_ignore_field_options(self):
+        epic = Epic.objects.first()
+        response = self.client.patch(f'/api/okrs/epics/{epic.id}/?fields=id', {'title': 'Nueva'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('objectives', response.data)
+
+class ActivityProgressTest(APITestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        self.client.force_authenticate(self.admin.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_activity_list_cost_does_not_depend_on_page_size(self):
+        project = create_mission(self.admin, epics=1, objectives=1, okrs=1, activities=2, tasks=2)
+        okr = OKR.objects.get(root_project=project)
+        _, small = self.count_queries(f'/api/okrs/activities/?okr_id={okr.id}&depth=0')
+        for i in range(6):
+            Activity.objects.create(okr=okr, name=f'Extra {i}', owner=self.admin, start_date=date.today())
+        _, large = self.count_queries(f'/api/okrs/activities/?okr_id={okr.id}&depth=0')
+        self.assertEqual(small, large)
+
+    def test_activity_progress_comes_from_counters(self):
+        create_mission(self.admin, epics=1, objectives=1, okrs=1, activities=1, tasks=4)
+        activity = Activity.objects.get()
+        Task.objects.filter(pk__in=activity.tasks.values('pk')[:1]).update(status='completed')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(activity.calculate_progress(), 0)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(activity.calculate_progress(recount=True), 25)
+
+        response = self.client.get(f'/api/okrs/activities/{activity.id}/')
+        self.assertEqual(response.data['progress'], 25)
+
+class SubtreeDeletionTest(APITestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        self.client.force_authenticate(self.admin.user)
+
+    def create_project(self, size):
+        project = create_mission(self.admin, epics=2, objectives=size, okrs=size, activities=size, tasks=2)
+        for task in Task.objects.filter(root_project=project):
+            Comment.objects.create(task=task, user=self.admin, text='Comentario')
+            Log.objects.create(task=task, user=self.admin, log_text='Creada')
+        return project
+
+    def delete_epic(self, epic):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.delete(f'/api/okrs/epics/{epic.id}/')
+        self.assertEqual(response.status_code, 204)
+        return len(ctx.captured_queries)
+
+    def test_epic_deletion_uses_a_bounded_number_of_statements(self):
+        small = self.create_project(1)
+        large = self.create_project(3)
+        small_queries = self.delete_epic(small.epics.first())
+        large_queries = self.delete_epic(large.epics.first())
+        self.assertEqual(small_queries, large_queries)
+
+    def test_summary_counts_and_rollups(self):
+        from .deletion import delete_subtree
+        project = self.create_project(2)
+        task = Task.objects.filter(root_project=project).first()
+        task.status = 'completed'
+        task.save()
+        revision = Project.objects.get(pk=project.pk).revision
+        epic = Epic.objects.get(pk=task.activity.okr.objective.epic_id)
+
+        summary = delete_subtree(Epic, [epic.pk])
+        self.assertEqual(summary, {
+            'Comment': 16, 'TaskInbox': 16, 'Log': 16, 'OKR_tasks': 16, 'Task': 16, 'Activity': 8, 'OKR': 4,
+            'Objective': 2, 'Epic': 1, 'SearchDocument': 47,
+        })
+        self.assertEqual(Task.objects.filter(root_project=project).count(), 16)
+        project.refresh_from_db()
+        self.assertEqual((project.children_total, project.progress), (1, 0))
+        self.assertGreater(project.revision, revision)
+        from .rollups import rebuild
+        self.assertEqual(rebuild(commit=False), [])
+
+    def test_activity_and_project_deletion(self):
+        project = self.create_project(1)
+        activity = Activity.objects.filter(root_project=project).first()
+        self.assertEqual(activity.delete(), (16, {
+            'okrs.Comment': 2, 'okrs.TaskInbox': 2, 'okrs.Log': 2, 'okrs.OKR_tasks': 2, 'okrs.Task': 2, 'okrs.Activity': 1,
+            'okrs.SearchDocument': 5,
+        }))
+        response = self.client.delete(f'/api/okrs/projects/{project.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Project.objects.filter(pk=project.pk).exists())
+        self.assertEqual(Task.objects.count() + Comment.objects.count() + ProjectMembers.objects.count(), 0)
+
+class JobQueueTest(APITestCase):
+    def setUp(self):
+        from . import jobs
+        self.jobs = jobs
+        self.calls = []
+        jobs.register('test_job')(self.handler)
+        self.admin = create_profile('admin', role='admin')
+
+    def tearDown(self):
+        self.jobs.JOB_HANDLERS.pop('test_job', None)
+
+    def handler(self, job):
+        self.calls.append(job.payload)
+        if job.payload.get('fail'):
+            raise ValueError('falló')
+        return {'ok': True}
+
+    def test_pending_jobs_are_deduplicated_by_key(self):
+        first = self.jobs.enqueue('test_job', {'okr': 42}, key='recount:42')
+        second = self.jobs.enqueue('test_job', {'okr': 42}, key='recount:42')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(self.jobs.run_pending(), 1)
+        self.assertEqual(self.calls, [{'okr': 42}])
+        job = self.jobs.enqueue('test_job', {'okr': 42}, key='recount:42')
+        self.assertNotEqual(job.pk, first.pk)
+        self.assertEqual(Job.objects.get(pk=first.pk).result, {'ok': True})
+
+    def test_failures_are_retried_with_backoff(self):
+        job = self.jobs.enqueue('test_job', {'fail': True}, max_attempts=2)
+        self.assertEqual(self.jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertIn('falló', job.last_error)
+        self.assertEqual(self.jobs.run_pending(), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_at=job.created)
+        self.jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_jobs_abandoned_by_a_dead_worker_are_reclaimed(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        job = self.jobs.enqueue('test_job', {'okr': 7}, max_attempts=2)
+        lost = self.jobs.enqueue('test_job', {'okr': 8}, max_attempts=1)
+        # Un worker reclama los dos y muere sin terminarlos
+        self.assertEqual({self.jobs.claim_next_job().pk, self.jobs.claim_next_job().pk}, {job.pk, lost.pk})
+        self.assertEqual(self.jobs.run_pending(), 0)
+
+        Job.objects.update(started=timezone.now() - self.jobs.get_timeout() - timedelta(seconds=1))
+        self.assertEqual(self.jobs.run_pending(), 1)
+        self.assertEqual(self.calls, [{'okr': 7}])
+        job.refresh_from_db()
+        lost.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+        self.assertEqual((lost.status, lost.attempts), ('failed', 1))
+        self.assertIn('OKRS_JOB_TIMEOUT', lost.last_error)
+
+    def test_background_epic_deletion(self):
+        project = create_mission(self.admin, epics=2)
+        epic = project.epics.first()
+        self.client.force_authenticate(self.admin.user)
+        response = self.client.delete(f'/api/okrs/epics/{epic.id}/?background=true')
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(Epic.objects.filter(pk=epic.pk).exists())
+
+        self.jobs.run_pending()
+        self.assertFalse(Epic.objects.filter(pk=epic.pk).exists())
+        job = self.client.get(f"/api/okrs/jobs/{response.data['id']}/").data
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result']['Epic'], 1)
+        self.assertEqual(job['progress']['step'], job['progress']['total'])
+
+    def test_admin_changelist_shows_queue_stats(self):
+        self.jobs.enqueue('test_job')
+        self.admin.user.is_staff = self.admin.user.is_superuser = True
+        self.admin.user.save()
+        self.client.force_login(self.admin.user)
+        response = self.client.get('/admin/okrs/job/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['queue_stats']['ready'], 1)
+
+class RunWorkersTest(TransactionTestCase):
+    def setUp(self):
+        from . import jobs
+        self.jobs = jobs
+        jobs.register('test_job')(lambda job: {'ok': True})
+
+    def tearDown(self):
+        self.jobs.JOB_HANDLERS.pop('test_job', None)
+
+    def test_workers_stop_through_the_flag(self):
+        import threading
+        import time
+        from .management.commands.run_workers import Command
+        for _ in range(3):
+            self.jobs.enqueue('test_job')
+        stop, counts = threading.Event(), []
+        thread = threading.Thread(target=lambda: counts.extend(Command().run_workers(2, 0.05, False, stop)))
+        thread.start()
+        deadline = time.monotonic() + 5
+        while Job.objects.exclude(status='done').exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # Con la cola vacía los hilos siguen esperando trabajos hasta que se activa stop
+        self.assertTrue(thread.is_alive())
+        stop.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual((len(counts), sum(counts)), (2, 3))
+
+class AsyncReadViewsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = create_profile('admin', role='admin')
+        self.employee = create_profile('employee')
+        self.project = create_mission(self.admin, epics=2, objectives=1, okrs=1, activities=1, tasks=2)
+        Task.objects.filter(root_project=self.project).update(assignee=self.employee)
+        ProjectMembers.objects.create(project=self.project, user=self.employee, role='member')
+
+    def get_both(self, path, user):
+        """Respuesta de la vista DRF y de su variante asíncrona para el mismo usuario"""
+        self.client.force_authenticate(user)
+        sync = self.client.get(f'/api/okrs/{path}')
+        self.client.force_authenticate(None)
+        self.client.force_login(user)
+        response = self.client.get(f'/api/okrs/async/{path}')
+        self.client.logout()
+        self.assertEqual(response.status_code, sync.status_code)
+        return sync, response
+
+    def test_async_responses_match_the_sync_views(self):
+        for path in ('projects/', f'projects/{self.project.id}/?view=summary', 'tasks/my_tasks/'):
+            sync, response = self.get_both(path, self.admin.user)
+            self.assertEqual(response.json(), sync.json())
+        sync, response = self.get_both(f'tasks/project_tasks/?project_id={self.project.id}', self.employee.user)
+        self.assertEqual(len(response.json()), 4)
+        self.assertEqual(response.json(), sync.json())
+
+    def test_async_detail_uses_cache_and_etag(self):
+        self.client.force_login(self.admin.user)
+        url = f'/api/okrs/async/projects/{self.project.id}/'
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_async_permissions_and_errors(self):
+        self.assertEqual(self.client.get('/api/okrs/async/projects/').status_code, 401)
+        self.client.force_login(self.employee.user)
+        self.assertEqual(self.client.get('/api/okrs/async/projects/').status_code, 403)
+        self.assertEqual(self.client.get('/api/okrs/async/tasks/project_tasks/').status_code, 400)
+        self.client.force_login(self.admin.user)
+        self.assertEqual(self.client.get('/api/okrs/async/projects/?page=9').status_code, 404)
+        self.assertEqual(self.client.get('/api/okrs/async/projects/999999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/okrs/async/projects/?depth=x').status_code, 400)
+
+class RecordingBroker:
+    def __init__(self):
+        self.published = []
+
+    def is_active(self):
+        return True
+
+    def publish(self, channel, event):
+        self.published.append((channel, event))
+
+class LiveEventsTest(APITestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        self.employee = create_profile('employee')
+        self.project = create_mission(self.admin, tasks=2)
+        self.broker = RecordingBroker()
+        patcher = mock.patch('okrs.events.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_task_change_is_published_on_commit_with_revision(self):
+        task = Task.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            task.status = 'completed'
+            task.assignee = self.employee
+            task.save()
+            self.assertEqual(self.broker.published, [])
+        channels = {channel for channel, _ in self.broker.published}
+        self.assertEqual(channels, {f'project:{self.project.id}', f'user:{self.employee.id}', f'user:{self.admin.id}'})
+        event = dict(self.broker.published)[f'project:{self.project.id}']
+        self.project.refresh_from_db()
+        self.assertEqual(event['type'], 'task')
+        self.assertEqual(event['parent'], task.activity_id)
+        self.assertEqual(event['revision'], self.project.revision)
+        self.assertEqual(event['project_progress'], self.project.progress)
+
+    def test_bulk_paths_publish_events(self):
+        from .deletion import delete_subtree
+        self.client.force_authenticate(self.admin.user)
+        task = Task.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/okrs/tasks/bulk_update/', [{'id': task.id, 'status': 'completed'}], format='json')
+        self.assertEqual(self.broker.published[0][1]['status'], 'completed')
+
+        self.broker.published.clear()
+        epic = Epic.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_subtree(Epic, [epic.id])
+        self.assertEqual(self.broker.published, [(f'project:{self.project.id}', mock.ANY)])
+        self.assertEqual(self.broker.published[0][1]['action'], 'deleted')
+
+    def test_rolled_back_changes_are_not_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Task.objects.first().save()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self.broker.published, [])
+
+class EventStreamTest(TransactionTestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        self.employee = create_profile('employee')
+        self.project = create_mission(self.admin)
+
+    async def read_event(self, response):
+        chunk = await asyncio.wait_for(anext(response.streaming_content), 5)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        return json.loads(chunk.split('data: ', 1)[1])
+
+    async def test_project_stream_receives_changes(self):
+        await self.async_client.aforce_login(self.admin.user)
+        response = await self.async_client.get(f'/api/okrs/events/projects/{self.project.id}/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        hello = await self.read_event(response)
+        self.assertEqual(hello['type'], 'hello')
+
+        task = await Task.objects.afirst()
+        task.status = 'completed'
+        await sync_to_async(task.save)()
+        event = await self.read_event(response)
+        self.assertEqual((event['type'], event['id'], event['progress']), ('task', task.id, 100))
+        self.assertGreater(event['revision'], hello['revision'])
+        await sync_to_async(response.close)()
+        self.assertFalse(events.get_broker().is_active())
+
+    async def test_streams_require_membership(self):
+        await self.async_client.aforce_login(self.employee.user)
+        response = await self.async_client.get(f'/api/okrs/events/projects/{self.project.id}/')
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get('/api/okrs/events/me/')
+        self.assertEqual((await self.read_event(response))['user'], self.employee.id)
+        await sync_to_async(response.close)()
+
+class NotificationTest(APITestCase):
+    def setUp(self):
+        self.owner = create_profile('owner')
+        self.member = create_profile('member')
+        self.other = create_profile('other')
+        self.project = create_mission(self.owner)
+        ProjectMembers.objects.create(project=self.project, user=self.member, role='member')
+        self.client.force_authenticate(self.member.user)
+
+    def log(self, text='Tarea creada', user=None):
+        return Log.objects.create(project=self.project, user=user or self.owner, log_text=text)
+
+    def unread(self, profile):
+        return Users.objects.get(pk=profile.pk).unread_notifications
+
+    def test_logs_fan_out_to_members_except_the_author(self):
+        self.log()
+        self.log()
+        self.assertEqual(self.unread(self.member), 2)
+        self.assertEqual(self.unread(self.owner), 0)
+        self.assertEqual(self.unread(self.other), 0)
+        response = self.client.get('/api/okrs/notifications/')
+        self.assertEqual([n['message'] for n in response.data['results']], ['Tarea creada', 'Tarea creada'])
+        self.assertEqual(self.client.get('/api/okrs/notifications/unread_count/').data, {'unread': 2})
+
+    def test_mark_read_and_delete_keep_the_counter(self):
+        for i in range(3):
+            self.log(f'Log {i}')
+        ids = list(Notification.objects.filter(recipient=self.member).values_list('pk', flat=True))
+        self.client.post(f'/api/okrs/notifications/{ids[0]}/mark_read/')
+        self.assertEqual(self.unread(self.member), 2)
+        self.client.delete(f'/api/okrs/notifications/{ids[1]}/')
+        self.assertEqual(self.unread(self.member), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/okrs/notifications/mark_all_read/')
+        self.assertEqual(response.data, {'marked': 1})
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "okrs_notification"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.unread(self.member), 0)
+        self.assertEqual(self.client.post(f'/api/okrs/notifications/{ids[0]}/mark_read/').data, {'marked': 0})
+
+    def test_prune_in_batches_and_project_deletion(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .deletion import delete_subtree
+        from .notifications import prune
+        for i in range(5):
+            self.log(f'Viejo {i}')
+        Notification.objects.update(created=timezone.now() - timedelta(days=100))
+        self.log('Nuevo')
+        self.assertEqual(prune(timezone.now() - timedelta(days=90), batch_size=2), 5)
+        self.assertEqual(self.unread(self.member), 1)
+
+        delete_subtree(Project, [self.project.pk])
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(self.unread(self.member), 0)
+
+class AuditTest(APITestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        self.member = create_profile('member')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project = create_mission(self.admin, tasks=3)
+            ProjectMembers.objects.create(project=self.project, user=self.member, role='member')
+        Log.objects.all().delete()
+        Notification.objects.all().delete()
+        self.client.force_authenticate(self.admin.user)
+
+    def test_changes_are_logged_with_ancestors_and_author(self):
+        task = Task.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/okrs/tasks/{task.id}/', {'title': 'Renombrada'}, format='json')
+        log = Log.objects.get()
+        activity = task.activity
+        self.assertEqual(log.log_type, 'Task Updated')
+        self.assertEqual(log.log_text, 'Se actualizó la tarea "Renombrada"')
+        self.assertEqual(log.user, self.admin)
+        self.assertEqual(
+            (log.task_id, log.activity_id, log.okr_id, log.objective_id, log.epic_id, log.project_id, log.root_project_id),
+            (task.id, activity.id, activity.okr_id, activity.okr.objective_id, activity.okr.objective.epic_id,
+             self.project.id, self.project.id),
+        )
+        self.assertEqual(Notification.objects.get().recipient, self.member)
+
+    def test_one_insert_per_request(self):
+        tasks = list(Task.objects.all())
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/okrs/tasks/bulk_update/', [{'id': task.id, 'status': 'completed'} for task in tasks], format='json'
+            )
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "okrs_log"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Log.objects.filter(log_type='Task Updated').count(), 3)
+
+    def test_deletions_are_logged_on_the_surviving_parent(self):
+        from .deletion import delete_subtree
+        task = Task.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/okrs/tasks/{task.id}/')
+        log = Log.objects.get()
+        self.assertEqual((log.log_type, log.task_id, log.activity_id), ('Task Deleted', None, task.activity_id))
+
+        # En cascada solo se registra el nodo borrado; sus descendientes no tienen dónde
+        Log.objects.all().delete()
+        epic = Epic.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            epic.objectives.get().delete()
+        self.assertEqual(list(Log.objects.values_list('log_type', 'epic_id')), [('Objective Deleted', epic.id)])
+        # Los logs de la épica se borran con ella
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_subtree(Epic, [epic.id])
+        self.assertEqual(list(Log.objects.values_list('log_type', 'project_id', 'epic_id')), [('Epic Deleted', self.project.id, None)])
+
+    def test_rolled_back_changes_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Task.objects.first().save()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertFalse(Log.objects.exists())
+
+    def test_middleware_is_not_adapted_under_asgi(self):
+        from django.core.handlers.asgi import ASGIHandler
+        from django.core.handlers.base import BaseHandler
+        adapted, adapt_method_mode = [], BaseHandler.adapt_method_mode
+
+        def adapt(handler, is_async, method, method_is_async=None, debug=False, name=None):
+            adapted_method = adapt_method_mode(handler, is_async, method, method_is_async, debug, name)
+            if adapted_method is not method:
+                adapted.append(name)
+            return adapted_method
+
+        with mock.patch.object(BaseHandler, 'adapt_method_mode', adapt):
+            ASGIHandler()
+        self.assertNotIn('middleware okrs.audit.AuditMiddleware', adapted)
+
+    def test_async_requests_are_logged(self):
+        from asgiref.sync import async_to_sync
+        from rest_framework_simplejwt.tokens import AccessToken
+        task = Task.objects.first()
+        # Una vista síncrona detrás del middleware asíncrono
+        with self.captureOnCommitCallbacks(execute=True):
+            response = async_to_sync(self.async_client.patch)(
+                f'/api/okrs/tasks/{task.id}/', {'title': 'Asíncrona'}, content_type='application/json',
+                headers={'Authorization': f'Bearer {AccessToken.for_user(self.admin.user)}'},
+            )
+        self.assertEqual(response.status_code, 200)
+        log = Log.objects.get()
+        self.assertEqual((log.log_type, log.user), ('Task Updated', self.admin))
+
+class LogArchiveTest(APITestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(OKRS_LOG_ARCHIVE_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = create_profile('admin', role='admin')
+        self.member = create_profile('member')
+        self.project = create_mission(self.admin)
+        other = create_mission(self.admin)
+        ProjectMembers.objects.create(project=self.project, user=self.member, role='member')
+        Log.objects.all().delete()
+        for i in range(5):
+            Log.objects.create(project=self.project, user=self.admin, log_text=f'Viejo {i}')
+        Log.objects.create(project=other, user=self.admin, log_text='Otro proyecto')
+        Log.objects.create(project=self.project, user=self.admin, log_text='Nuevo')
+        Log.objects.exclude(log_text='Nuevo').update(month=date(2025, 1, 1))
+
+    def test_archive_moves_old_months_in_batches(self):
+        from .archive import append_batch, archive_logs, get_archive_path, read_archive
+        month = date(2025, 1, 1)
+        self.assertEqual(archive_logs(date(2025, 2, 1), batch_size=2), {'2025-01': 6})
+        self.assertEqual(list(Log.objects.values_list('log_text', flat=True)), ['Nuevo'])
+        # Un lote escrito dos veces (corte antes del borrado) se lee una sola vez
+        append_batch(get_archive_path(month), list(read_archive(month))[4:])
+        texts = [row['log_text'] for row in read_archive(month)]
+        self.assertEqual(texts, [f'Viejo {i}' for i in range(5)] + ['Otro proyecto'])
+
+    def test_archived_months_are_read_through_the_api(self):
+        from .archive import archive_logs
+        archive_logs(date(2025, 2, 1))
+        self.client.force_authenticate(self.member.user)
+        response = self.client.get('/api/okrs/logs/?month=2025-01&page_size=3')
+        self.assertEqual([log['log_text'] for log in response.data['results']], ['Viejo 0', 'Viejo 1', 'Viejo 2'])
+        self.assertEqual(response.data['results'][0]['user_name'], 'admin')
+        # El empleado no ve el log del proyecto ajeno
+        response = self.client.get(response.data['next'])
+        self.assertEqual([log['log_text'] for log in response.data['results']], ['Viejo 3', 'Viejo 4'])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get('/api/okrs/logs/months/')
+        this_month = date.today().strftime('%Y-%m')
+        self.assertEqual(response.data, [{'month': '2025-01', 'archived': True}, {'month': this_month, 'archived': False}])
+        response = self.client.get(f'/api/okrs/logs/?month={this_month}&project={self.project.id}')
+        self.assertEqual([log['log_text'] for log in response.data['results']], ['Nuevo'])
+        self.assertEqual(self.client.get('/api/okrs/logs/?month=enero').status_code, 400)
+
+    def test_partially_archived_month_merges_live_rows(self):
+        from .archive import ARCHIVE_FIELDS, append_batch, archive_month, get_archive_path
+        month = date(2025, 1, 1)
+        # Archivado interrumpido: los dos primeros logs se movieron, el tercero quedó
+        # escrito sin borrar y el resto sigue en la base
+        first = list(Log.objects.filter(month=month).order_by('pk').values_list('pk', flat=True))
+        Log.objects.filter(month=month).exclude(pk__in=first[:3]).update(month=date(2025, 2, 1))
+        archive_month(month)
+        Log.objects.filter(month=date(2025, 2, 1)).update(month=month)
+        append_batch(get_archive_path(month), list(Log.objects.filter(pk=first[3]).values(*ARCHIVE_FIELDS)))
+        self.assertEqual(Log.objects.filter(month=month).count(), 3)
+
+        self.client.force_authenticate(self.member.user)
+        response = self.client.get('/api/okrs/logs/?month=2025-01&page_size=3')
+        self.assertEqual([log['log_text'] for log in response.data['results']], ['Viejo 0', 'Viejo 1', 'Viejo 2'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([log['log_text'] for log in response.data['results']], ['Viejo 3', 'Viejo 4'])
+        self.assertIsNone(response.data['next'])
+
+class TaskInboxTest(APITestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        self.employee = create_profile('employee')
+        self.project = create_mission(self.admin, tasks=4)
+        self.tasks = list(Task.objects.order_by('pk'))
+        for task in self.tasks:
+            task.assignee = self.employee
+            task.save()
+        self.client.force_authenticate(self.employee.user)
+
+    def inbox(self, query=''):
+        response = self.client.get(f'/api/okrs/tasks/inbox/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_inbox_follows_task_changes(self):
+        from .models import TaskInbox
+        first, second, third, fourth = self.tasks
+        self.assertEqual(self.inbox(), [fourth.id, third.id, second.id, first.id])
+        first.status = 'completed'
+        first.save()
+        second.archived = True
+        second.save()
+        third.assignee = None
+        third.save()
+        self.client.force_authenticate(self.admin.user)
+        self.client.post('/api/okrs/tasks/bulk_update/', [{'id': fourth.id, 'assignee': self.admin.id}], format='json')
+        self.client.force_authenticate(self.employee.user)
+
+        self.assertEqual(self.inbox(), [first.id])
+        self.assertEqual(self.inbox('?archived=true'), [second.id])
+        self.assertEqual(TaskInbox.objects.get(task=first).status, 'completed')
+        self.assertEqual(TaskInbox.objects.get(task=fourth).user, self.admin)
+
+        activity = first.activity
+        activity.end_date = date(2030, 1, 31)
+        activity.save()
+        self.assertEqual(self.inbox('?due_after=2030-01-01&status=completed,backlog'), [first.id])
+        self.assertEqual(self.inbox('?due_before=2029-12-31'), [])
+        self.assertEqual(self.client.get('/api/okrs/tasks/inbox/?status=cerrada').status_code, 400)
+
+        from .deletion import delete_subtree
+        delete_subtree(Activity, [activity.id])
+        self.assertFalse(TaskInbox.objects.exists())
+
+    def test_inbox_pages_with_constant_queries_and_rebuild(self):
+        from .inbox import rebuild
+        from .models import TaskInbox
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/okrs/tasks/inbox/?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        inbox_queries = [q for q in ctx.captured_queries if 'okrs_taskinbox' in q['sql']]
+        self.assertEqual(len(inbox_queries), 1)
+        self.assertEqual(len(self.client.get(response.data['next']).data['results']), 2)
+
+        before = list(TaskInbox.objects.values_list('task_id', 'status', 'due', 'root_project_id'))
+        TaskInbox.objects.all().delete()
+        self.assertEqual(rebuild(), 4)
+        self.assertEqual(list(TaskInbox.objects.values_list('task_id', 'status', 'due', 'root_project_id')), before)
+
+@skipUnless(connection.vendor == 'sqlite', 'Los planes se leen con EXPLAIN QUERY PLAN de SQLite')
+class QueryPlanTest(APITestCase):
+    """
+    Corre EXPLAIN sobre cada consulta de las lecturas más usadas y falla si
+    alguna recorre entera (sin índice) una tabla de más de SCAN_THRESHOLD filas.
+    """
+    SCAN_THRESHOLD = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_profile('admin', role='admin')
+        cls.employee = create_profile('employee')
+        for _ in range(3):
+            cls.project = create_mission(cls.admin, epics=2, objectives=2, okrs=2, activities=2, tasks=3)
+            ProjectMembers.objects.create(project=cls.project, user=cls.employee, role='member')
+        cls.task = Task.objects.first()
+        for i in range(30):
+            Log.objects.create(task=cls.task, user=cls.admin, log_text=f'Log {i}')
+            Comment.objects.create(task=cls.task, user=cls.admin, text=f'Comentario {i}')
+
+    def get_sequential_scans(self, sql):
+        """Tablas que el plan de sql recorre enteras, con su cantidad de filas"""
+        aliases = dict(re.findall(r'(?:FROM|JOIN) "(\w+)" (?:AS )?(\w+)', sql))
+        aliases = {alias: table for table, alias in aliases.items()}
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [row[3] for row in cursor.fetchall()]
+        scans = {}
+        for detail in details:
+            match = re.fullmatch(r'SCAN (\w+)', detail)
+            if match is None:
+                continue
+            table = aliases.get(match.group(1), match.group(1))
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                scans[table] = cursor.fetchone()[0]
+        return scans
+
+    def assertIndexedReads(self, profile, paths):
+        self.client.force_authenticate(profile.user)
+        for path in paths:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(f'/api/okrs/{path}')
+            self.assertEqual(response.status_code, 200, path)
+            for query in ctx.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                scans = self.get_sequential_scans(query['sql'])
+                large = {table: rows for table, rows in scans.items() if rows > self.SCAN_THRESHOLD}
+                self.assertEqual(large, {}, f'{path}: {query["sql"]}')
+
+    def get_paths(self):
+        activity = self.task.activity
+        return [
+            'projects/', 'projects/?tipo=mision', f'projects/{self.project.id}/', 'epics/', 'objectives/', 'okrs/',
+            'activities/', 'tasks/', f'tasks/?activity_id={activity.id}', 'tasks/my_tasks/', 'tasks/inbox/',
+            f'tasks/project_tasks/?project_id={self.project.id}', 'logs/', f'logs/?task={self.task.id}',
+            'comments/', 'notifications/', 'jobs/',
+        ]
+
+    def test_admin_reads_use_indexes(self):
+        self.assertIndexedReads(self.admin, self.get_paths())
+
+    def test_employee_reads_use_indexes(self):
+        # Las listas de la jerarquía son solo para admins y managers
+        paths = [path for path in self.get_paths() if path.startswith(('tasks/', 'logs/', 'comments/', 'notifications/', 'jobs/'))]
+        self.assertIndexedReads(self.employee, paths)
+
+class BenchmarkTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from .benchmark import generate_dataset
+        cls.summary = generate_dataset(projects=2, depth=(2, 2, 1, 1, 3), users=4, members_per_project=3, seed=1)
+
+    def test_dataset_is_consistent(self):
+        from .models import TaskInbox
+        from .rollups import rebuild
+        self.assertEqual(self.summary['Task'], Task.objects.count())
+        self.assertEqual(Project.objects.filter(tipo='proyecto').count(), 1)
+        # Los proyectos tienen objetivos directos y las misiones, épicas
+        self.assertTrue(Objective.objects.filter(epic__isnull=True, project__tipo='proyecto').exists())
+        self.assertFalse(Task.objects.filter(root_project__isnull=True).exists())
+        self.assertEqual(rebuild(commit=False), [])
+        self.assertEqual(TaskInbox.objects.count(), Task.objects.filter(assignee__isnull=False).count())
+
+    def test_report_covers_endpoints(self):
+        from .benchmark import COMPARED_METRICS, compare_reports, run_benchmark
+        report = run_benchmark(iterations=2, names=['projects', 'inbox'])
+        self.assertEqual(set(report['endpoints']), {'projects', 'inbox'})
+        self.assertEqual(report['meta']['rows']['Task'], self.summary['Task'])
+        for result in report['endpoints'].values():
+            self.assertEqual(result['status'], 200)
+            self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        rows = compare_reports(report, report)
+        self.assertEqual(len(rows), 2 * len(COMPARED_METRICS))
+        self.assertTrue(all(change == 0 for *_, change in rows))
+
+    def test_plans_compare_visibility_filters(self):
+        from .benchmark import run_benchmark
+        plans = run_benchmark(iterations=1, names=['tasks'], plans=True)['plans']
+        self.assertEqual(set(plans), {'Task', 'Comment', 'Log'})
+        for model, plan in plans.items():
+            # Antes: un JOIN por nivel hasta los miembros; después, el índice de root_project
+            self.assertIn('okrs_projectmembers', plan['before'])
+            self.assertNotIn('okrs_projectmembers', plan['after'])
+            self.assertIn('root_project_id=?', plan['after'], model)
+
+class OKRImportTest(APITestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        self.employee = create_profile('employee')
+        self.project = create_mission(self.admin, tasks=2)
+        self.epic = Epic.objects.get(project=self.project)
+        self.client.force_authenticate(self.admin.user)
+
+    def upload(self, name, content, **data):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        upload = SimpleUploadedFile(name, content.encode('utf-8'))
+        return self.client.post(f'/api/okrs/projects/{self.project.id}/import/', {'file': upload, **data}, format='multipart')
+
+    def test_json_import_inserts_levels_in_bulk_and_keeps_progress(self):
+        from .rollups import rebuild
+        objectives = [{
+            'title': 'Crecer', 'epic': self.epic.id, 'owner': 'employee', 'okrs': [{
+                'key_result': 'Ventas', 'activities': [
+                    {'name': 'Campaña', 'end_date': '2030-01-31', 'tasks': [
+                        {'title': 'Diseño', 'assignee': 'employee', 'status': 'completed'},
+                        {'title': 'Lanzamiento', 'status': 'backlog'},
+                    ]},
+                    {'name': 'Seguimiento'},
+                ],
+            }],
+        }]
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.upload('plan.json', json.dumps({'objectives': objectives * 20}))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], {'Objective': 20, 'OKR': 20, 'Activity': 40, 'Task': 40})
+        self.assertEqual(response.data['errors'], [])
+        # Un INSERT por nivel, no uno por nodo
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "okrs_objective"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertLess(len(ctx.captured_queries), 60)
+
+        okr = OKR.objects.filter(key_result='Ventas').first()
+        self.assertEqual((okr.activities_total, okr.activities_completed, okr.progress), (2, 1, 50))
+        self.assertEqual((okr.objective.owner, okr.owner), (self.employee, self.admin))
+        # Igual que al crear tareas por la API, no se vinculan a OKR.tasks
+        self.assertEqual(okr.tasks.count(), 0)
+        self.assertEqual(rebuild(commit=False), [])
+        self.assertEqual(Task.objects.filter(assignee=self.employee, root_project=self.project).count(), 20)
+        self.assertTrue(Log.objects.filter(log_type='Objective Created', root_project=self.project).exists())
+
+    def test_csv_import_reports_row_errors(self):
+        rows = [
+            'objective,epic,key_result,okr_owner,activity,start_date,task,assignee,status',
+            f'Crecer,{self.epic.title},Ventas,,Campaña,2025-01-01,Diseño,employee,in progress',
+            f'Crecer,{self.epic.title},Ventas,,Campaña,2025-01-01,Lanzamiento,nadie,backlog',
+            f'Crecer,{self.epic.title},Ventas,,Campaña,2025-01-01,Cierre,,terminada',
+            f'Otro,{self.epic.title},Costos,fantasma,Recorte,,Tarea,,',
+            'Sin épica,,,,,,,,',
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload('plan.csv', '\n'.join(rows))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], {'Objective': 2, 'OKR': 1, 'Activity': 1, 'Task': 1})
+        errors = {(error['location'], error['field']) for error in response.data['errors']}
+        self.assertEqual(errors, {
+            ('línea 3', 'assignee'), ('línea 4', 'status'), ('línea 5', 'owner'), ('línea 6', 'epic'),
+        })
+        self.assertEqual(Objective.objects.filter(title='Crecer').count(), 1)
+        # El OKR con dueño desconocido se descarta con sus descendientes
+        self.assertFalse(Activity.objects.filter(name='Recorte').exists())
+
+    def test_strict_import_aborts_and_requires_project_role(self):
+        content = json.dumps([{'title': 'Crecer', 'epic': self.epic.id, 'owner': 'nadie'}])
+        response = self.upload('plan.json', content, strict='true')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created']['Objective'], 0)
+        self.assertFalse(Objective.objects.filter(title='Crecer').exists())
+
+        response = self.upload('plan.json', '[{"title": "Roto"')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON inválido', response.data['error'])
+
+        ProjectMembers.objects.create(project=self.project, user=self.employee, role='member')
+        self.client.force_authenticate(self.employee.user)
+        response = self.upload('plan.json', '[]')
+        self.assertEqual(response.status_code, 403)
+
+class ExportTest(APITestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        self.mission = create_mission(self.admin, epics=2, objectives=1, okrs=1, activities=1, tasks=2)
+        Epic.objects.create(project=self.mission, title='Vacía', owner=self.admin)
+        self.project = Project.objects.create(name='Directo', created_by=self.admin, start_date=date.today(), tipo='proyecto')
+        Objective.objects.create(project=self.project, title='Sin OKRs', owner=self.admin)
+        self.empty = Project.objects.create(name='Vacío', created_by=self.admin, start_date=date.today(), tipo='proyecto')
+        self.client.force_authenticate(self.admin.user)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_export_flattens_every_project(self):
+        import csv
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/okrs/projects/export/')
+            rows = list(csv.DictReader(self.read(response).splitlines()))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        # 4 tareas, la épica vacía, el objetivo sin OKRs y el proyecto vacío
+        self.assertEqual(len(rows), 7)
+        self.assertEqual([row['project'] for row in rows], ['Misión'] * 5 + ['Directo', 'Vacío'])
+        self.assertEqual(sum(1 for row in rows if row['task_id']), 4)
+        self.assertEqual({row['assignee'] for row in rows if row['task_id']}, {'admin'})
+        self.assertEqual(rows[4]['epic'], 'Vacía')
+        self.assertEqual((rows[5]['objective'], rows[5]['epic'], rows[5]['okr_id']), ('Sin OKRs', '', ''))
+
+    def test_ndjson_export_of_one_project_with_etag(self):
+        response = self.client.get(f'/api/okrs/projects/{self.project.id}/export/?output=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['project_id'], rows[0]['tipo'], rows[0]['objective']), (self.project.id, 'proyecto', 'Sin OKRs'))
+        response = self.client.get(
+            f'/api/okrs/projects/{self.project.id}/export/?output=ndjson', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/api/okrs/projects/export/?output=xml').status_code, 400)
+
+class SearchTest(APITestCase):
+    def setUp(self):
+        self.employee = create_profile('employee')
+        self.mission = create_mission(self.employee, tasks=2)
+        self.task = Task.objects.get(title='Tarea 0')
+        self.task.title = 'Migración de servidores'
+        self.task.save()
+        Comment.objects.create(task=Task.objects.get(title='Tarea 1'), user=self.employee, text='Revisar la migracion antes del viernes')
+        other = create_mission(create_profile('other'))
+        Task.objects.filter(root_project=other).update(title='Migración secreta')
+        from .search import index
+        index(Task.objects.filter(root_project=other))
+        self.client.force_authenticate(self.employee.user)
+
+    def search(self, query):
+        response = self.client.get(f'/api/okrs/search/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_search_ranks_filters_and_returns_paths(self):
+        with self.assertNumQueries(6):
+            results = self.search('q=MIGRA')
+        # El título pesa más que el texto del comentario; la tarea del otro proyecto no es visible
+        self.assertEqual([(hit['type'], hit['id']) for hit in results], [('task', self.task.id), ('comment', Comment.objects.get().id)])
+        self.assertEqual(
+            [step['type'] for step in results[0]['path']], ['project', 'epic', 'objective', 'okr', 'activity']
+        )
+        self.assertEqual(results[1]['path'][-1]['title'], 'Tarea 1')
+        self.assertIn('migracion', results[1]['snippet'])
+        self.assertEqual(self.search('q=migracion&type=comment')[0]['type'], 'comment')
+        self.assertEqual(self.search('q=servidores migra')[0]['id'], self.task.id)
+        self.assertEqual(self.search('q=servidores viernes'), [])
+        self.assertEqual(self.client.get('/api/okrs/search/?q=%20').status_code, 400)
+        self.assertEqual(self.client.get('/api/okrs/search/?q=x&type=log').status_code, 400)
+
+    def test_index_follows_updates_and_subtree_deletion(self):
+        from .deletion import delete_subtree
+        self.task.title = 'Despliegue'
+        self.task.save()
+        self.assertEqual([hit['type'] for hit in self.search('q=migracion')], ['comment'])
+        self.assertEqual(self.search('q=despliegue')[0]['id'], self.task.id)
+        delete_subtree(Epic, list(Epic.objects.filter(project=self.mission).values_list('pk', flat=True)))
+        self.assertEqual(self.search('q=despliegue'), [])
+        self.assertEqual(self.search('q=migracion'), [])
+
+    def test_portable_terms_backend(self):
+        from django.test import override_settings
+        from .search import rebuild
+        with override_settings(OKRS_SEARCH_BACKEND='terms'):
+            rebuild()
+            results = self.search('q=migra')
+            self.assertEqual([hit['type'] for hit in results], ['task', 'comment'])
+            self.assertEqual(self.search('q=servidores migra')[0]['id'], self.task.id)
+            self.task.title = 'Despliegue'
+            self.task.save()
+            self.assertEqual(self.search('q=despl')[0]['id'], self.task.id)
+            self.assertEqual([hit['type'] for hit in self.search('q=migra')], ['comment'])
+
+class AdminChangelistTest(APITestCase):
+    def setUp(self):
+        self.admin = create_profile('admin', role='admin')
+        User.objects.filter(pk=self.admin.user_id).update(is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_query_count_is_constant(self):
+        create_mission(self.admin)
+        for model in ('project', 'epic', 'objective', 'okr', 'activity', 'task', 'comment', 'projectmembers'):
+            url = f'/admin/okrs/{model}/'
+            small = self.count_queries(url)
+            create_mission(self.admin, epics=2, objectives=2, okrs=1, activities=2, tasks=2)
+            for task in Task.objects.all()[:3]:
+                Comment.objects.create(task=task, user=self.admin, text='Revisado')
+            self.assertEqual(self.count_queries(url), small, model)
+        self.assertEqual(self.count_queries('/admin/users/users/'), self.count_queries('/admin/users/users/'))
+
+    def test_bulk_actions(self):
+        from .models import TaskInbox
+        project = create_mission(self.admin, tasks=3)
+        response = self.client.post('/admin/okrs/task/', {
+            'action': 'archive_tasks', '_selected_action': list(Task.objects.values_list('pk', flat=True)[:2]),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Task.objects.filter(archived=True).count(), 2)
+        self.assertEqual(TaskInbox.objects.filter(archived=True).count(), 2)
+
+        Project.objects.filter(pk=project.pk).update(children_total=7, progress=90)
+        Activity.objects.update(tasks_total=0)
+        self.client.post('/admin/okrs/activity/', {
+            'action': 'recalculate_progress', '_selected_action': list(Activity.objects.values_list('pk', flat=True)),
+        })
+        project.refresh_from_db()
+        self.assertEqual((project.children_total, project.progress), (1, 0))
+        self.assertEqual(Activity.objects.get().tasks_total, 3)
+
+class AvailableUsersTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = create_profile('manager', role='manager')
+        self.project = create_mission(self.manager)
+        for username, first_name, last_name in [('ana', 'Ana María', 'Pérez'), ('andres', 'Andrés', 'Gómez'), ('beto', 'Alberto', 'Anaya')]:
+            user = User.objects.create_user(username=username, email=f'{username}@empresa.com', first_name=first_name, last_name=last_name)
+            Users.objects.create(user=user)
+        self.client.force_authenticate(self.manager.user)
+
+    def get(self, query):
+        response = self.client.get(f'/api/okrs/projects/available_users/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.data]
+
+    def test_prefix_search_excludes_members_and_caches_hot_prefixes(self):
+        self.assertEqual(self.get('q=an'), ['ana', 'andres', 'beto'])
+        self.assertEqual(self.get('q=MARIA'), ['ana'])
+        self.assertEqual(self.get('q=ana pe'), ['ana'])
+        self.assertEqual(self.get('q=andres@'), ['andres'])
+        self.assertEqual(self.get('q=&limit=2'), ['ana', 'andres'])
+        self.assertEqual(set(self.client.get('/api/okrs/projects/available_users/?q=ana').data[0]), {
+            'id', 'username', 'first_name', 'last_name', 'email', 'role',
+        })
+
+        ProjectMembers.objects.create(project=self.project, user=Users.objects.get(user__username='ana'), role='member')
+        # Autorización, proyecto y búsqueda; la segunda vez sale de la caché
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get(f'q=an&project={self.project.id}'), ['andres', 'beto'])
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get(f'q=an&project={self.project.id}'), ['andres', 'beto'])
+
+        # Cambiar un perfil invalida la caché
+        user = User.objects.get(username='beto')
+        user.username = 'zeta'
+        user.save()
+        self.assertEqual(self.get(f'q=an&project={self.project.id}'), ['andres', 'zeta'])
+        self.assertEqual(self.get('q=zet'), ['zeta'])
+
+    def test_rebuild_directory_command_restores_terms(self):
+        from django.core.management import call_command
+        from users.models import UserDirectoryTerm
+        UserDirectoryTerm.objects.all().delete()
+        cache.clear()
+        self.assertEqual(self.get('q=an'), [])
+        call_command('rebuild_directory', stdout=io.StringIO())
+        self.assertEqual(self.get('q=an'), ['ana', 'andres', 'beto'])
+
+    def test_employees_cannot_list_users(self):
+        self.client.force_authenticate(create_profile('employee').user)
+        response = self.client.get('/api/okrs/projects/available_users/?q=an')
+        self.assertEqual(response.status_code, 403)
@@ -2,7 +2,11 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     ProjectViewSet, EpicViewSet, ObjectiveViewSet, OKRViewSet,
-    ActivityViewSet, TaskViewSet, LogViewSet, CommentViewSet
+    ActivityViewSet, TaskViewSet, LogViewSet, CommentViewSet, JobViewSet, NotificationViewSet, SearchViewSet
+)
+from .async_views import (
+    AsyncProjectListView, AsyncProjectDetailView, AsyncMyTasksView, AsyncProjectTasksView,
+    ProjectEventsView, UserEventsView
 )
 
 router = DefaultRouter()
@@ -14,7 +18,18 @@ router.register(r'activities', ActivityViewSet)
 router.register(r'tasks', TaskViewSet)
 router.register(r'logs', LogViewSet)
 router.register(r'comments', CommentViewSet)
+router.register(r'jobs', JobViewSet)
+router.register(r'notifications', NotificationViewSet)
+router.register(r'search', SearchViewSet, basename='search')
 
 urlpatterns = [
+    # Lecturas asíncronas para despliegues ASGI
+    path('async/projects/', AsyncProjectListView.as_view(), name='async-project-list'),
+    path('async/projects/<int:pk>/', AsyncProjectDetailView.as_view(), name='async-project-detail'),
+    path('async/tasks/my_tasks/', AsyncMyTasksView.as_view(), name='async-my-tasks'),
+    path('async/tasks/project_tasks/', AsyncProjectTasksView.as_view(), name='async-project-tasks'),
+    # Eventos en vivo (SSE)
+    path('events/projects/<int:pk>/', ProjectEventsView.as_view(), name='project-events'),
+    path('events/me/', UserEventsView.as_view(), name='user-events'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,39 +1,85 @@
-from rest_framework import viewsets, permissions, status
+import codecs
+import heapq
+from datetime import date
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Project, Epic, Objective, OKR, Activity, Task, Log, Comment, ProjectMembers
+from .models import Project, Epic, Objective, OKR, Activity, Task, TaskInbox, Log, Comment, ProjectMembers, Job, Notification, TASK_STATUS
 from .serializers import (
     ProjectSerializer, EpicSerializer, ObjectiveSerializer, OKRSerializer,
     ActivitySerializer, TaskSerializer, LogSerializer, CommentSerializer,
-    ProjectMembersSerializer, AddProjectMemberSerializer, RemoveProjectMemberSerializer, UserSerializer
+    ProjectMembersSerializer, AddProjectMemberSerializer, RemoveProjectMemberSerializer,
+    TaskBulkUpdateSerializer, TaskInboxSerializer, JobSerializer, NotificationSerializer, get_field_options
 )
+from . import archive, cache as project_cache
+from .conditional import ProjectRevisionETagMixin
+from .deletion import delete_subtree
+from .export import EXPORT_FORMATS, export_lines
+from .importer import ImportFormatError, get_file_type, import_okrs
+from .jobs import enqueue
+from . import notifications, search
+from .pagination import CreatedCursorPagination, InboxCursorPagination, RecentFirstCursorPagination, SearchPagination
+from .queries import plan_projects, plan_epics, plan_objectives, plan_okrs, plan_activities, plan_tasks
 from .permissions import (
     IsAdminOrManager, CanCreateEpics,
     CanCreateObjectives, CanEditOKRs, CanEditActivities,
-    CanManageProjectMembers, EmployeeTaskAccess
+    CanManageProjectMembers, EmployeeTaskAccess, get_authorization_context
 )
 from users.models import Users
-from django.db import models
-from rest_framework.exceptions import AuthenticationFailed
+from users import directory
+from django.db import models, transaction
+from django.http import StreamingHttpResponse
+from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.utils.urls import replace_query_param
 
 # Sección: Utilidades de autenticación
 def get_authenticated_profile(request):
     user = getattr(request, 'user', None)
     if not user or not user.is_authenticated:
         raise AuthenticationFailed('Authentication credentials were not provided or are invalid.')
-    try:
-        return user.users
-    except Exception:
+    profile = get_authorization_context(request).profile
+    if profile is None:
         # Si no existe el perfil asociado, tratamos como no autenticado
         raise AuthenticationFailed('Invalid authentication credentials.')
+    return profile
+
+def wants_background(request):
+    return request.query_params.get('background') in ('1', 'true')
+
+def enqueue_subtree_deletion(request, model, pk):
+    """Encola el borrado del subárbol y responde 202 con el trabajo creado"""
+    job = enqueue(
+        'delete_subtree', {'model': model.__name__, 'ids': [pk]},
+        key=f'delete_subtree:{model.__name__}:{pk}', created_by=get_authenticated_profile(request),
+    )
+    return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+# Sección: Campos parciales
+class SparseFieldsMixin:
+    """Aplica ?fields=, ?depth= y ?view=summary al serializer y al plan de consultas"""
+    def get_field_options(self):
+        if not hasattr(self, '_field_options'):
+            self._field_options = get_field_options(self.request, self.get_serializer_class())
+        return self._field_options
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(self.get_field_options())
+        return context
 
 # Sección: Proyectos
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(SparseFieldsMixin, ProjectRevisionETagMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrManager]
+    revision_project_field = 'pk'
 
     def get_queryset(self):
+        return plan_projects(self.get_visible_queryset(), **self.get_field_options())
+
+    def get_visible_queryset(self):
         user = get_authenticated_profile(self.request)
         
         # Los admins ven todos los proyectos
@@ -51,13 +97,101 @@ class ProjectViewSet(viewsets.ModelViewSet):
             return Project.objects.all()
         
         # Los empleados solo ven proyectos donde son miembros
+        project_ids = get_authorization_context(self.request).project_ids
         tipo = self.request.query_params.get('tipo')
         if tipo:
-            return Project.objects.filter(tipo=tipo, members=user)
-        return Project.objects.filter(members=user)
+            return Project.objects.filter(tipo=tipo, id__in=project_ids)
+        return Project.objects.filter(id__in=project_ids)
 
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user.users)
+        serializer.save(created_by=get_authenticated_profile(self.request))
+
+    def get_project(self):
+        """Proyecto visible de la URL, sin planificar ni cargar su árbol"""
+        project = get_object_or_404(self.filter_queryset(self.get_visible_queryset()), pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, project)
+        return project
+
+    def destroy(self, request, *args, **kwargs):
+        project = self.get_project()
+        if wants_background(request):
+            return enqueue_subtree_deletion(request, Project, project.pk)
+        delete_subtree(Project, [project.pk])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Detalle del proyecto, servido desde la caché del árbol si está vigente"""
+        # La visibilidad y el ETag se resuelven sin cargar el árbol; solo se
+        # arma y serializa cuando no hay una respuesta cacheada para este visor.
+        project = self.get_project()
+        etag = self.get_revision_etag([(project.pk, project.revision)])
+        not_modified = self.get_conditional_response(etag)
+        if not_modified is not None:
+            return not_modified
+        options = self.get_field_options()
+        viewer = project_cache.get_viewer_class(get_authorization_context(request), project.pk)
+        data, key = project_cache.get_project_tree(project, viewer, **options)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT', 'ETag': etag})
+        data = self.get_serializer(plan_projects(Project.objects.filter(pk=project.pk), **options).get()).data
+        project_cache.set_project_tree(key, data)
+        return Response(data, headers={'X-Cache': 'MISS', 'ETag': etag})
+
+    def stream_export(self, request, projects, filename):
+        """Exporta projects como CSV o NDJSON (?output=) en un StreamingHttpResponse"""
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Formato inválido; use {" o ".join(EXPORT_FORMATS)}'})
+
+        def respond(request, *args, **kwargs):
+            _, content_type, extension = EXPORT_FORMATS[output]
+            response = StreamingHttpResponse(export_lines(output, projects.values('pk')), content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+            return response
+
+        return self.respond_with_etag(self.get_project_revisions(projects), respond, request)
+
+    @action(detail=False, methods=['get'], url_path='export', url_name='export-all')
+    def export_all(self, request):
+        """Exporta el árbol de todos los proyectos visibles (?tipo= filtra)"""
+        return self.stream_export(request, self.filter_queryset(self.get_visible_queryset()), 'proyectos')
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """Exporta el árbol del proyecto como filas planas, una por tarea"""
+        project = self.get_project()
+        return self.stream_export(request, Project.objects.filter(pk=project.pk), f'proyecto-{project.pk}')
+
+    @action(
+        detail=True, methods=['post'], url_path='import', url_name='import',
+        permission_classes=[permissions.IsAuthenticated], parser_classes=[MultiPartParser],
+    )
+    def import_okrs(self, request, pk=None):
+        """Importa objetivos, OKRs, actividades y tareas desde un archivo JSON o CSV"""
+        profile = get_authenticated_profile(request)
+        project = self.get_project()
+        context = get_authorization_context(request)
+        if not (context.has_global_role('admin') or context.has_project_role(project.pk, ('owner', 'manager'))):
+            return Response({'error': 'No tienes permisos para importar en este proyecto'}, status=status.HTTP_403_FORBIDDEN)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': 'Se requiere un archivo .json o .csv'}, status=status.HTTP_400_BAD_REQUEST)
+        strict = request.data.get('strict') in ('1', 'true')
+        try:
+            result = import_okrs(
+                project, profile, codecs.getreader('utf-8-sig')(upload), get_file_type(upload.name), strict=strict
+            )
+        except ImportFormatError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return Response({'error': 'El archivo debe estar codificado en UTF-8'}, status=status.HTTP_400_BAD_REQUEST)
+        created = any(result['created'].values())
+        return Response(result, status=status.HTTP_201_CREATED if created or not result['errors'] else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """Aciertos y fallos de la caché del árbol de proyectos"""
+        return Response(project_cache.get_stats())
 
     @action(detail=True, methods=['get', 'post'], permission_classes=[permissions.IsAuthenticated])
     def members(self, request, pk=None):
@@ -66,13 +200,14 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project = self.get_object()
 
         # Solo miembros, managers o admins pueden ver/gestionar miembros
-        is_member = project.is_member(auth_user)
-        is_manager_or_admin = auth_user.role in ['admin', 'manager'] or project.get_member_role(auth_user) in ['owner', 'manager']
+        context = get_authorization_context(request)
+        is_member = context.is_member(project.id)
+        is_manager_or_admin = auth_user.role in ['admin', 'manager'] or context.get_role(project.id) in ['owner', 'manager']
 
         if request.method == 'GET':
             if not (is_member or is_manager_or_admin):
                 return Response({'error': 'No tienes permisos para ver los miembros de este proyecto'}, status=status.HTTP_403_FORBIDDEN)
-            members = ProjectMembers.objects.filter(project=project)
+            members = ProjectMembers.objects.filter(project=project).select_related('user__user')
             serializer = ProjectMembersSerializer(members, many=True)
             return Response(serializer.data)
 
@@ -131,67 +266,87 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def available_users(self, request):
-        """Obtener usuarios disponibles para agregar al proyecto"""
+        """
+        Buscador de usuarios para agregar al proyecto: ?q= (prefijo de
+        username, email, nombre o apellido), ?project= (excluye a sus
+        miembros) y ?limit= (por defecto 20, máximo 50)
+        """
         auth_user = get_authenticated_profile(request)
         
-        # Los admins y managers ven todos los usuarios
-        if auth_user.role in ['admin', 'manager']:
-            users = Users.objects.all()
-        else:
-            # Los empleados no pueden ver esta lista
+        # Los empleados no pueden ver esta lista
+        if auth_user.role not in ['admin', 'manager']:
             return Response({'error': 'No tienes permisos para ver esta información'}, status=status.HTTP_403_FORBIDDEN)
-        
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+
+        limit = request.query_params.get('limit', str(directory.DEFAULT_LIMIT))
+        if not limit.isdigit() or int(limit) == 0:
+            raise ValidationError({'limit': 'Debe ser un entero positivo.'})
+        exclude, variant = None, ''
+        project_id = request.query_params.get('project')
+        if project_id is not None:
+            project = get_object_or_404(Project.objects.only('pk', 'revision'), pk=project_id)
+            # La revisión cambia con cada alta o baja de miembros
+            exclude = ProjectMembers.objects.filter(project=project).values('user')
+            variant = f'project-{project.pk}-{project.revision}'
+        return Response(directory.search(request.query_params.get('q', ''), exclude, int(limit), variant))
 
 # Sección: Épicas
-class EpicViewSet(viewsets.ModelViewSet):
+class EpicViewSet(SparseFieldsMixin, ProjectRevisionETagMixin, viewsets.ModelViewSet):
     queryset = Epic.objects.all()
     serializer_class = EpicSerializer
     permission_classes = [permissions.IsAuthenticated, CanCreateEpics]
+    revision_project_field = 'project'
 
     def get_queryset(self):
+        return plan_epics(self.get_visible_queryset(), **self.get_field_options())
+
+    def get_visible_queryset(self):
         user = get_authenticated_profile(self.request)
         
         # Los admins ven todas las épicas
         if user.role == 'admin':
             project_id = self.request.query_params.get('project')
             if project_id:
-                return Epic.objects.filter(project_id=project_id).prefetch_related('objectives')
-            return Epic.objects.all().prefetch_related('objectives')
+                return Epic.objects.filter(project_id=project_id)
+            return Epic.objects.all()
         
         # Los managers ven todas las épicas
         if user.role == 'manager':
             project_id = self.request.query_params.get('project')
             if project_id:
-                return Epic.objects.filter(project_id=project_id).prefetch_related('objectives')
-            return Epic.objects.all().prefetch_related('objectives')
+                return Epic.objects.filter(project_id=project_id)
+            return Epic.objects.all()
         
         # Los empleados solo ven épicas de proyectos donde son miembros
+        project_ids = get_authorization_context(self.request).project_ids
         project_id = self.request.query_params.get('project')
         if project_id:
-            return Epic.objects.filter(project_id=project_id, project__members=user).prefetch_related('objectives')
-        return Epic.objects.filter(project__members=user).prefetch_related('objectives')
+            return Epic.objects.filter(project_id=project_id, project_id__in=project_ids)
+        return Epic.objects.filter(project_id__in=project_ids)
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user.users)
+        serializer.save(owner=get_authenticated_profile(self.request))
 
     def destroy(self, request, *args, **kwargs):
         try:
             epic_id = kwargs.get('pk')
             epic = Epic.objects.get(id=epic_id)
+            if wants_background(request):
+                return enqueue_subtree_deletion(request, Epic, epic.pk)
             epic.delete()
             return Response({'message': 'Épica eliminada exitosamente'}, status=status.HTTP_204_NO_CONTENT)
         except Epic.DoesNotExist:
             return Response({'error': 'Épica no encontrada'}, status=status.HTTP_404_NOT_FOUND)
 
 # Sección: Objetivos
-class ObjectiveViewSet(viewsets.ModelViewSet):
+class ObjectiveViewSet(SparseFieldsMixin, ProjectRevisionETagMixin, viewsets.ModelViewSet):
     queryset = Objective.objects.all()
     serializer_class = ObjectiveSerializer
     permission_classes = [permissions.IsAuthenticated, CanCreateObjectives]
 
     def get_queryset(self):
+        return plan_objectives(self.get_visible_queryset(), **self.get_field_options())
+
+    def get_visible_queryset(self):
         user = get_authenticated_profile(self.request)
         
         # Los admins ven todos los objetivos
@@ -209,32 +364,34 @@ class ObjectiveViewSet(viewsets.ModelViewSet):
             return Objective.objects.all()
         
         # Los empleados solo ven objetivos de proyectos donde son miembros
+        project_ids = get_authorization_context(self.request).project_ids
         epic_id = self.request.query_params.get('epic_id')
         if epic_id:
-            return Objective.objects.filter(epic_id=epic_id, epic__project__members=user)
-        return Objective.objects.filter(
-            models.Q(epic__project__members=user) | models.Q(project__members=user)
-        )
+            return Objective.objects.filter(epic_id=epic_id, root_project__in=project_ids)
+        return Objective.objects.filter(root_project__in=project_ids)
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user.users)
+        serializer.save(owner=get_authenticated_profile(self.request))
 
     def destroy(self, request, *args, **kwargs):
         try:
             objective_id = kwargs.get('pk')
             objective = Objective.objects.get(id=objective_id)
-            objective.delete()
+            delete_subtree(Objective, [objective.pk])
             return Response({'message': 'Objetivo eliminado exitosamente'}, status=status.HTTP_204_NO_CONTENT)
         except Objective.DoesNotExist:
             return Response({'error': 'Objetivo no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
 # Sección: OKRs
-class OKRViewSet(viewsets.ModelViewSet):
+class OKRViewSet(SparseFieldsMixin, ProjectRevisionETagMixin, viewsets.ModelViewSet):
     queryset = OKR.objects.all()
     serializer_class = OKRSerializer
     permission_classes = [permissions.IsAuthenticated, CanEditOKRs]
 
     def get_queryset(self):
+        return plan_okrs(self.get_visible_queryset(), **self.get_field_options())
+
+    def get_visible_queryset(self):
         user = get_authenticated_profile(self.request)
         
         # Los admins ven todos los OKRs
@@ -252,38 +409,34 @@ class OKRViewSet(viewsets.ModelViewSet):
             return OKR.objects.all()
         
         # Los empleados solo ven OKRs de proyectos donde son miembros
+        project_ids = get_authorization_context(self.request).project_ids
         objective_id = self.request.query_params.get('objective_id')
         if objective_id:
-            return OKR.objects.filter(
-                objective_id=objective_id,
-                objective__epic__project__members=user
-            ) | OKR.objects.filter(
-                objective_id=objective_id,
-                objective__project__members=user
-            )
-        return OKR.objects.filter(
-            models.Q(objective__epic__project__members=user) | models.Q(objective__project__members=user)
-        )
+            return OKR.objects.filter(objective_id=objective_id, root_project__in=project_ids)
+        return OKR.objects.filter(root_project__in=project_ids)
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user.users)
+        serializer.save(owner=get_authenticated_profile(self.request))
 
     def destroy(self, request, *args, **kwargs):
         try:
             okr_id = kwargs.get('pk')
             okr = OKR.objects.get(id=okr_id)
-            okr.delete()
+            delete_subtree(OKR, [okr.pk])
             return Response({'message': 'OKR eliminado exitosamente'}, status=status.HTTP_204_NO_CONTENT)
         except OKR.DoesNotExist:
             return Response({'error': 'OKR no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
 # Sección: Actividades
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(SparseFieldsMixin, ProjectRevisionETagMixin, viewsets.ModelViewSet):
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
     permission_classes = [permissions.IsAuthenticated, CanEditActivities]
 
     def get_queryset(self):
+        return plan_activities(self.get_visible_queryset(), **self.get_field_options())
+
+    def get_visible_queryset(self):
         user = get_authenticated_profile(self.request)
         
         # Los admins ven todas las actividades
@@ -301,29 +454,26 @@ class ActivityViewSet(viewsets.ModelViewSet):
             return Activity.objects.all()
         
         # Los empleados solo ven actividades de proyectos donde son miembros
+        project_ids = get_authorization_context(self.request).project_ids
         okr_id = self.request.query_params.get('okr_id')
         if okr_id:
-            return Activity.objects.filter(
-                okr_id=okr_id,
-                okr__objective__epic__project__members=user
-            ) | Activity.objects.filter(
-                okr_id=okr_id,
-                okr__objective__project__members=user
-            )
-        return Activity.objects.filter(
-            models.Q(okr__objective__epic__project__members=user) | models.Q(okr__objective__project__members=user)
-        )
+            return Activity.objects.filter(okr_id=okr_id, root_project__in=project_ids)
+        return Activity.objects.filter(root_project__in=project_ids)
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user.users)
+        serializer.save(owner=get_authenticated_profile(self.request))
 
 # Sección: Tareas
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(SparseFieldsMixin, ProjectRevisionETagMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated, EmployeeTaskAccess]
+    pagination_class = CreatedCursorPagination
 
     def get_queryset(self):
+        return plan_tasks(self.get_visible_queryset(), **self.get_field_options())
+
+    def get_visible_queryset(self):
         user = get_authenticated_profile(self.request)
         
         # Los admins ven todas las tareas
@@ -341,49 +491,113 @@ class TaskViewSet(viewsets.ModelViewSet):
             return Task.objects.all()
         
         # Los empleados solo ven sus tareas asignadas o tareas de proyectos donde son miembros
+        project_ids = get_authorization_context(self.request).project_ids
         activity_id = self.request.query_params.get('activity_id')
         if activity_id:
             return Task.objects.filter(
-                models.Q(activity_id=activity_id, assignee=user) |
-                models.Q(activity_id=activity_id, activity__okr__objective__epic__project__members=user) |
-                models.Q(activity_id=activity_id, activity__okr__objective__project__members=user)
+                models.Q(assignee=user) | models.Q(root_project__in=project_ids),
+                activity_id=activity_id
             )
         
-        return Task.objects.filter(
-            models.Q(assignee=user) |
-            models.Q(activity__okr__objective__epic__project__members=user) |
-            models.Q(activity__okr__objective__project__members=user)
-        )
+        return Task.objects.filter(models.Q(assignee=user) | models.Q(root_project__in=project_ids))
 
+    # El progreso de la actividad y del OKR se actualiza en okrs.signals
+    # dentro de la misma transacción que la tarea
+    @transaction.atomic
     def perform_create(self, serializer):
-        task = serializer.save()
-        # Recalcular progreso de la actividad y OKR
-        task.activity.calculate_progress()
-        task.activity.okr.calculate_progress()
+        serializer.save()
 
+    @transaction.atomic
     def perform_update(self, serializer):
-        task = serializer.save()
-        # Recalcular progreso de la actividad y OKR
-        task.activity.calculate_progress()
-        task.activity.okr.calculate_progress()
+        serializer.save()
 
+    @transaction.atomic
     def perform_destroy(self, instance):
-        # Guardar referencia antes de eliminar
-        activity = instance.activity
-        okr = activity.okr
         instance.delete()
-        # Recalcular progreso de la actividad y OKR
-        activity.calculate_progress()
-        okr.calculate_progress()
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def bulk_update(self, request):
+        """Actualizar estado y asignado de varias tareas en una sola transacción"""
+        user = get_authenticated_profile(request)
+        serializer = TaskBulkUpdateSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        changes = serializer.validated_data
+        ids = [item['id'] for item in changes]
+
+        with transaction.atomic():
+            tasks = list(
+                Task.objects.select_for_update().filter(id__in=ids)
+            )
+            missing = set(ids) - {task.id for task in tasks}
+            if missing:
+                return Response({'error': f'Tareas no encontradas: {sorted(missing)}'}, status=status.HTTP_404_NOT_FOUND)
+
+            # Los permisos se responden desde los roles ya cargados en el contexto del request
+            if user.role not in ['admin', 'manager']:
+                context = get_authorization_context(request)
+                tasks_by_id = {task.id: task for task in tasks}
+                denied = []
+                for item in changes:
+                    task = tasks_by_id[item['id']]
+                    role = context.get_role(task.root_project_id)
+                    if 'assignee' in item:
+                        allowed = role in ['owner', 'manager']
+                    else:
+                        allowed = role in ['owner', 'manager', 'member'] or task.assignee_id == user.id
+                    if not allowed:
+                        denied.append(task.id)
+                if denied:
+                    return Response({'error': f'No tienes permisos para modificar las tareas: {denied}'}, status=status.HTTP_403_FORBIDDEN)
+
+            serializer.instance = tasks
+            serializer.save()
+
+        tasks = plan_tasks(Task.objects.filter(id__in=ids))
+        return Response(TaskSerializer(tasks, many=True).data)
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_tasks(self, request):
         """Obtener tareas asignadas al usuario actual"""
         user = get_authenticated_profile(request)
-        tasks = Task.objects.filter(assignee=user)
-        serializer = self.get_serializer(tasks, many=True)
+        serializer = self.get_serializer(plan_tasks(self.get_my_tasks(user)), many=True)
         return Response(serializer.data)
 
+    def get_my_tasks(self, user):
+        return Task.objects.filter(assignee=user)
+
+    @action(
+        detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated],
+        pagination_class=InboxCursorPagination,
+    )
+    def inbox(self, request):
+        """Bandeja paginada de las tareas asignadas al usuario actual, desde TaskInbox"""
+        user = get_authenticated_profile(request)
+        page = self.paginate_queryset(self.get_inbox(user, request.query_params))
+        return self.get_paginated_response(TaskInboxSerializer(page, many=True).data)
+
+    def get_inbox(self, user, params):
+        """
+        Filas de la bandeja de user filtradas por ?status= (uno o varios
+        separados por coma), ?project=, ?due_after= y ?due_before=. Las
+        archivadas solo aparecen con ?archived=true, y entonces solo ellas.
+        """
+        queryset = TaskInbox.objects.filter(user=user, archived=params.get('archived') in ('1', 'true'))
+        if params.get('status'):
+            statuses = params['status'].split(',')
+            if set(statuses) - {value for value, _ in TASK_STATUS}:
+                raise ValidationError({'status': 'Estado inválido'})
+            queryset = queryset.filter(status__in=statuses)
+        filters = {'project': 'root_project_id', 'due_after': 'due__gte', 'due_before': 'due__lte'}
+        for name, lookup in filters.items():
+            value = params.get(name)
+            if not value:
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: int(value) if name == 'project' else date.fromisoformat(value)})
+            except ValueError:
+                raise ValidationError({name: 'Valor inválido'})
+        return queryset
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def project_tasks(self, request):
         """Obtener tareas de un proyecto específico"""
@@ -393,28 +607,25 @@ class TaskViewSet(viewsets.ModelViewSet):
         if not project_id:
             return Response({'error': 'Se requiere project_id'}, status=status.HTTP_400_BAD_REQUEST)
         
+        serializer = self.get_serializer(plan_tasks(self.get_project_tasks(user, project_id)), many=True)
+        return Response(serializer.data)
+
+    def get_project_tasks(self, user, project_id):
         # Los admins y managers ven todas las tareas del proyecto
         if user.role in ['admin', 'manager']:
-            tasks = Task.objects.filter(
-                models.Q(activity__okr__objective__epic__project_id=project_id) |
-                models.Q(activity__okr__objective__project_id=project_id)
-            )
-        else:
-            # Los empleados solo ven sus tareas asignadas del proyecto
-            tasks = Task.objects.filter(
-                models.Q(assignee=user) &
-                (models.Q(activity__okr__objective__epic__project_id=project_id) |
-                 models.Q(activity__okr__objective__project_id=project_id))
-            )
-        
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
+            return Task.objects.filter(root_project_id=project_id)
+        # Los empleados solo ven sus tareas asignadas del proyecto
+        return Task.objects.filter(assignee=user, root_project_id=project_id)
 
 # Sección: Logs
-class LogViewSet(viewsets.ModelViewSet):
+# FKs de Log por los que se puede filtrar el historial
+LOG_NODE_FIELDS = ('project', 'epic', 'objective', 'okr', 'activity', 'task')
+
+class LogViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Log.objects.all()
     serializer_class = LogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedCursorPagination
 
     def get_queryset(self):
         user = get_authenticated_profile(self.request)
@@ -428,27 +639,112 @@ class LogViewSet(viewsets.ModelViewSet):
             return Log.objects.all()
         
         # Los empleados solo ven logs de proyectos donde son miembros
-        return Log.objects.filter(
-            models.Q(project__members=user) |
-            models.Q(epic__project__members=user) |
-            models.Q(objective__epic__project__members=user) |
-            models.Q(objective__project__members=user) |
-            models.Q(okr__objective__epic__project__members=user) |
-            models.Q(okr__objective__project__members=user) |
-            models.Q(activity__okr__objective__epic__project__members=user) |
-            models.Q(activity__okr__objective__project__members=user) |
-            models.Q(task__activity__okr__objective__epic__project__members=user) |
-            models.Q(task__activity__okr__objective__project__members=user)
+        return Log.objects.filter(root_project__in=get_authorization_context(self.request).project_ids)
+
+    def get_month(self):
+        """Mes pedido con ?month=AAAA-MM (día 1), o None"""
+        value = self.request.query_params.get('month')
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(f'{value}-01')
+        except ValueError:
+            raise ValidationError({'month': 'Use el formato AAAA-MM'})
+
+    def get_node_filters(self):
+        """Filtros ?project=, ?epic=, ..., ?task= sobre los FKs del log"""
+        filters = {}
+        for name in LOG_NODE_FIELDS:
+            value = self.request.query_params.get(name)
+            if value:
+                try:
+                    filters[f'{name}_id'] = int(value)
+                except ValueError:
+                    raise ValidationError({name: 'Debe ser un id'})
+        return filters
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        month = self.get_month()
+        if month is not None:
+            queryset = queryset.filter(month=month)
+        return queryset.filter(**self.get_node_filters())
+
+    def list(self, request, *args, **kwargs):
+        # Los meses archivados se leen del archivo con el mismo formato de respuesta
+        month = self.get_month()
+        if month is not None and archive.is_archived(month):
+            return self.list_archived(request, month)
+        return super().list(request, *args, **kwargs)
+
+    def list_archived(self, request, month):
+        """
+        Página de un mes archivado. Se recorren en orden de id el archivo y
+        las filas del mes que siguen en la base (un archivado interrumpido o
+        logs con fecha anterior), y se corta al completar la página; next
+        sigue desde el último id con ?after=.
+        """
+        context = get_authorization_context(request)
+        visible = None if context.has_global_role('admin', 'manager') else context.project_ids
+        filters = self.get_node_filters()
+        try:
+            after = int(request.query_params.get('after', 0))
+        except ValueError:
+            raise ValidationError({'after': 'Debe ser un id'})
+        page_size = self.paginator.get_page_size(request)
+
+        archived = (
+            row for row in archive.read_archive(month)
+            if row['id'] > after and (visible is None or row['root_project_id'] in visible)
+            and all(row[name] == value for name, value in filters.items())
         )
+        live = self.filter_queryset(self.get_queryset()).filter(pk__gt=after).order_by('pk').values(
+            *archive.ARCHIVE_FIELDS
+        )[:page_size + 1]
+        rows = []
+        # Con el mismo id (lote escrito pero no borrado) queda la fila de la base
+        for row in heapq.merge(live, archived, key=lambda row: row['id']):
+            if rows and rows[-1]['id'] == row['id']:
+                continue
+            rows.append(row)
+            if len(rows) > page_size:
+                break
+        next_url = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_url = replace_query_param(request.build_absolute_uri(), 'after', rows[-1]['id'])
+
+        usernames = dict(Users.objects.filter(pk__in={row['user_id'] for row in rows}).values_list('pk', 'user__username'))
+        results = [
+            {
+                'id': row['id'], **{name: row[f'{name}_id'] for name in LOG_NODE_FIELDS},
+                'user': row['user_id'], 'user_name': usernames.get(row['user_id']),
+                'log_text': row['log_text'], 'log_type': row['log_type'], 'log_color': row['log_color'],
+                'created': row['created'],
+            }
+            for row in rows
+        ]
+        return Response({'next': next_url, 'previous': None, 'results': results})
+
+    @action(detail=False, methods=['get'])
+    def months(self, request):
+        """Meses con logs, indicando cuáles se leen del archivo"""
+        live = set(self.get_queryset().order_by('month').values_list('month', flat=True).distinct())
+        archived = set(archive.get_archived_months())
+        return Response([
+            {'month': f'{month:%Y-%m}', 'archived': month in archived}
+            for month in sorted(live | archived)
+        ])
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user.users)
+        serializer.save(user=get_authenticated_profile(self.request))
 
 # Sección: Comentarios
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedCursorPagination
 
     def get_queryset(self):
         user = get_authenticated_profile(self.request)
@@ -462,11 +758,86 @@ class CommentViewSet(viewsets.ModelViewSet):
             return Comment.objects.all()
         
         # Los empleados solo ven comentarios de tareas de proyectos donde son miembros
-        return Comment.objects.filter(
-            models.Q(task__activity__okr__objective__epic__project__members=user) |
-            models.Q(task__activity__okr__objective__project__members=user) |
-            models.Q(task__assignee=user)
-        )
+        project_ids = get_authorization_context(self.request).project_ids
+        return Comment.objects.filter(models.Q(root_project__in=project_ids) | models.Q(task__assignee=user))
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user.users)
\ No newline at end of file
+        serializer.save(user=get_authenticated_profile(self.request))
+
+# Sección: Trabajos
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = get_authenticated_profile(self.request)
+
+        # Los admins y managers ven todos los trabajos
+        if user.role in ['admin', 'manager']:
+            return Job.objects.all()
+
+        # Los empleados solo ven los trabajos que encolaron
+        return Job.objects.filter(created_by=user)
+
+# Sección: Notificaciones
+class NotificationViewSet(mixins.ListModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    queryset = Notification.objects.all()
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RecentFirstCursorPagination
+
+    def get_queryset(self):
+        # Cada usuario ve solo sus notificaciones
+        return Notification.objects.filter(recipient=get_authenticated_profile(self.request))
+
+    def perform_destroy(self, instance):
+        notifications.delete_notifications(Notification.objects.filter(pk=instance.pk))
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Cantidad de notificaciones sin leer, desde el contador del perfil"""
+        return Response({'unread': get_authenticated_profile(request).unread_notifications})
+
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        notification = self.get_object()
+        return Response({'marked': notifications.mark_read(notification.recipient, [notification.pk])})
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        """Marcar todas como leídas con un solo UPDATE"""
+        return Response({'marked': notifications.mark_read(get_authenticated_profile(request))})
+
+# Sección: Búsqueda
+class SearchViewSet(viewsets.GenericViewSet):
+    """
+    Búsqueda de texto en proyectos, épicas, objetivos, OKRs, actividades,
+    tareas y comentarios: ?q= (obligatorio), ?type= (tipos separados por
+    coma) y ?project=. Cada resultado trae la ruta hasta el proyecto.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SearchPagination
+
+    def list(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not search.tokenize(query):
+            raise ValidationError({'q': 'Indica el texto a buscar.'})
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        invalid = [kind for kind in kinds if kind not in search.SEARCH_FIELDS]
+        if invalid:
+            raise ValidationError({'type': f'Tipos no válidos: {", ".join(invalid)}.'})
+
+        # Los admins y managers buscan en todos los proyectos; el resto, en los suyos
+        user = get_authenticated_profile(request)
+        project_ids = None
+        if user.role not in ['admin', 'manager']:
+            project_ids = get_authorization_context(request).project_ids
+        project_id = request.query_params.get('project')
+        if project_id is not None:
+            if not project_id.isdigit():
+                raise ValidationError({'project': 'Debe ser un id de proyecto.'})
+            project_ids = [int(project_id)] if project_ids is None or int(project_id) in project_ids else []
+
+        page = self.paginate_queryset(search.search(query, project_ids, kinds))
+        return self.get_paginated_response(search.get_hits(page, query))
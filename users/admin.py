@@ -4,5 +4,7 @@ from .models import Users
 @admin.register(Users)
 class UsersAdmin(admin.ModelAdmin):
     list_display = ('user', 'first_name', 'last_name', 'role', 'phone', 'city')
-    search_fields = ('user__username', 'first_name', 'last_name', 'email')
-    list_filter = ('role', 'city')
\ No newline at end of file
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'first_name', 'last_name', 'user__email')
+    list_filter = ('role', 'city')
+    autocomplete_fields = ('user',)
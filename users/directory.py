@@ -0,0 +1,132 @@
+import unicodedata
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Case, F, Max, Q, When
+from .models import Users, UserDirectoryTerm
+
+# Sección: Directorio de usuarios
+# search() busca perfiles por prefijo de username, email, nombre o apellido
+# para los selectores de usuarios (typeahead). UserDirectoryTerm guarda los
+# términos normalizados (minúsculas, sin tildes) y cada palabra de la consulta
+# se busca como un rango [prefijo, prefijo + U+10FFFF) sobre su índice, que a
+# diferencia de LIKE con ESCAPE sí se resuelve con el índice en SQLite. El
+# rango supone que la columna se compara por punto de código (BINARY en
+# SQLite); con las collations lingüísticas de otras bases no vale, así que
+# ahí se usa startswith. El resultado es compacto (sin objetos anidados) y
+# tiene un tope de filas. rebuild() (manage.py rebuild_directory) recalcula
+# todos los términos.
+#
+# Las consultas cortas son las más repetidas y las que más filas recorren:
+# se guardan en caché con la versión del directorio en la clave, que
+# users.signals incrementa al cambiar un perfil. Como en okrs.cache, una
+# versión nueva es una clave nueva y las entradas viejas expiran solas.
+
+DIRECTORY_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email', 'role')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+KEY_PREFIX = 'users:directory'
+
+def normalize(text):
+    """Minúsculas y sin tildes"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def get_terms(profile):
+    terms = {normalize(profile.user.username), normalize(profile.user.email)}
+    for name in (profile.first_name, profile.last_name):
+        terms.update(normalize(name).split())
+    return {term[:254] for term in terms if term}
+
+# Sección: Indexación
+def index(profiles, model=UserDirectoryTerm):
+    """Reemplaza los términos de profiles (con su user cargado)"""
+    profiles = list(profiles)
+    with transaction.atomic():
+        model.objects.filter(user__in=[profile.pk for profile in profiles]).delete()
+        model.objects.bulk_create(
+            [model(user_id=profile.pk, term=term) for profile in profiles for term in get_terms(profile)],
+            batch_size=1000,
+        )
+    bump_version()
+
+def rebuild(get_model=apps.get_model, batch_size=1000):
+    """Recalcula todos los términos. Devuelve cuántos perfiles se indexaron"""
+    profiles = get_model('users', 'Users').objects.select_related('user').order_by('pk')
+    term_model = get_model('users', 'UserDirectoryTerm')
+    total = 0
+    with transaction.atomic():
+        term_model.objects.all().delete()
+        batch = []
+        for profile in profiles.iterator(chunk_size=batch_size):
+            batch.append(profile)
+            if len(batch) == batch_size:
+                index(batch, term_model)
+                total += len(batch)
+                batch = []
+        index(batch, term_model)
+    return total + len(batch)
+
+# Sección: Caché
+def get_cache():
+    return caches[getattr(settings, 'USERS_DIRECTORY_CACHE', 'default')]
+
+def get_version():
+    return get_cache().get(f'{KEY_PREFIX}:version', 0)
+
+def bump_version():
+    cache = get_cache()
+    key = f'{KEY_PREFIX}:version'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+def is_hot(query):
+    """Las consultas de hasta USERS_DIRECTORY_HOT_PREFIX caracteres se cachean"""
+    return len(query) <= getattr(settings, 'USERS_DIRECTORY_HOT_PREFIX', 3)
+
+# Sección: Búsqueda
+def get_prefix_condition(word):
+    """Términos que empiezan con word"""
+    if connection.vendor == 'sqlite':
+        return Q(term__gte=word, term__lt=word + '\U0010ffff')
+    return Q(term__startswith=word)
+
+def search_queryset(query, exclude=None):
+    """
+    Perfiles cuyos términos empiezan con cada palabra de query, sin los de
+    exclude (una subconsulta de ids de perfil), ordenados por username.
+    """
+    profiles = Users.objects.all()
+    words = normalize(query).split()
+    if words:
+        ranges = [get_prefix_condition(word) for word in words]
+        matched = {f'matched_{i}': Max(Case(When(condition, then=1), default=0)) for i, condition in enumerate(ranges)}
+        matching = UserDirectoryTerm.objects.filter(Q.create(ranges, connector=Q.OR)).values('user').annotate(
+            **matched
+        ).filter(**{name: 1 for name in matched}).values('user')
+        profiles = profiles.filter(pk__in=matching)
+    if exclude is not None:
+        profiles = profiles.exclude(pk__in=exclude)
+    return profiles.order_by('user__username').values(
+        'id', 'first_name', 'last_name', 'role', username=F('user__username'), email=F('user__email'),
+    )
+
+def search(query, exclude=None, limit=DEFAULT_LIMIT, variant=''):
+    """
+    Hasta limit perfiles (dicts con DIRECTORY_FIELDS) para query. variant
+    identifica a exclude en la clave de caché (p. ej. proyecto y revisión).
+    """
+    query = ' '.join(normalize(query).split())
+    limit = min(limit, MAX_LIMIT)
+    if not is_hot(query):
+        return list(search_queryset(query, exclude)[:limit])
+    key = f'{KEY_PREFIX}:{get_version()}:{variant}:{limit}:{query}'
+    results = get_cache().get(key)
+    if results is None:
+        results = list(search_queryset(query, exclude)[:limit])
+        get_cache().set(key, results, timeout=getattr(settings, 'USERS_DIRECTORY_CACHE_TIMEOUT', 60))
+    return results
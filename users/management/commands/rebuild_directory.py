@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from users.directory import rebuild
+
+class Command(BaseCommand):
+    help = 'Recalcula los términos del directorio de usuarios (UserDirectoryTerm) desde los perfiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Perfiles por lote (por defecto 1000)')
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} perfiles indexados.'))
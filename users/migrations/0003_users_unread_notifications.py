@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_users_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='users',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
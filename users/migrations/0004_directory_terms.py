@@ -0,0 +1,49 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:33
+
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def rebuild_directory(apps, schema_editor):
+    # Misma normalización y términos que users.directory, sobre los modelos históricos
+    Users = apps.get_model('users', 'Users')
+    UserDirectoryTerm = apps.get_model('users', 'UserDirectoryTerm')
+    batch = []
+    for profile in Users.objects.select_related('user').order_by('pk').iterator(chunk_size=1000):
+        terms = {normalize(profile.user.username), normalize(profile.user.email)}
+        for name in (profile.first_name, profile.last_name):
+            terms.update(normalize(name).split())
+        batch += [UserDirectoryTerm(user_id=profile.pk, term=term[:254]) for term in terms if term]
+        if len(batch) >= 1000:
+            UserDirectoryTerm.objects.bulk_create(batch)
+            batch = []
+    UserDirectoryTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_users_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDirectoryTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=254)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='directory_terms', to='users.users')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'user'], name='directory_term_user_idx')],
+            },
+        ),
+        migrations.RunPython(rebuild_directory, migrations.RunPython.noop),
+    ]
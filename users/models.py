@@ -15,6 +15,11 @@ class Users(models.Model):
     city = models.CharField(max_length=20, default='')
     avatar = models.ImageField(blank=True, upload_to='avatars/')
     role = models.CharField(max_length=50, choices=ROLE_CHOICES, default='employee')
+    # Contador desnormalizado de notificaciones sin leer (lo mantiene okrs.notifications)
+    unread_notifications = models.PositiveIntegerField(default=0, editable=False)
+
+    # Campos que solo se escriben con queryset.update(); un save() normal no los pisa
+    update_only_fields = ('unread_notifications',)
 
     def __str__(self):
         return f'{self.user.username}'
@@ -24,6 +29,11 @@ class Users(models.Model):
             self.first_name = self.user.first_name
         if not self.last_name:
             self.last_name = self.user.last_name
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.update_only_fields
+            ]
         super().save(*args, **kwargs)
     
     def get_tasks_num(self):
@@ -31,4 +41,20 @@ class Users(models.Model):
     
     class Meta:
         verbose_name = 'Usuario'
-        verbose_name_plural = 'Usuarios'
\ No newline at end of file
+        verbose_name_plural = 'Usuarios'
+
+class UserDirectoryTerm(models.Model):
+    """
+    Términos normalizados (username, email y cada palabra del nombre y el
+    apellido) de un perfil, para el buscador por prefijo de users.directory.
+    """
+    user = models.ForeignKey(Users, related_name='directory_terms', on_delete=models.CASCADE)
+    term = models.CharField(max_length=254)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'user'], name='directory_term_user_idx'),
+        ]
+
+    def __str__(self):
+        return self.term
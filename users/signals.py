@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Users
+from . import directory
+
+# Sección: Directorio de usuarios
+@receiver(post_save, sender=Users)
+def profile_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or not {'first_name', 'last_name', 'user'}.isdisjoint(update_fields):
+        directory.index([instance])
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Al crearse todavía no tiene perfil; los guardados parciales (p. ej. last_login) no cambian los términos
+    if created or (update_fields is not None and {'username', 'email'}.isdisjoint(update_fields)):
+        return
+    profile = Users.objects.filter(user=instance).first()
+    if profile is not None:
+        profile.user = instance
+        directory.index([profile])
@@ -114,7 +114,7 @@ class ChangePasswordView(generics.UpdateAPIView):
 
 # Sección: Usuarios
 class UsersViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Users.objects.all()
+    queryset = Users.objects.select_related('user')
     permission_classes = [permissions.IsAuthenticated]
 
     def get_serializer_class(self):